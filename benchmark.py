@@ -0,0 +1,670 @@
+#!/usr/bin/env python
+"""
+Offline throughput benchmark
+Drives UniversalCameraStream and HLSDetector from local video files (or a
+generated synthetic / ffmpeg testsrc2 clip) against mock_inference_server,
+and writes frames/s, CPU, RSS, API calls/min and detection latency as JSON
+so results can be diffed between releases.
+
+  python benchmark.py --duration 60 --output results/v1.json
+  python benchmark.py --scenario drone --video flight.mp4 --latency 0.5 --error-rate 0.05
+  python benchmark.py --scenario contention --viewer-steps 0,2,4,8 --duration 40
+  python benchmark.py --compare results/v1.json results/v2.json
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+import requests
+
+from inference_client import InferenceClient
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+SCHEMA_VERSION = 1
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MOCK_SERVER = os.path.join(REPO_DIR, 'mock_inference_server.py')
+
+VIDEO_SIZE = (1280, 720)
+VIDEO_FPS = 25
+# Synthetic clip alternates moving and still stretches (seconds); the still
+# part outlasts the change gate's background catch-up so some checks are skipped
+MOVING_SECONDS = 4.0
+STILL_SECONDS = 12.0
+SCROLL_SPEED = 30            # px/s while moving (~5-10 gray levels of change per second)
+CLIP_SECONDS = 2 * (MOVING_SECONDS + STILL_SECONDS)     # generated clip, looped by the sources
+RESOURCE_SAMPLE_INTERVAL = 0.5
+
+# ═══════════════════════════════════════════════════════════════
+# TEST VIDEO
+# ═══════════════════════════════════════════════════════════════
+
+def generate_synthetic(path, seconds, fps=VIDEO_FPS, size=VIDEO_SIZE):
+    """Scrolling gradient with a flickering orange blob, frozen for
+    STILL_SECONDS after every MOVING_SECONDS so the change gate both passes
+    and skips frames"""
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write {path} (OpenCV built without an MPEG-4 encoder?)")
+    xs = np.linspace(0, 255, w, dtype=np.float32)
+    ys = np.linspace(0, 120, h, dtype=np.float32)[:, None]
+    base = np.dstack([np.broadcast_to(xs * 0.4 + ys, (h, w)),
+                      np.broadcast_to(xs * 0.3 + 40, (h, w)),
+                      np.broadcast_to(ys + 60, (h, w))]).astype(np.uint8)
+    t_moving = 0.0
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        if t % (MOVING_SECONDS + STILL_SECONDS) < MOVING_SECONDS:
+            t_moving += 1.0 / fps
+        shift = int(t_moving * SCROLL_SPEED) % w
+        frame = np.roll(base, shift, axis=1)
+        cx = int(w * (0.3 + 0.4 * (0.5 + 0.5 * np.sin(t_moving * 0.7))))
+        cy = int(h * 0.6)
+        radius = int(60 + 20 * np.sin(t_moving * 9))
+        cv2.circle(frame, (cx, cy), radius, (0, 110, 255), -1)
+        cv2.circle(frame, (cx, cy - radius // 3), radius // 2, (40, 220, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def generate_testsrc(path, seconds, fps=VIDEO_FPS, size=VIDEO_SIZE):
+    """ffmpeg testsrc2 encoded like the drone uplink (H.264, 1 s GOP)"""
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg not found - use --pattern synthetic or pass --video")
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', f'testsrc2=size={size[0]}x{size[1]}:rate={fps}', '-t', str(seconds),
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'zerolatency',
+                    '-g', str(fps), '-pix_fmt', 'yuv420p', path], check=True)
+    return path
+
+# ═══════════════════════════════════════════════════════════════
+# REPLAY SOURCES
+# ═══════════════════════════════════════════════════════════════
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in for the camera server: plays a file at its
+    own frame rate (like a live RTSP feed) and loops at the end"""
+
+    def __init__(self, path, realtime=True):
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or VIDEO_FPS
+        self.realtime = realtime
+        self.next_ts = time.monotonic()
+        self.loops = 0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def _pace(self):
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self.next_ts > now:
+            time.sleep(self.next_ts - now)
+        elif now - self.next_ts > 1.0:
+            self.next_ts = now          # fell behind (e.g. paused); don't burst to catch up
+        self.next_ts += 1.0 / self.fps
+
+    def grab(self):
+        self._pace()
+        if self.cap.grab():
+            return True
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.loops += 1
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.cap.retrieve(image)
+
+    def release(self):
+        self.cap.release()
+
+
+def replay_opener(args):
+    """open_capture replacement for the camera server, picklable for capture processes"""
+    import benchmark    # by module name: a capture process cannot look up __main__.ReplayCapture
+    return functools.partial(benchmark.ReplayCapture, realtime=not args.max_rate)
+
+
+class PacedContainer:
+    """PyAV container wrapper for the drone pipeline: releases packets at
+    their presentation time, loops the file with timestamps shifted so they
+    keep increasing, and ends the stream at the deadline"""
+
+    def __init__(self, container, deadline, realtime=True):
+        self.container = container
+        self.deadline = deadline
+        self.realtime = realtime
+        self.loops = 0
+
+    def demux(self, stream):
+        start = time.monotonic()
+        first_pts = None
+        offset = end = 0
+        while True:
+            for pkt in self.container.demux(stream):
+                if pkt.size == 0:
+                    continue                # end-of-file flush packet; we loop instead
+                now = time.monotonic()
+                if now >= self.deadline:
+                    return
+                if pkt.pts is not None:
+                    pkt.pts += offset
+                    if pkt.dts is not None:
+                        pkt.dts += offset
+                    end = max(end, pkt.pts + (pkt.duration or 0))
+                    if self.realtime and stream.time_base is not None:
+                        pts = float(pkt.pts * stream.time_base)
+                        first_pts = pts if first_pts is None else first_pts
+                        wait = start + (pts - first_pts) - now
+                        if wait > 0:
+                            time.sleep(wait)
+                yield pkt
+            self.container.seek(0)
+            offset = end
+            self.loops += 1
+
+# ═══════════════════════════════════════════════════════════════
+# RESOURCE SAMPLER
+# ═══════════════════════════════════════════════════════════════
+
+def current_rss():
+    """Resident set size in bytes (Linux /proc, else peak RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def process_cpu(pid):
+    """User + system CPU seconds of a live process (Linux /proc), or None"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ResourceSampler:
+    """Process CPU (user + system over wall time) and RSS while a scenario runs"""
+
+    def __init__(self, interval=RESOURCE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.rss = []
+        self.running = False
+        self.thread = None
+
+    def _loop(self):
+        while self.running:
+            self.rss.append(current_rss())
+            time.sleep(self.interval)
+
+    def start(self):
+        self.rss = [current_rss()]
+        self.t0 = time.monotonic()
+        self.cpu0 = os.times()
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='bench-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        cpu1 = os.times()
+        wall = time.monotonic() - self.t0
+        cpu = (cpu1.user - self.cpu0.user) + (cpu1.system - self.cpu0.system)
+        rss_mb = np.asarray(self.rss, dtype=np.float64) / (1024 * 1024)
+        return {
+            'wall_s': round(wall, 2),
+            'cpu_s': round(cpu, 2),
+            'cpu_percent': round(100.0 * cpu / wall, 1) if wall > 0 else None,
+            'rss_mb_avg': round(float(rss_mb.mean()), 1),
+            'rss_mb_max': round(float(rss_mb.max()), 1)
+        }
+
+# ═══════════════════════════════════════════════════════════════
+# MOCK INFERENCE SERVER
+# ═══════════════════════════════════════════════════════════════
+
+class MockServerProcess:
+    """mock_inference_server.py in a child process, so its CPU isn't counted"""
+
+    def __init__(self, args):
+        cmd = [sys.executable, MOCK_SERVER, '--port', '0',
+               '--latency', str(args.latency), '--jitter', str(args.jitter),
+               '--error-rate', str(args.error_rate), '--fire-rate', str(args.fire_rate),
+               '--boxes', str(args.boxes)]
+        if args.seed is not None:
+            cmd += ['--seed', str(args.seed)]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline()
+        if ' on ' not in line:
+            self.proc.kill()
+            raise RuntimeError(f"Mock inference server failed to start: {line.strip()!r}")
+        self.url = line.split(' on ', 1)[1].split()[0]
+        self.base = self.url.split('/default/')[0]
+
+    def reset(self):
+        requests.get(f"{self.base}/reset", timeout=5)
+
+    def stats(self):
+        return requests.get(f"{self.base}/stats", timeout=5).json()
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+# ═══════════════════════════════════════════════════════════════
+# SCENARIOS
+# ═══════════════════════════════════════════════════════════════
+
+def detection_latency(summary):
+    """Capture -> alert percentiles (capture -> parsed when nothing alerted)"""
+    since = summary['since_capture_ms']
+    stage = 'alert' if 'alert' in since else 'parsed'
+    return dict(since.get(stage, {}), stage=stage)
+
+
+def wait_for_in_flight(dispatcher, args):
+    """Let the last requests land so they count in this scenario, not the next"""
+    deadline = time.monotonic() + args.latency + args.jitter + 5
+    while dispatcher.stats()['in_flight'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def api_report(mock, elapsed):
+    stats = mock.stats()
+    return {
+        'calls': stats['requests'],
+        'calls_per_min': round(stats['requests'] * 60.0 / elapsed, 2) if elapsed > 0 else None,
+        'frames': stats['frames'],
+        'frames_per_call': round(stats['frames'] / stats['requests'], 2) if stats['requests'] else None,
+        'errors': stats['errors'],
+        'fire_answers': stats['fire'],
+        'kb_per_call': round(stats['bytes'] / 1024 / stats['requests'], 1) if stats['requests'] else None
+    }
+
+
+def run_camera(video, args, mock):
+    """RTSP camera server path: capture thread + fire check cadence + web viewers"""
+    import camera_fire_final_local as cf
+
+    cf.CAPTURE_MODE = args.capture_mode
+    cf.CAPTURE_PROCESSES = args.capture_processes
+    cf.FIRE_CHECK_INTERVAL = args.interval
+    cf.AI_MAX_FRAME_AGE = args.interval
+    cf.API_ENDPOINT = mock.url
+    cf.AI_BATCH_SIZE = args.batch_size
+    cf.ai_client = InferenceClient(mock.url, pool_size=cf.AI_POOL_SIZE, retries=cf.AI_RETRIES,
+                                   timeout=15, name='bench_camera',
+                                   batch_size=args.batch_size, batch_wait=args.batch_wait)
+    cf.open_capture = replay_opener(args)
+    if args.model:
+        cf.LOCAL_MODEL_PATH = args.model
+
+    cam = cf.UniversalCameraStream(camera_id='bench_camera', rtsp_urls={'sub': video},
+                                   backend=args.backend)
+    cam.streams = {'sub': video}
+    viewer_frames = [0] * args.viewers
+    running = True
+
+    def viewer(i):
+        seq = 0
+        while running:
+            new_seq, jpeg = cam.get_jpeg('sub', seq)
+            if jpeg is not None and new_seq > seq:
+                viewer_frames[i] += 1
+                seq = new_seq
+
+    mock.reset()
+    sampler = ResourceSampler()
+    sampler.start()
+    if not cam.start_stream('sub'):
+        raise RuntimeError(f"Cannot open {video}")
+    stream = cam.active_streams['sub']
+    # Decode CPU outside this process (capture process), counted from its first frame
+    capture_pid = stream['cap'].process.pid if args.capture_processes else None
+    capture_cpu0 = process_cpu(capture_pid) if capture_pid else None
+    viewers = [threading.Thread(target=viewer, args=(i,), daemon=True) for i in range(args.viewers)]
+    for t in viewers:
+        t.start()
+    time.sleep(args.duration)
+
+    grabbed, decoded = stream['grabbed'], stream['decoded']
+    capture_cpu1 = process_cpu(capture_pid) if capture_pid else None
+    running = False
+    for t in viewers:
+        t.join(timeout=2)           # before stopping, or get_jpeg() would restart the stream
+    cam.stop_all_streams()
+    cam.fire_detection_thread.join(timeout=args.interval + 1)
+    wait_for_in_flight(cam.dispatcher, args)
+    resources = sampler.stop()
+    resources['cpu_ms_per_frame'] = round(1000.0 * resources['cpu_s'] / decoded, 2) if decoded else None
+    resources['capture_cpu_s'] = (round(capture_cpu1 - capture_cpu0, 2)
+                                  if capture_cpu0 is not None and capture_cpu1 is not None else None)
+    dispatcher = cam.dispatcher.stats()
+
+    elapsed = resources['wall_s']
+    stats = cam.fire_detection_stats
+    summary = cam.traces.summary()
+    return {
+        'frames': {'grabbed': grabbed, 'decoded': decoded,
+                   'grabbed_per_s': round(grabbed / elapsed, 2),
+                   'decoded_per_s': round(decoded / elapsed, 2),
+                   'viewer_fps': [round(n / elapsed, 2) for n in viewer_frames]},
+        'resources': resources,
+        'api': api_report(mock, elapsed),
+        'detection': {'backend': cam.detector.stats(),
+                      'checks': stats['total_frames_processed'],
+                      'detections': stats['total_detections'],
+                      'gate': cam.change_gate.stats(),
+                      'dispatcher': dispatcher,
+                      'latency_ms': detection_latency(summary)},
+        'latency_trace': summary
+    }
+
+
+def run_contention(video, args):
+    """Capture fps of 'main' and 'sub' while the number of 'main' MJPEG viewers grows
+
+    Both streams replay the same file in continuous capture mode with the
+    fire check off, so the only load is capture plus viewer JPEG encodes;
+    with per-stream locking, sub's capture rate should not move.
+    """
+    import camera_fire_final_local as cf
+
+    cf.CAPTURE_MODE = 'continuous'
+    cf.CAPTURE_PROCESSES = args.capture_processes
+    cf.open_capture = replay_opener(args)
+    steps = [int(n) for n in args.viewer_steps.split(',')]
+    step_seconds = args.duration / len(steps)
+    results = {}
+    for count in steps:
+        cam = cf.UniversalCameraStream(camera_id='bench_contention', rtsp_urls={'main': video, 'sub': video},
+                                       standalone=False)
+        cam.streams = {'main': video, 'sub': video}
+        viewer_frames = [0] * count
+        running = True
+
+        def viewer(i):
+            seq = 0
+            while running:
+                new_seq, jpeg = cam.get_jpeg('main', seq)
+                if jpeg is not None and new_seq > seq:
+                    viewer_frames[i] += 1
+                    seq = new_seq
+
+        for name in ('main', 'sub'):
+            if not cam.start_stream(name):
+                raise RuntimeError(f"Cannot open {video}")
+        viewers = [threading.Thread(target=viewer, args=(i,), daemon=True) for i in range(count)]
+        for t in viewers:
+            t.start()
+        start = time.monotonic()
+        decoded = {name: data['decoded'] for name, data in cam.active_streams.items()}
+        time.sleep(step_seconds)
+        elapsed = time.monotonic() - start
+        fps = {name: round((data['decoded'] - decoded[name]) / elapsed, 2)
+               for name, data in cam.active_streams.items()}
+        running = False
+        for t in viewers:
+            t.join(timeout=2)
+        cam.stop_all_streams()
+        results[f'viewers_{count}'] = {
+            'main_capture_fps': fps['main'],
+            'sub_capture_fps': fps['sub'],
+            'viewer_fps_avg': round(sum(viewer_frames) / count / elapsed, 2) if count else None
+        }
+
+    sub = [step['sub_capture_fps'] for step in results.values()]
+    main = [step['main_capture_fps'] for step in results.values()]
+    return {
+        'steps': results,
+        # Relative drop from the best step: ~0 means capture is flat as viewers grow
+        'sub_fps_drop': round(1 - min(sub) / max(sub), 3) if max(sub) else None,
+        'main_fps_drop': round(1 - min(main) / max(main), 3) if max(main) else None
+    }
+
+
+def run_drone(video, args, mock, workdir):
+    """Drone path: demux/decode thread + sampler + dispatcher, fed from a paced file"""
+    import av
+    # Skip the EC2 / public IP lookups done at import
+    os.environ.setdefault('FIREBEATS_PUBLIC_IP', '127.0.0.1')
+    os.environ.setdefault('FIREBEATS_PRIVATE_IP', '127.0.0.1')
+    import final_drone as fd
+
+    fd.CAMERA_ID = 'bench_drone'
+    fd.BASE = workdir                       # fire_log.txt
+    fd.SAMPLE_INTERVAL = args.interval
+    fd.PIPELINE_STATS_EVERY = 10 ** 9       # the report below replaces the stats lines
+    fd.API_ENDPOINT = mock.url
+    fd.AI_BATCH_SIZE = args.batch_size
+    fd.ai_client = InferenceClient(mock.url, pool_size=fd.AI_POOL_SIZE, retries=fd.AI_RETRIES,
+                                   timeout=15, name='bench_drone',
+                                   batch_size=args.batch_size, batch_wait=args.batch_wait)
+    fd.DETECTOR_BACKEND = args.backend
+    if args.model:
+        fd.LOCAL_MODEL_PATH = args.model
+
+    detector = fd.HLSDetector()
+    detector.source = 'file'
+    cont = av.open(video)
+    vid = cont.streams.video[0]
+    vid.thread_type = 'AUTO'
+
+    mock.reset()
+    sampler = ResourceSampler()
+    sampler.start()
+    try:
+        detector.run_pipeline(PacedContainer(cont, time.monotonic() + args.duration,
+                                             realtime=not args.max_rate), vid)
+    finally:
+        cont.close()
+    wait_for_in_flight(detector.dispatcher, args)
+    resources = sampler.stop()
+    detector.dispatcher.stop()
+
+    elapsed = resources['wall_s']
+    stats = detector.pipeline_stats()
+    decode = stats['decode']
+    summary = detector.traces.summary()
+    return {
+        'frames': {'decoded': decode['frames'], 'packets': decode['packets'],
+                   'decoded_per_s': round(decode['frames'] / elapsed, 2),
+                   'packets_per_s': round(decode['packets'] / elapsed, 2),
+                   'not_sampled': decode['dropped'],
+                   'keyframe_only': decode['keyframe_only'],
+                   'samples': stats['sample']['samples']},
+        'resources': resources,
+        'api': api_report(mock, elapsed),
+        'detection': {'backend': detector.detector.stats(),
+                      'gate': detector.gate.stats(),
+                      'dispatcher': stats['inference'],
+                      'glass_to_detection_ms': (round(stats['latency']['glass_to_detection_avg'] * 1000, 1)
+                                                if stats['latency']['glass_to_detection_avg'] is not None
+                                                else None),
+                      'latency_ms': detection_latency(summary)},
+        'latency_trace': summary
+    }
+
+# ═══════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=REPO_DIR, capture_output=True, text=True,
+                                    timeout=30).stdout.strip())
+        return {'commit': commit or None, 'dirty': dirty}
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': None, 'dirty': None}
+
+
+def flatten(data, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numeric leaves only"""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    """Print every numeric result that changed between two result files"""
+    with open(old_path) as f:
+        old = flatten(json.load(f)['scenarios'])
+    with open(new_path) as f:
+        new = flatten(json.load(f)['scenarios'])
+    print(f"{'metric':<60} {'old':>12} {'new':>12} {'change':>9}")
+    for key in sorted(set(old) | set(new)):
+        if '.latency_trace.' in f'.{key}' or key.endswith('.count'):
+            continue
+        a, b = old.get(key), new.get(key)
+        if a == b:
+            continue
+        change = f"{(b - a) / a:+.1%}" if a and b is not None else ''
+        print(f"{key:<60} {str(a):>12} {str(b):>12} {change:>9}")
+
+# ═══════════════════════════════════════════════════════════════
+# MAIN
+# ═══════════════════════════════════════════════════════════════
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline fire detection benchmark')
+    parser.add_argument('--scenario', choices=['camera', 'drone', 'contention', 'all'], default='all')
+    parser.add_argument('--video', help='input file (default: generate one per --pattern)')
+    parser.add_argument('--pattern', choices=['synthetic', 'testsrc'], default='synthetic',
+                        help='generated clip: OpenCV synthetic scene or ffmpeg testsrc2')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per scenario')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between fire checks / drone samples')
+    parser.add_argument('--max-rate', action='store_true',
+                        help='read the file as fast as possible instead of at its frame rate')
+    parser.add_argument('--capture-mode', choices=['on_demand', 'continuous'], default='on_demand')
+    parser.add_argument('--capture-processes', action='store_true',
+                        help='decode camera streams in child processes over the shared-memory frame bus')
+    parser.add_argument('--viewers', type=int, default=1, help='simulated MJPEG viewers (camera)')
+    parser.add_argument('--viewer-steps', default='0,1,2,4,8',
+                        help="'main' viewer counts for the contention scenario (--duration is split across them)")
+    parser.add_argument('--backend', choices=['remote', 'local'], default='remote',
+                        help='detector under test: mock endpoint, or the local ONNX model')
+    parser.add_argument('--model', help='ONNX model for --backend local (default: LOCAL_MODEL_PATH)')
+    parser.add_argument('--batch-size', type=int, default=1, help='frames per AI POST (InferenceClient)')
+    parser.add_argument('--batch-wait', type=float, default=0.05, help='max seconds a frame waits for its batch')
+    parser.add_argument('--latency', type=float, default=0.3, help='mock AI latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--fire-rate', type=float, default=0.5)
+    parser.add_argument('--boxes', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help='OLD [NEW]: diff two result files, or OLD against this run')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare and len(args.compare) == 2:
+        compare(*args.compare)
+        return
+
+    from event_log import setup_logging
+    setup_logging('console', 'ERROR', stream=sys.stderr)
+
+    workdir = tempfile.mkdtemp(prefix='firebench_')
+    video = args.video
+    if video is None:
+        video = os.path.join(workdir, f'{args.pattern}.mp4')
+        make = generate_synthetic if args.pattern == 'synthetic' else generate_testsrc
+        print(f"🎞️ Generating {args.pattern} clip ({CLIP_SECONDS:.0f}s, looped)...", file=sys.stderr)
+        make(video, CLIP_SECONDS)
+
+    mock = MockServerProcess(args)
+    scenarios = {}
+    # Pipeline chatter goes to stderr so stdout stays valid JSON
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.scenario in ('camera', 'all'):
+                print(f"📷 Camera scenario ({args.duration:.0f}s)...")
+                scenarios['camera'] = run_camera(video, args, mock)
+            if args.scenario in ('drone', 'all'):
+                print(f"🛸 Drone scenario ({args.duration:.0f}s)...")
+                scenarios['drone'] = run_drone(video, args, mock, workdir)
+            if args.scenario == 'contention':
+                print(f"🔒 Contention scenario (viewers {args.viewer_steps}, {args.duration:.0f}s)...")
+                scenarios['contention'] = run_contention(video, args)
+    finally:
+        mock.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'schema': SCHEMA_VERSION,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpus': os.cpu_count(), 'opencv': cv2.__version__},
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'scenarios': scenarios
+    }
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"[✓] Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        new_path = args.output
+        if new_path is None:
+            new_path = os.path.join(tempfile.gettempdir(), 'firebench_latest.json')
+            with open(new_path, 'w') as f:
+                f.write(text)
+        compare(args.compare[0], new_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Multi-box fire tracker for static-fire suppression
+Matches every returned fire box against the tracked boxes with a
+vectorized IoU matrix and greedy matching, keeps a static counter per
+track and expires tracks that stop being seen, so repeat alerts for a
+fire that is not moving can be suppressed while new or drifting fires
+still alert.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import itertools
+import threading
+import time
+
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════
+# IOU
+# ═══════════════════════════════════════════════════════════════
+
+def iou_matrix(a, b):
+    """(N, M) IoU of [x1, y1, x2, y2] boxes a (N) against b (M)"""
+    a = np.asarray(a, np.float32).reshape(-1, 4)
+    b = np.asarray(b, np.float32).reshape(-1, 4)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+    area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def greedy_match(iou, min_iou):
+    """[(row, col)] pairs, highest IoU first, each row and column used once"""
+    rows, cols = np.nonzero(iou >= min_iou)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    matched_rows, matched_cols, pairs = set(), set(), []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row not in matched_rows and col not in matched_cols:
+            matched_rows.add(row)
+            matched_cols.add(col)
+            pairs.append((row, col))
+    return pairs
+
+# ═══════════════════════════════════════════════════════════════
+# TRACKER
+# ═══════════════════════════════════════════════════════════════
+
+class BoxTracker:
+    """Follow fire boxes across samples and count how long each stays put
+
+    update() matches boxes to live tracks (IoU >= match_iou), so a drifting
+    fire keeps its track and several fires are tracked independently. A
+    matched box whose IoU with its track's last box is above static_iou
+    bumps the track's static count, otherwise resets it; either way the
+    track moves to the new box. Unmatched boxes start new tracks, and
+    tracks unseen for max_age seconds expire. A track is static once its
+    count reaches static_after (0 never suppresses).
+    """
+
+    def __init__(self, match_iou=0.3, static_iou=0.95, static_after=1, max_age=10.0, name='tracker'):
+        self.match_iou = match_iou
+        self.static_iou = static_iou
+        self.static_after = static_after
+        self.max_age = max_age
+        self.name = name
+
+        self.lock = threading.Lock()
+        self.tracks = []                        # {'id', 'box', 'static_count', 'last_seen'}
+        self.ids = itertools.count(1)
+        self.counters = {'updates': 0, 'created': 0, 'expired': 0, 'suppressed': 0}
+
+    def update(self, boxes, now=None):
+        """Match this sample's boxes; returns one dict per box, in box order
+
+        Each dict has the track 'id', 'iou' with the track's previous box
+        (None for a new track), 'static_count' and 'static'. Call with no
+        boxes on fire-free samples so tracks age out.
+        """
+        now = time.monotonic() if now is None else now
+        boxes = [list(box[:4]) for box in boxes or []]
+        with self.lock:
+            self.counters['updates'] += 1
+            live = [t for t in self.tracks if now - t['last_seen'] <= self.max_age]
+            self.counters['expired'] += len(self.tracks) - len(live)
+            self.tracks = live
+
+            iou = (iou_matrix([t['box'] for t in live], boxes)
+                   if live and boxes else np.zeros((len(live), len(boxes)), np.float32))
+            matches = {col: row for row, col in greedy_match(iou, self.match_iou)}
+
+            results = []
+            for col, box in enumerate(boxes):
+                if col in matches:
+                    track = live[matches[col]]
+                    overlap = float(iou[matches[col], col])
+                    track['static_count'] = track['static_count'] + 1 if overlap > self.static_iou else 0
+                    track['box'], track['last_seen'] = box, now
+                else:
+                    overlap = None
+                    track = {'id': next(self.ids), 'box': box, 'static_count': 0, 'last_seen': now}
+                    self.tracks.append(track)
+                    self.counters['created'] += 1
+                results.append({
+                    'id': track['id'],
+                    'iou': overlap,
+                    'static_count': track['static_count'],
+                    'static': bool(self.static_after) and track['static_count'] >= self.static_after
+                })
+            return results
+
+    def all_static(self, results):
+        """True (and counted as suppressed) if every box of a sample is a static track"""
+        if not results or not all(r['static'] for r in results):
+            return False
+        with self.lock:
+            self.counters['suppressed'] += 1
+        return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                'name': self.name,
+                'tracks': [{'id': t['id'], 'box': t['box'], 'static_count': t['static_count']}
+                           for t in self.tracks],
+                **self.counters
+            }
@@ -2,6 +2,7 @@
 """
 Universal RTSP Web Streamer with AI Fire Detection
 Plug-and-play solution: Just change CAMERA_IP and run!
+Multi-camera sites: pass a camera inventory JSON file to run them all in one process
 Works with any RTSP camera (Reolink, Hikvision, Dahua, etc.)
 Includes AI-powered fire detection from drone code
 """
@@ -16,10 +17,25 @@ import signal
 import sys
 import os
 import requests
-import numpy as np
 import json
-from flask import Flask, render_template_string, Response, jsonify
+from flask import Flask, render_template_string, Response, jsonify, abort, request
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from box_tracker import BoxTracker
+from change_gate import ChangeGate
+from detector_backends import create_backend
+from event_log import EventLogger, setup_logging
+from frame_bus import CaptureProcess, EXIT_RESIZED, bus_name, open_capture   # open_capture: replaced by the benchmark
+from frame_ring import FrameRing
+from frame_stats import frame_stats
+from inference_client import InferenceClient, format_timings
+from inference_dispatcher import InferenceDispatcher
+from inference_payload import PayloadBuilder
+from latency_trace import FrameTrace, TraceRecorder
+from prom_metrics import (REGISTRY, CONTENT_TYPE, FRAMES_CAPTURED, FRAMES_DROPPED, ENCODE_SECONDS,
+                          AI_REQUEST_SECONDS, AI_RESPONSES, STATIC_SKIPS, DETECTIONS, RECONNECTS,
+                          VIEWER_BYTES, VIEWERS)
 
 # ═══════════════════════════════════════════════════════════════
 # CONFIGURATION - CHANGE ONLY THESE VALUES
@@ -32,37 +48,108 @@ PASSWORD = "CCTVCheck@123"          # ← Change to your password
 WEB_PORT = 8080                     # ← Web interface port
 STREAM_QUALITY = 80                 # ← JPEG quality (1-100)
 FRAME_RATE = 20                     # ← Target FPS for web stream
+CAPTURE_MODE = "on_demand"          # ← "on_demand": grab() at wire rate, decode only when needed; "continuous": read() every frame
+STREAM_RECONNECT_AFTER = 5          # ← Reopen an RTSP stream after N seconds without a frame
+FRAME_RING_SLOTS = 4                # ← Preallocated frame buffers per stream (grows if readers hold more)
+CAPTURE_PROCESSES = False           # ← Decode each stream in its own process, frames shared via /dev/shm
+FRAME_BUS_SLOTS = 4                 # ← Shared-memory frame slots per stream (CAPTURE_PROCESSES only)
 
 # AI Fire Detection Settings (from drone code)
 FIRE_DETECTION_ENABLED = True       # ← Enable/disable fire detection
 CAMERA_ID = "rtsp_camera_1"         # ← Camera identifier for AI
 API_ENDPOINT = "https://2cwzmjzkx4.execute-api.us-east-1.amazonaws.com/default/fire-frame-receiver"
 FIRE_CHECK_INTERVAL = 3             # ← Check for fire every N seconds
+AI_MAX_IN_FLIGHT = 2                # ← Max concurrent AI requests
+AI_MAX_FRAME_AGE = FIRE_CHECK_INTERVAL  # ← Skip frames older than N seconds instead of scoring them
+SCHEDULER_FRAME_WAIT = 0.2          # ← Multi-camera: max seconds to wait for a fresh frame per check (else use the newest)
+AI_POOL_SIZE = 4                    # ← Keep-alive connections to the AI endpoint
+AI_RETRIES = 1                      # ← Retries on 5xx / timeout (with backoff)
+AI_HTTP2 = False                    # ← Use HTTP/2 (requires: pip install httpx[http2])
+AI_BATCH_SIZE = 1                   # ← Frames per POST, across cameras (1 = one POST per frame)
+AI_BATCH_WAIT = 0.05                # ← Max seconds to hold a frame while its batch fills
+AI_INPUT_SIZE = 640                 # ← Downscale longest side of the AI upload to N px (None = full size)
+AI_BYTE_BUDGET = 80000              # ← Max upload size in bytes; JPEG quality adapts to fit (None = fixed)
+AI_IMAGE_FORMAT = "jpeg"            # ← "jpeg" or "webp"
+CHANGE_GATE_ENABLED = True          # ← Skip AI calls while the scene is unchanged
+CHANGE_THRESHOLD = 5.0              # ← Mean gray-level change that counts as "changed"
+TRACK_MATCH_IOU = 0.3               # ← Box overlap that keeps a fire's track between checks
+STATIC_FIRE_IOU = 0.95              # ← Box overlap with its last position that counts as "not moved"
+STATIC_FIRE_AFTER = 0               # ← Skip repeat alerts once every box is unmoved for N checks (0 = never skip)
+TRACK_MAX_AGE = 3 * FIRE_CHECK_INTERVAL  # ← Forget a fire's track after N seconds unseen (it alerts again)
+FRAME_FEATURES = False              # ← Add red/orange fraction + saturation histogram to frame details
+STATIC_RECHECK_INTERVAL = 60        # ← Still send a static scene every N seconds
+TRACE_BUFFER_SIZE = 1000            # ← Per-frame latency traces kept for /api/metrics
+
+# Detector Backend (per camera: "backend" in the cameras JSON overrides this)
+DETECTOR_BACKEND = "remote"         # ← "remote" (API_ENDPOINT) or "local" (ONNX model on this machine, no uplink needed)
+LOCAL_MODEL_PATH = "models/fire.onnx"   # ← YOLOv5/v8 ONNX export with LOCAL_LABELS classes
+LOCAL_LABELS = ("fire", "smoke")    # ← Model class names, in output order
+LOCAL_FIRE_LABELS = ("fire",)       # ← Classes that count as fire_detected
+LOCAL_INPUT_SIZE = 640              # ← Model input (square, letterboxed)
+LOCAL_CONF_THRESHOLD = 0.35         # ← Minimum box confidence
+LOCAL_ENGINE = "auto"               # ← "auto" (onnxruntime if installed), "onnxruntime" or "opencv"
+LOCAL_THREADS = 2                   # ← CPU threads for the local model
+LOCAL_BATCH_SIZE = 4                # ← Max frames per forward pass, across cameras
+LOCAL_BATCH_WAIT = 0.05             # ← Seconds to wait for more cameras to join a batch
+
+# Logging Settings
+LOG_FORMAT = "console"              # ← "console" (emoji view) or "json" (JSON lines for journald / log shipping)
+LOG_LEVEL = "INFO"                  # ← "DEBUG" also logs every AI request and response body
+
+# Multi-Camera Settings
+CAMERA_INVENTORY = None             # ← Path to cameras JSON file (or pass it as first argument)
+CAMERA_PROBE_WORKERS = 8            # ← Cameras probed in parallel at startup
 
 # ═══════════════════════════════════════════════════════════════
 # AUTO-GENERATED RTSP URLS
 # ═══════════════════════════════════════════════════════════════
-RTSP_URLS = {
-    'main': f"rtsp://{USERNAME}:{PASSWORD}@{CAMERA_IP}:554/h264Preview_01_main",
-    'sub': f"rtsp://{USERNAME}:{PASSWORD}@{CAMERA_IP}:554/h264Preview_01_sub",
-    # Common alternatives (auto-tested)
-    'alt1': f"rtsp://{USERNAME}:{PASSWORD}@{CAMERA_IP}:554/stream1",
-    'alt2': f"rtsp://{USERNAME}:{PASSWORD}@{CAMERA_IP}:554/cam/realmonitor?channel=1&subtype=0",
-    'alt3': f"rtsp://{USERNAME}:{PASSWORD}@{CAMERA_IP}:554/live/ch1"
-}
+def build_rtsp_urls(camera_ip, username, password):
+    """Candidate RTSP URLs for a camera, auto-tested in order"""
+    return {
+        'main': f"rtsp://{username}:{password}@{camera_ip}:554/h264Preview_01_main",
+        'sub': f"rtsp://{username}:{password}@{camera_ip}:554/h264Preview_01_sub",
+        # Common alternatives (auto-tested)
+        'alt1': f"rtsp://{username}:{password}@{camera_ip}:554/stream1",
+        'alt2': f"rtsp://{username}:{password}@{camera_ip}:554/cam/realmonitor?channel=1&subtype=0",
+        'alt3': f"rtsp://{username}:{password}@{camera_ip}:554/live/ch1"
+    }
+
+RTSP_URLS = build_rtsp_urls(CAMERA_IP, USERNAME, PASSWORD)
+
+# Per-check events: sampled / rate limited so many cameras don't flood stdout
+log = EventLogger('camera', policies={
+    'frame_details': {'sample_every': 10},
+    'ai_timings': {'sample_every': 10},
+    'ai_response': {'max_per_second': 1},
+    'ai_error': {'max_per_second': 1},
+    'static_skip': {'max_per_second': 0.2},
+    'static_fire': {'max_per_second': 0.2},
+    'ai_busy': {'max_per_second': 0.2}
+})
 
 # ═══════════════════════════════════════════════════════════════
 # GLOBAL VARIABLES
 # ═══════════════════════════════════════════════════════════════
-fire_detection_stats = {
-    'total_detections': 0,
-    'last_detection': None,
-    'current_fire_detected': False,
-    'last_check_time': None,
-    'total_frames_processed': 0,
-    'ai_responses': [],
-    'last_ai_response': None
-}
+def new_fire_detection_stats():
+    """Fresh per-camera fire detection stats"""
+    return {
+        'total_detections': 0,
+        'last_detection': None,
+        'current_fire_detected': False,
+        'last_check_time': None,
+        'total_frames_processed': 0,
+        'ai_responses': [],
+        'last_ai_response': None,
+        'last_boxes': []                # source-frame pixels of the detection stream
+    }
+
+# Stats of the default (single) camera
+fire_detection_stats = new_fire_detection_stats()
+
+# Shared pooled HTTP client for the AI endpoint
+ai_client = InferenceClient(API_ENDPOINT, pool_size=AI_POOL_SIZE, retries=AI_RETRIES,
+                            timeout=10, http2=AI_HTTP2, name=CAMERA_ID,
+                            batch_size=AI_BATCH_SIZE, batch_wait=AI_BATCH_WAIT)
 
 # ═══════════════════════════════════════════════════════════════
 # HTML TEMPLATE - Modern Responsive Design
@@ -319,7 +406,7 @@ HTML_TEMPLATE = """
         <div class="stream-container">
             <div class="video-wrapper">
                 <img id="live-stream" 
-                     src="/video_feed/main" 
+                     src="{{ base_path }}/video_feed/main" 
                      alt="Loading live stream..." 
                      onerror="handleStreamError()" 
                      onload="handleStreamLoad()">
@@ -423,6 +510,7 @@ HTML_TEMPLATE = """
         // ================================
         // GLOBAL VARIABLES
         // ================================
+        const basePath = '{{ base_path }}';
         let currentStream = 'main';
         let startTime = Date.now();
         
@@ -432,7 +520,7 @@ HTML_TEMPLATE = """
         function switchStream(stream) {
             currentStream = stream;
             const img = document.getElementById('live-stream');
-            img.src = `/video_feed/${stream}?t=${Date.now()}`;
+            img.src = `${basePath}/video_feed/${stream}?t=${Date.now()}`;
             
             // Update button states
             document.querySelectorAll('.btn').forEach(btn => btn.classList.remove('active'));
@@ -445,7 +533,7 @@ HTML_TEMPLATE = """
         
         function refreshStream() {
             const img = document.getElementById('live-stream');
-            img.src = `/video_feed/${currentStream}?t=${Date.now()}`;
+            img.src = `${basePath}/video_feed/${currentStream}?t=${Date.now()}`;
         }
         
         function toggleFullscreen() {
@@ -461,7 +549,7 @@ HTML_TEMPLATE = """
         // AI FIRE DETECTION FUNCTIONS
         // ================================
         function testFireDetection() {
-            fetch('/api/test_fire_detection')
+            fetch(`${basePath}/api/test_fire_detection`)
                 .then(response => response.json())
                 .then(data => {
                     if (data.success) {
@@ -513,7 +601,7 @@ HTML_TEMPLATE = """
         
         // Update fire status every 5 seconds
         setInterval(() => {
-            fetch('/api/fire_status')
+            fetch(`${basePath}/api/fire_status`)
                 .then(response => response.json())
                 .then(data => updateFireStatus(data));
         }, 5000);
@@ -548,18 +636,45 @@ HTML_TEMPLATE = """
 # CAMERA STREAM CLASS
 # ═══════════════════════════════════════════════════════════════
 
+def resize_for_web(frame, max_width=1920):
+    """Auto-resize large frames for web (done by the encoder, not the capture thread)"""
+    height, width = frame.shape[:2]
+    if width <= max_width:
+        return frame
+    scale = max_width / width
+    return cv2.resize(frame, (int(width * scale), int(height * scale)))
+
 class UniversalCameraStream:
-    def __init__(self):
+    def __init__(self, camera_id=CAMERA_ID, camera_ip=CAMERA_IP, username=USERNAME,
+                 password=PASSWORD, rtsp_urls=None, stats=None, standalone=True, rois=None,
+                 backend=DETECTOR_BACKEND):
+        self.camera_id = camera_id
+        self.camera_ip = camera_ip
+        self.username = username
+        self.password = password
+        self.rtsp_urls = rtsp_urls or build_rtsp_urls(camera_ip, username, password)
+        self.fire_detection_stats = stats if stats is not None else new_fire_detection_stats()
+        self.standalone = standalone          # False: detection is scheduled by a CameraSupervisor
         self.streams = {}
         self.active_streams = {}
         self.start_time = datetime.now()
-        self.frame_lock = threading.Lock()
         self.fire_detection_thread = None
+        self.detection_running = True
+        self.dispatcher = None
+        self.payload_builder = PayloadBuilder(target_size=AI_INPUT_SIZE, rois=rois,
+                                              byte_budget=AI_BYTE_BUDGET, fmt=AI_IMAGE_FORMAT)
+        self.change_gate = ChangeGate(threshold=CHANGE_THRESHOLD,
+                                      recheck_interval=STATIC_RECHECK_INTERVAL,
+                                      name=camera_id)
+        self.fire_tracker = BoxTracker(match_iou=TRACK_MATCH_IOU, static_iou=STATIC_FIRE_IOU,
+                                       static_after=STATIC_FIRE_AFTER, max_age=TRACK_MAX_AGE,
+                                       name=camera_id)
+        self.traces = TraceRecorder(TRACE_BUFFER_SIZE, name=camera_id)
+        self.detector = create_detector(backend, self.query_ai)
         
     def test_rtsp_url(self, url, timeout=5):
         """Test if RTSP URL is accessible"""
-        cap = cv2.VideoCapture(url)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        cap = open_capture(url)
         
         if cap.isOpened():
             ret, frame = cap.read()
@@ -571,181 +686,306 @@ class UniversalCameraStream:
         """Auto-detect working RTSP streams"""
         print("🔍 Auto-detecting camera streams...")
         
-        for name, url in RTSP_URLS.items():
-            print(f"   Testing {name}: {url.replace(PASSWORD, '***')}")
+        for name, url in self.rtsp_urls.items():
+            print(f"   [{self.camera_id}] Testing {name}: {url.replace(self.password, '***')}")
             if self.test_rtsp_url(url):
-                print(f"   ✅ {name} stream working")
+                print(f"   ✅ [{self.camera_id}] {name} stream working")
                 self.streams[name] = url
             else:
-                print(f"   ❌ {name} stream failed")
+                print(f"   ❌ [{self.camera_id}] {name} stream failed")
         
         if not self.streams:
             # Fallback to basic URLs
-            basic_url = f"rtsp://{USERNAME}:{PASSWORD}@{CAMERA_IP}:554/"
+            basic_url = f"rtsp://{self.username}:{self.password}@{self.camera_ip}:554/"
             if self.test_rtsp_url(basic_url):
                 self.streams['main'] = basic_url
                 print(f"   ✅ Basic RTSP stream working")
         
         return len(self.streams) > 0
     
-    def get_frame_details(self, frame):
-        """Extract frame details (from drone code)"""
+    def get_frame_details(self, frame, thumb=None):
+        """Extract frame details (from drone code)
+        
+        Color stats come from the change gate thumbnail (pass the frame's
+        thumbnail() pair to reuse it) rather than the full-resolution frame.
+        """
         if frame is None:
             return None
             
         height, width, channels = frame.shape
-        
-        # Calculate color stats
-        mean_bgr = np.mean(frame, axis=(0, 1))
-        
-        # Brightness
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        brightness = np.mean(gray)
+        small, gray = thumb if thumb is not None else self.change_gate.thumbnail(frame)
         
         details = {
             'timestamp': datetime.now().strftime("%H:%M:%S"),
-            'frame_number': fire_detection_stats['total_frames_processed'],
+            'frame_number': self.fire_detection_stats['total_frames_processed'],
             'width': int(width),
             'height': int(height), 
             'channels': int(channels),
-            'brightness': float(brightness),
-            'mean_blue': float(mean_bgr[0]),
-            'mean_green': float(mean_bgr[1]),
-            'mean_red': float(mean_bgr[2])
+            **frame_stats(small, gray, features=FRAME_FEATURES)
         }
         
         return details
 
-    def print_frame_details(self, details):
-        """Print frame details (from drone code)"""
+    def log_frame_details(self, details):
+        """Log frame details (from drone code) as one sampled event"""
         if details is None:
-            print("[!] No frame details available")
             return
-            
-        print(f"\n📺 FRAME DETAILS:")
-        print(f"   Time: {details['timestamp']}")
-        print(f"   Frame #: {details['frame_number']}")
-        print(f"   Size: {details['width']}x{details['height']}")
-        print(f"   Channels: {details['channels']}")
-        print(f"   Brightness: {details['brightness']:.1f}")
-        print(f"   RGB: R={details['mean_red']:.1f} G={details['mean_green']:.1f} B={details['mean_blue']:.1f}")
+        log.info('frame_details',
+                 f"[{self.camera_id}] Frame {details['frame_number']} @ {details['timestamp']} - "
+                 f"{details['width']}x{details['height']}, brightness={details['brightness']:.1f}, "
+                 f"RGB=({details['mean_red']:.1f}, {details['mean_green']:.1f}, {details['mean_blue']:.1f})"
+                 + (f", fire pixels={details['fire_fraction']:.1%}" if 'fire_fraction' in details else ''),
+                 camera=self.camera_id, **details)
 
-    def send_frame_to_ai(self, frame):
-        """Send frame directly to AI fire detection API (no file saving)"""
+    def query_ai(self, frame, trace=None):
+        """Send frame directly to AI fire detection API (no file saving)
+        
+        Returns a result dict with 'fire_detected' (None on failure), 'boxes'
+        in source-frame pixels and the text shown in the AI response panel.
+        Stats are not touched here; stage times are marked on trace if given.
+        """
         if frame is None:
-            print("[!] No frame to send.")
             return None
+        if trace is not None:
+            trace.mark('dequeue')
 
-        print(f"[🤖] Sending frame to AI model (Camera: {CAMERA_ID})...")
+        log.debug('ai_request', f"[{self.camera_id}] Sending frame to AI model", camera=self.camera_id)
         try:
-            # Encode frame directly to JPEG bytes
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
-                print("[!] Failed to encode frame")
+            # Crop to ROIs, downscale and encode within the byte budget
+            t0 = time.perf_counter()
+            payload = self.payload_builder.build(frame)
+            if payload is None:
+                log.error('ai_error', f"[{self.camera_id}] Failed to encode frame", camera=self.camera_id)
                 return None
+            ENCODE_SECONDS.labels(self.camera_id, 'ai').observe(time.perf_counter() - t0)
+            if trace is not None:
+                trace.mark('encode')
+                trace.mark('upload_start')
                 
-            res = requests.post(
-                API_ENDPOINT,
-                data=buffer.tobytes(),
-                headers={
-                    "Content-Type": "image/jpeg",
-                    "camera-id": CAMERA_ID 
-                },
-                timeout=10
-            )
+            # Pooled keep-alive session: no TCP/TLS handshake per check
+            res, timings = ai_client.post_frame(payload['data'].tobytes(), self.camera_id, timeout=10,
+                                                content_type=payload['content_type'])
+            AI_REQUEST_SECONDS.labels(self.camera_id).observe(timings['total'])
+            AI_RESPONSES.labels(self.camera_id, res.status_code).inc()
+            if trace is not None:
+                # Response headers of the final attempt (retries included before it)
+                trace.mark('ttfb', time.monotonic() - (timings['total'] - timings['ttfb']))
+            log.info('ai_timings',
+                     f"[{self.camera_id}] AI round trip: {format_timings(timings)} "
+                     f"({len(payload['data']) // 1024} KB, {payload['size'][0]}x{payload['size'][1]}, q={payload['quality']})",
+                     camera=self.camera_id, bytes=len(payload['data']), quality=payload['quality'],
+                     **{k: timings.get(k) for k in ('connect', 'tls', 'ttfb', 'total', 'attempts')})
             
             if res.status_code == 200:
-                print(f"[🔥] AI Response: {res.text}")
+                log.debug('ai_response', f"[{self.camera_id}] AI Response: {res.text}",
+                          camera=self.camera_id, status=res.status_code)
                 
                 # Parse JSON response properly
+                boxes = []
                 try:
                     response_data = json.loads(res.text)
                     fire_detected = response_data.get('fire_detected', False)
+                    boxes = self.payload_builder.map_boxes(response_data.get('boxes', []),
+                                                           payload['transform'])
                 except json.JSONDecodeError:
                     # Fallback to text parsing if not JSON
                     response_text = res.text.lower()
                     fire_detected = 'fire_detected": true' in response_text or '"fire": true' in response_text
+                if trace is not None:
+                    trace.mark('parsed')
+                log.info('ai_response', f"[{self.camera_id}] AI: fire={fire_detected}, {len(boxes)} box(es)",
+                         camera=self.camera_id, status=res.status_code, fire_detected=fire_detected,
+                         boxes=len(boxes))
                 
-                # Update stats
-                fire_detection_stats['current_fire_detected'] = fire_detected
-                fire_detection_stats['last_ai_response'] = res.text
-                fire_detection_stats['ai_responses'].append({
-                    'timestamp': datetime.now(),
-                    'response': res.text,
-                    'fire_detected': fire_detected
-                })
-                
-                # Keep only last 10 responses
-                if len(fire_detection_stats['ai_responses']) > 10:
-                    fire_detection_stats['ai_responses'] = fire_detection_stats['ai_responses'][-10:]
-                
-                # Only print fire alert when fire is actually detected
-                if fire_detected:
-                    fire_detection_stats['total_detections'] += 1
-                    fire_detection_stats['last_detection'] = datetime.now()
-                    print("🚨 FIRE DETECTED BY AI! 🚨")
-                
-                return fire_detected
+                return {'fire_detected': fire_detected, 'boxes': boxes, 'response': res.text}
             else:
-                print(f"[⚠️] AI API Error: {res.status_code} - {res.text}")
-                fire_detection_stats['last_ai_response'] = f"API Error: {res.status_code}"
-                return None
+                log.warning('ai_error', f"[{self.camera_id}] AI API Error: {res.status_code} - {res.text[:200]}",
+                            camera=self.camera_id, status=res.status_code)
+                return {'fire_detected': None, 'response': f"API Error: {res.status_code}"}
                 
         except requests.exceptions.Timeout:
-            print("[!] AI API timeout - request took too long")
-            fire_detection_stats['last_ai_response'] = "API Timeout"
-            return None
+            log.warning('ai_error', f"[{self.camera_id}] AI API timeout - request took too long",
+                        camera=self.camera_id, status='timeout')
+            AI_RESPONSES.labels(self.camera_id, 'timeout').inc()
+            return {'fire_detected': None, 'response': "API Timeout"}
         except Exception as e:
-            print(f"[!] AI API error: {e}")
-            fire_detection_stats['last_ai_response'] = f"Error: {str(e)}"
-            return None
+            log.warning('ai_error', f"[{self.camera_id}] AI API error: {e}",
+                        camera=self.camera_id, status='error')
+            AI_RESPONSES.labels(self.camera_id, 'error').inc()
+            return {'fire_detected': None, 'response': f"Error: {str(e)}"}
+
+    def apply_ai_result(self, result, details=None, track=True):
+        """Update fire detection stats from a query_ai() result; returns (fire_detected, alerted)
+        
+        details is the frame's get_frame_details(). alerted is False for a
+        detection suppressed as a static fire; track=False (test checks)
+        alerts without touching the live fire tracker.
+        """
+        if result is None:
+            return None, False
+        
+        fire_detected = result['fire_detected']
+        response = result.get('response', result.get('text'))   # local backends return 'text'
+        self.fire_detection_stats['last_ai_response'] = response
+        if fire_detected is None:
+            return None, False
+        
+        # Update stats
+        self.fire_detection_stats['current_fire_detected'] = fire_detected
+        self.fire_detection_stats['last_boxes'] = result.get('boxes', [])
+        self.fire_detection_stats['ai_responses'].append({
+            'timestamp': datetime.now(),
+            'response': response,
+            'fire_detected': fire_detected
+        })
+        
+        # Keep only last 10 responses
+        if len(self.fire_detection_stats['ai_responses']) > 10:
+            self.fire_detection_stats['ai_responses'] = self.fire_detection_stats['ai_responses'][-10:]
+        
+        # Only print fire alert when fire is actually detected, and not again
+        # while every box stays where it was (static fire)
+        tracks = []
+        if track:
+            tracks = self.fire_tracker.update(self.fire_detection_stats['last_boxes'] if fire_detected else [])
+        if fire_detected and self.fire_tracker.all_static(tracks):
+            consecutive = min(t['static_count'] for t in tracks)
+            log.info('static_fire', f"[{self.camera_id}] Static fire position - same location "
+                     f"({len(tracks)} box(es), {consecutive} consecutive)",
+                     camera=self.camera_id, consecutive=consecutive, tracks=[t['id'] for t in tracks])
+        elif fire_detected:
+            DETECTIONS.labels(self.camera_id).inc()
+            self.fire_detection_stats['total_detections'] += 1
+            self.fire_detection_stats['last_detection'] = datetime.now()
+            features = {k: details[k] for k in ('fire_fraction', 'saturation_hist') if k in (details or {})}
+            log.warning('fire_detected', f"FIRE DETECTED BY AI! (Camera: {self.camera_id})",
+                        camera=self.camera_id, boxes=self.fire_detection_stats['last_boxes'], **features)
+            return fire_detected, True
+        
+        return fire_detected, False
+
+    def send_frame_to_ai(self, frame):
+        """Send frame to the detector and wait for the result (used by the test endpoint)"""
+        fire_detected, _ = self.apply_ai_result(self.detector.detect(frame), track=False)
+        return fire_detected
+
+    def on_ai_result(self, result, capture_ts, context):
+        """Dispatcher callback: results arrive in capture order, stale ones already dropped"""
+        trace = context.get('trace')
+        fire_detected, alerted = self.apply_ai_result(result, context.get('details'))
+        if fire_detected:
+            if alerted and trace is not None:
+                trace.mark('alert')   # Suppressed static fires are not alerts
+            self.change_gate.force()  # Keep checking while fire is visible, changed or not
+        self.fire_detection_stats['last_check_time'] = datetime.now()
+        if trace is not None and result is not None:
+            self.traces.finish(trace)
+
+    def get_detection_frame(self, timeout=1.0):
+        """Lease on the latest detection frame as (stream_name, FrameLease), or Nones
+        
+        Waits up to timeout for a freshly decoded frame, then falls back to
+        the newest one. The caller must release() the lease once it no
+        longer reads the frame.
+        """
+        # Get current frame directly from SUB stream (faster)
+        for stream_name in ('sub', 'main'):   # Fallback to main stream if sub not available
+            stream_data = self.active_streams.get(stream_name)
+            if stream_data is None:
+                continue
+            # Decode a fresh frame rather than scoring whatever a viewer last pulled
+            lease = self.request_frame(stream_data, stream_data['ring'].seq, timeout)
+            if lease is None:
+                lease = stream_data['ring'].lease()
+            if lease is not None:
+                return stream_name, lease
+        return None, None
+
+    def check_for_fire(self, dispatcher, frame_wait=1.0):
+        """Sample the current detection frame and submit it to the dispatcher
+        
+        frame_wait bounds the wait for a fresh frame (see get_detection_frame).
+        Returns False when no frame was available yet.
+        """
+        stream_name, lease = self.get_detection_frame(frame_wait)
+        if lease is None:
+            log.warning('no_frame', f"[{self.camera_id}] No sub or main stream frame available",
+                        camera=self.camera_id)
+            return False
+        handed_off = False
+        try:
+            current_frame, capture_ts = lease.frame, lease.ts
+            
+            # Get frame details; the thumbnail is shared with the change gate
+            thumb = self.change_gate.thumbnail(current_frame)
+            details = self.get_frame_details(current_frame, thumb)
+            self.log_frame_details(details)
+            self.fire_detection_stats['total_frames_processed'] += 1
+            
+            # Unchanged scene - skip the API call (still re-checked periodically)
+            if CHANGE_GATE_ENABLED and not self.change_gate.check(current_frame, thumb=thumb):
+                STATIC_SKIPS.labels(self.camera_id).inc()
+                gate = self.change_gate.stats()
+                log.info('static_skip', f"[{self.camera_id}] Static scene - skipping AI call "
+                         f"(change={gate['last_score']:.1f}, saved {gate['saved']}, sent {gate['sent']})",
+                         camera=self.camera_id, change=gate['last_score'], saved=gate['saved'], sent=gate['sent'])
+                return True
+            
+            # Hand off to the dispatcher; latest frame wins if the API is backed up.
+            # The lease goes with the frame and is released once it has been scored.
+            trace = FrameTrace(capture_ts, camera=self.camera_id)
+            handed_off = True   # from here the dispatcher calls done, even for a dropped frame
+            if not dispatcher.submit(current_frame, capture_ts, key=self.camera_id, done=lease.release,
+                                     camera=self, trace=trace, details=details):
+                FRAMES_DROPPED.labels(self.camera_id, stream_name, 'ai_busy').inc()
+                log.info('ai_busy', f"[{self.camera_id}] AI busy - replaced pending frame with newer one",
+                         camera=self.camera_id)
+            return True
+        finally:
+            if not handed_off:
+                lease.release()
 
     def fire_detection_worker(self):
-        """Background worker for fire detection - using sub stream for speed"""
+        """Background worker for fire detection - using sub stream for speed
+        
+        Frames are sampled on a fixed FIRE_CHECK_INTERVAL cadence and handed
+        to the inference dispatcher, so slow AI responses never delay the
+        next check.
+        """
         print("[🔥] Starting fire detection worker...")
-        print(f"🤖 Using AI model at: {API_ENDPOINT}")
-        print(f"📷 Camera ID: {CAMERA_ID}")
+        print(f"🤖 Using AI model at: {API_ENDPOINT if self.detector.name == 'remote' else LOCAL_MODEL_PATH}")
+        print(f"📷 Camera ID: {self.camera_id}")
         print(f"🔥 Using SUB STREAM for fire detection (faster, no lag)")
         print(f"🔥 Checking for fire every {FIRE_CHECK_INTERVAL} seconds...")
+        print(f"🤖 Up to {AI_MAX_IN_FLIGHT} AI request(s) in flight")
         
-        while FIRE_DETECTION_ENABLED:
+        self.dispatcher = create_dispatcher(self.camera_id)
+        
+        next_check = time.monotonic()
+        while FIRE_DETECTION_ENABLED and self.detection_running:
             try:
-                # Get current frame directly from SUB stream (faster)
-                if 'sub' in self.active_streams and self.active_streams['sub']['frame'] is not None:
-                    with self.frame_lock:
-                        current_frame = self.active_streams['sub']['frame'].copy()
-                    
-                    # Get frame details
-                    details = self.get_frame_details(current_frame)
-                    self.print_frame_details(details)
-                    fire_detection_stats['total_frames_processed'] += 1
-                    
-                    # Send frame directly to AI (no file saving)
-                    self.send_frame_to_ai(current_frame)
-                    fire_detection_stats['last_check_time'] = datetime.now()
-                else:
-                    # Fallback to main stream if sub not available
-                    if 'main' in self.active_streams and self.active_streams['main']['frame'] is not None:
-                        with self.frame_lock:
-                            current_frame = self.active_streams['main']['frame'].copy()
-                        
-                        # Get frame details
-                        details = self.get_frame_details(current_frame)
-                        self.print_frame_details(details)
-                        fire_detection_stats['total_frames_processed'] += 1
-                        
-                        # Send frame directly to AI (no file saving)
-                        self.send_frame_to_ai(current_frame)
-                        fire_detection_stats['last_check_time'] = datetime.now()
-                    else:
-                        print("[!] No sub or main stream frame available")
+                self.check_for_fire(self.dispatcher)
                 
-                # Wait for next check
-                time.sleep(FIRE_CHECK_INTERVAL)
+                # Wait for next check on a fixed cadence (no drift from API latency)
+                next_check += FIRE_CHECK_INTERVAL
+                now = time.monotonic()
+                if next_check < now:
+                    next_check = now
+                time.sleep(next_check - now)
                 
             except Exception as e:
                 print(f"[❌] Fire detection error: {e}")
                 time.sleep(5)  # Wait before retrying
+                next_check = time.monotonic()
+        
+        self.dispatcher.stop()
+    
+    def start_detection_stream(self):
+        """Start the stream used for fire detection (sub preferred, main fallback)"""
+        for stream_name in ('sub', 'main'):
+            if stream_name in self.streams:
+                return self.start_stream(stream_name)
+        return False
     
     def start_stream(self, stream_name):
         """Start a specific stream"""
@@ -758,163 +998,557 @@ class UniversalCameraStream:
         url = self.streams[stream_name]
         print(f"🎬 Starting {stream_name} stream...")
         
-        cap = cv2.VideoCapture(url)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        
-        if not cap.isOpened():
-            print(f"❌ Failed to start {stream_name} stream")
-            return False
+        if CAPTURE_PROCESSES:
+            # Decoder runs in a child process; a crash there never reaches this one
+            cap = CaptureProcess(bus_name(self.camera_id, stream_name, os.getpid()), open_capture, url,
+                                 self.camera_id, stream_name, slots=FRAME_BUS_SLOTS, frame_rate=FRAME_RATE,
+                                 on_demand=CAPTURE_MODE == 'on_demand',
+                                 reconnect_after=STREAM_RECONNECT_AFTER).start()
+            if not cap.wait_ready(2 * STREAM_RECONNECT_AFTER):
+                cap.release()
+                print(f"❌ Failed to start {stream_name} stream")
+                return False
+        else:
+            cap = open_capture(url)
+            if not cap.isOpened():
+                print(f"❌ Failed to start {stream_name} stream")
+                return False
         
+        # Everything below is per stream: capture, viewers and the fire check
+        # of one stream never wait on another stream's lock
+        ring = FrameRing(FRAME_RING_SLOTS, name=f'{self.camera_id}/{stream_name}')
         stream_data = {
             'cap': cap,
-            'frame': None,
+            'ring': ring,                                     # decoded frames, seq and decode time
             'running': True,
-            'thread': None
+            'thread': None,
+            'jpeg': None,                                     # encode-once cache shared by all viewers
+            'jpeg_seq': 0,
+            'encode_lock': threading.Lock(),
+            'demand': cap.demand if CAPTURE_PROCESSES else threading.Event(),  # set by consumers wanting a new frame
+            'grabbed': 0,                                     # packets pulled off the socket
+            'decoded': 0                                      # frames actually decoded
         }
         
+        captured = FRAMES_CAPTURED.labels(self.camera_id, stream_name)
+        capture_errors = FRAMES_DROPPED.labels(self.camera_id, stream_name, 'capture_error')
+        
+        def reconnect():
+            # Stream stalled (camera reboot, network drop): reopen it
+            RECONNECTS.labels(self.camera_id, stream_name).inc()
+            print(f"🔄 [{self.camera_id}] {stream_name} stream stalled - reconnecting...")
+            stream_data['cap'].release()
+            stream_data['cap'] = open_capture(url)
+        
+        def decode(read):
+            # Decode straight into a free ring slot; no per-frame allocation
+            index, buf = ring.reserve()
+            ret, frame = read(buf)
+            if not ret or frame is None:
+                ring.cancel(index)
+                return False
+            ring.publish(index, frame)
+            stream_data['decoded'] += 1
+            captured.inc()
+            return True
+        
         def update_frames():
+            last_ok = time.monotonic()
             while stream_data['running']:
-                ret, frame = stream_data['cap'].read()
+                ret = decode(stream_data['cap'].read)
+                stream_data['grabbed'] += 1
                 if ret:
-                    # Auto-resize large frames for web
-                    height, width = frame.shape[:2]
-                    if width > 1920:
-                        scale = 1920 / width
-                        new_width = int(width * scale)
-                        new_height = int(height * scale)
-                        frame = cv2.resize(frame, (new_width, new_height))
-                    
-                    with self.frame_lock:
-                        stream_data['frame'] = frame
+                    last_ok = time.monotonic()
+                else:
+                    capture_errors.inc()
+                    if time.monotonic() - last_ok > STREAM_RECONNECT_AFTER and stream_data['running']:
+                        reconnect()
+                        last_ok = time.monotonic()
                 time.sleep(1.0 / FRAME_RATE)
         
-        stream_data['thread'] = threading.Thread(target=update_frames, daemon=True)
+        def grab_frames():
+            # Drain the RTSP socket at wire rate so the buffer never builds up
+            # latency, but only decode when a viewer or the fire check asks
+            min_interval = 1.0 / FRAME_RATE
+            next_decode = 0.0
+            last_ok = time.monotonic()
+            while stream_data['running']:
+                if not stream_data['cap'].grab():
+                    capture_errors.inc()
+                    if time.monotonic() - last_ok > STREAM_RECONNECT_AFTER and stream_data['running']:
+                        reconnect()
+                        last_ok = time.monotonic()
+                    time.sleep(0.01)
+                    continue
+                stream_data['grabbed'] += 1
+                last_ok = time.monotonic()
+                
+                now = time.monotonic()
+                if stream_data['demand'].is_set() and now >= next_decode:
+                    stream_data['demand'].clear()
+                    if decode(stream_data['cap'].retrieve):
+                        # Pace to FRAME_RATE on average: a per-packet gap check makes a
+                        # source slightly faster than FRAME_RATE decode every other packet
+                        next_decode = max(next_decode + min_interval, now - min_interval)
+        
+        def follow_bus():
+            # The capture process decodes into shared memory; copy each new
+            # frame into the ring and restart the process if it dies
+            proc = stream_data['cap']
+            last_seq = 0
+            while stream_data['running']:
+                if not proc.alive:
+                    if not stream_data['running']:
+                        break
+                    if proc.exitcode != EXIT_RESIZED:
+                        RECONNECTS.labels(self.camera_id, stream_name).inc()
+                        print(f"🔄 [{self.camera_id}] {stream_name} capture process exited "
+                              f"({proc.exitcode}) - restarting...")
+                        time.sleep(1)
+                    proc.restart()
+                    last_seq = 0
+                    continue
+                # Clear before reading: a frame published after the read sets it again
+                proc.published.clear()
+                index, buf = ring.reserve()
+                got = proc.read(buf, last_seq)
+                if got is None:
+                    ring.cancel(index)
+                    proc.published.wait(0.5)
+                    continue
+                frame, last_seq, ts = got
+                ring.publish(index, frame, ts)
+                bus = proc.attach()
+                stream_data['grabbed'] = bus.header()['grabbed'] if bus is not None else 0
+                stream_data['decoded'] += 1
+                captured.inc()
+        
+        stream_data['demand'].set()  # Always decode the first frame
+        if CAPTURE_PROCESSES:
+            capture_loop = follow_bus
+        else:
+            capture_loop = grab_frames if CAPTURE_MODE == 'on_demand' else update_frames
+        stream_data['thread'] = threading.Thread(target=capture_loop, daemon=True)
         stream_data['thread'].start()
         
         self.active_streams[stream_name] = stream_data
         print(f"✅ {stream_name} stream started")
         
         # Start fire detection if this is the first stream and fire detection is enabled
-        if FIRE_DETECTION_ENABLED and self.fire_detection_thread is None:
+        if FIRE_DETECTION_ENABLED and self.standalone and self.fire_detection_thread is None:
             self.fire_detection_thread = threading.Thread(target=self.fire_detection_worker, daemon=True)
             self.fire_detection_thread.start()
         
         return True
     
-    def get_frame(self, stream_name):
-        """Get current frame from stream"""
+    def request_frame(self, stream_data, last_seq, timeout=1.0):
+        """Ask the capture thread for a frame newer than last_seq and wait for it
+        
+        Returns a FrameLease (release it when done), or None on timeout /
+        stopped stream.
+        """
+        ring = stream_data['ring']
+        if ring.seq <= last_seq:
+            stream_data['demand'].set()
+        return ring.wait(last_seq, timeout)
+    
+    def get_jpeg(self, stream_name, last_seq=0, timeout=1.0):
+        """Wait for a frame newer than last_seq and return (seq, jpeg_bytes)
+        
+        Each frame is JPEG-encoded at most once; every viewer of the stream
+        shares the cached bytes. Returns (last_seq, None) on timeout.
+        """
         if stream_name not in self.active_streams:
             if not self.start_stream(stream_name):
-                return None
+                return last_seq, None
         
         stream_data = self.active_streams[stream_name]
-        if stream_data['frame'] is not None:
-            with self.frame_lock:
-                ret, buffer = cv2.imencode('.jpg', stream_data['frame'], 
-                                         [cv2.IMWRITE_JPEG_QUALITY, STREAM_QUALITY])
-                return buffer.tobytes()
-        return None
+        lease = self.request_frame(stream_data, last_seq, timeout)
+        if lease is None:
+            return last_seq, None
+        
+        # Encode outside the ring lock so capture threads never wait on JPEG work;
+        # the lease keeps the slot from being reused mid-encode
+        with lease, stream_data['encode_lock']:
+            seq = lease.seq
+            if stream_data['jpeg_seq'] < seq:
+                t0 = time.perf_counter()
+                ret, buffer = cv2.imencode('.jpg', resize_for_web(lease.frame),
+                                           [cv2.IMWRITE_JPEG_QUALITY, STREAM_QUALITY])
+                ENCODE_SECONDS.labels(self.camera_id, 'web').observe(time.perf_counter() - t0)
+                if ret:
+                    stream_data['jpeg'] = buffer.tobytes()
+                    stream_data['jpeg_seq'] = seq
+            return stream_data['jpeg_seq'], stream_data['jpeg']
+    
+    def get_frame(self, stream_name):
+        """Get current frame from stream as JPEG bytes"""
+        _, jpeg = self.get_jpeg(stream_name)
+        return jpeg
     
     def stop_all_streams(self):
         """Stop all active streams"""
-        global FIRE_DETECTION_ENABLED
-        FIRE_DETECTION_ENABLED = False  # Stop fire detection
+        self.detection_running = False  # Stop fire detection
         
         for stream_name, stream_data in self.active_streams.items():
             stream_data['running'] = False
+            stream_data['ring'].close()  # Release waiting viewers
+        for stream_name, stream_data in self.active_streams.items():
+            # Release only once the capture thread is out of grab()/retrieve()
+            # (or off the bus), or the decoder is freed under it
+            if stream_data['thread'] is not None:
+                stream_data['thread'].join()
             if stream_data['cap']:
                 stream_data['cap'].release()
         self.active_streams.clear()
 
+# ═══════════════════════════════════════════════════════════════
+# MULTI-CAMERA SUPERVISOR
+# ═══════════════════════════════════════════════════════════════
+
+def create_detector(backend, query):
+    """Detector backend for one camera; "local" cameras share one batched model"""
+    return create_backend(backend, query, local_model=LOCAL_MODEL_PATH,
+                          input_size=LOCAL_INPUT_SIZE, conf_threshold=LOCAL_CONF_THRESHOLD,
+                          labels=LOCAL_LABELS, fire_labels=LOCAL_FIRE_LABELS, threads=LOCAL_THREADS,
+                          batch_size=LOCAL_BATCH_SIZE, batch_wait=LOCAL_BATCH_WAIT, engine=LOCAL_ENGINE)
+
+def create_dispatcher(name, max_in_flight=AI_MAX_IN_FLIGHT):
+    """Inference dispatcher that routes each result back to the camera that sent it"""
+    return InferenceDispatcher(
+        infer=lambda frame, camera, trace=None, **context: camera.detector.detect(frame, trace),
+        on_result=lambda result, capture_ts, context: context['camera'].on_ai_result(result, capture_ts, context),
+        max_in_flight=max_in_flight,
+        max_frame_age=AI_MAX_FRAME_AGE,
+        name=name
+    )
+
+class CameraSupervisor:
+    """Run many RTSP cameras in one process
+    
+    Every camera keeps its own streams and stats; a single scheduler thread
+    spreads fire checks across FIRE_CHECK_INTERVAL and feeds one shared
+    inference dispatcher, and create_app() serves all cameras from one
+    Flask server.
+    """
+    
+    def __init__(self, cameras):
+        self.cameras = {cam.camera_id: cam for cam in cameras}
+        self.dispatcher = None
+        self.scheduler_thread = None
+        self.running = False
+    
+    @classmethod
+    def from_inventory(cls, path):
+        """Load cameras from a JSON inventory
+        
+        Either a list or {"cameras": [...]}; each entry needs "id" and "ip" and
+        may override "username", "password", "streams" ({name: rtsp_url},
+        skips auto-detection), "rois" (normalised [x1, y1, x2, y2] list) and
+        "backend" ("remote" or "local", default DETECTOR_BACKEND).
+        """
+        with open(path) as f:
+            inventory = json.load(f)
+        entries = inventory['cameras'] if isinstance(inventory, dict) else inventory
+        
+        cameras = []
+        for entry in entries:
+            cam = UniversalCameraStream(
+                camera_id=entry['id'],
+                camera_ip=entry['ip'],
+                username=entry.get('username', USERNAME),
+                password=entry.get('password', PASSWORD),
+                standalone=False,
+                rois=entry.get('rois'),
+                backend=entry.get('backend', DETECTOR_BACKEND)
+            )
+            if entry.get('streams'):
+                cam.streams = dict(entry['streams'])
+            cameras.append(cam)
+        
+        ids = [cam.camera_id for cam in cameras]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Duplicate camera ids in {path}")
+        return cls(cameras)
+    
+    def probe_all(self):
+        """Auto-detect streams for cameras without explicit URLs (in parallel)"""
+        to_probe = [cam for cam in self.cameras.values() if not cam.streams]
+        if to_probe:
+            print(f"🔍 Probing {len(to_probe)} camera(s)...")
+            with ThreadPoolExecutor(max_workers=CAMERA_PROBE_WORKERS) as pool:
+                list(pool.map(lambda cam: cam.find_working_streams(), to_probe))
+        
+        online = [camera_id for camera_id, cam in self.cameras.items() if cam.streams]
+        for camera_id, cam in self.cameras.items():
+            if not cam.streams:
+                print(f"   ❌ [{camera_id}] no working RTSP stream - skipped")
+        return online
+    
+    def start(self):
+        """Start detection streams and the shared fire check scheduler"""
+        self.running = True
+        for cam in self.cameras.values():
+            if cam.streams:
+                cam.start_detection_stream()
+        
+        if FIRE_DETECTION_ENABLED:
+            # Cameras need a worker each to land in the same batch
+            max_in_flight = max(AI_MAX_IN_FLIGHT, AI_BATCH_SIZE)
+            if any(cam.detector.name == 'local' for cam in self.cameras.values()):
+                max_in_flight += LOCAL_BATCH_SIZE
+            self.dispatcher = create_dispatcher('supervisor', max_in_flight)
+            self.scheduler_thread = threading.Thread(target=self.detection_scheduler, daemon=True)
+            self.scheduler_thread.start()
+    
+    def detection_scheduler(self):
+        """Check every camera once per FIRE_CHECK_INTERVAL, staggered to avoid bursts"""
+        cams = [cam for cam in self.cameras.values() if cam.streams]
+        if not cams:
+            return
+        
+        print(f"[🔥] Scheduling fire checks for {len(cams)} camera(s) every {FIRE_CHECK_INTERVAL}s")
+        print(f"🤖 Up to {self.dispatcher.max_in_flight} AI request(s) in flight")
+        step = FIRE_CHECK_INTERVAL / len(cams)
+        next_check = time.monotonic()
+        while self.running and FIRE_DETECTION_ENABLED:
+            for cam in cams:
+                if not self.running:
+                    break
+                try:
+                    # A stalled camera must not hold up the checks of the others
+                    cam.check_for_fire(self.dispatcher, frame_wait=SCHEDULER_FRAME_WAIT)
+                except Exception as e:
+                    print(f"[❌] [{cam.camera_id}] Fire detection error: {e}")
+                
+                next_check += step
+                now = time.monotonic()
+                if next_check < now:
+                    next_check = now
+                time.sleep(next_check - now)
+    
+    def stop(self):
+        """Stop the scheduler and every camera"""
+        self.running = False
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        for cam in self.cameras.values():
+            cam.stop_all_streams()
+
 # ═══════════════════════════════════════════════════════════════
 # FLASK WEB APPLICATION
 # ═══════════════════════════════════════════════════════════════
 
-# Global camera manager
-camera = UniversalCameraStream()
+# Global camera manager (single-camera mode)
+camera = UniversalCameraStream(stats=fire_detection_stats)
 
-def create_app():
+# Set in multi-camera mode
+supervisor = None
+
+def create_app(cameras=None):
+    """Web app serving one or many cameras
+    
+    Each camera is available under /cam/<camera_id>/...; the un-prefixed
+    routes serve the first camera so single-camera links keep working.
+    """
+    if cameras is None:
+        cameras = {camera.camera_id: camera}
+    default_camera_id = next(iter(cameras))
+    
     app = Flask(__name__)
     app.logger.disabled = True
     
-    @app.route('/')
-    def index():
+    def get_camera(camera_id):
+        cam = cameras.get(camera_id or default_camera_id)
+        if cam is None:
+            abort(404)
+        return cam
+    
+    @app.route('/', defaults={'camera_id': None})
+    @app.route('/cam/<camera_id>/')
+    def index(camera_id):
+        cam = get_camera(camera_id)
         return render_template_string(HTML_TEMPLATE,
-            camera_ip=CAMERA_IP,
-            camera_id=CAMERA_ID,
+            camera_ip=cam.camera_ip,
+            camera_id=cam.camera_id,
             web_port=WEB_PORT,
-            start_time=camera.start_time.strftime("%H:%M:%S")
+            start_time=cam.start_time.strftime("%H:%M:%S"),
+            base_path=f"/cam/{cam.camera_id}" if camera_id else ""
         )
     
-    @app.route('/video_feed/<stream>')
-    def video_feed(stream):
+    @app.route('/video_feed/<stream>', defaults={'camera_id': None})
+    @app.route('/cam/<camera_id>/video_feed/<stream>')
+    def video_feed(stream, camera_id):
+        cam = get_camera(camera_id)
+        sent = VIEWER_BYTES.labels(cam.camera_id, stream)
+        viewers = VIEWERS.labels(cam.camera_id, stream)
+        viewer = request.remote_addr   # per-client bytes go to the log, not a metric label
+        
         def generate():
-            while True:
-                frame = camera.get_frame(stream)
-                if frame:
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-                time.sleep(1.0 / FRAME_RATE)
+            # Unknown stream or camera unreachable: end instead of polling forever
+            if not cam.start_stream(stream):
+                return
+            stream_data = cam.active_streams.get(stream)
+            seq = 0
+            client_bytes = 0
+            viewers.inc()
+            try:
+                while stream_data is not None and stream_data['running']:   # False once stopped
+                    # Blocks until the capture thread publishes a newer frame
+                    seq, frame = cam.get_jpeg(stream, seq)
+                    if not frame:
+                        time.sleep(1.0 / FRAME_RATE)   # No new frame yet: back off, don't spin
+                        continue
+                    chunk = (b'--frame\r\n'
+                             b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+                    sent.inc(len(chunk))
+                    client_bytes += len(chunk)
+                    yield chunk
+            finally:
+                viewers.dec()   # client disconnected
+                log.info('viewer', f"[{cam.camera_id}] {stream} viewer {viewer} left after {client_bytes} bytes",
+                         camera=cam.camera_id, stream=stream, viewer=viewer, bytes=client_bytes)
         
         return Response(generate(),
                        mimetype='multipart/x-mixed-replace; boundary=frame')
     
-    @app.route('/api/status')
-    def api_status():
+    @app.route('/api/status', defaults={'camera_id': None})
+    @app.route('/cam/<camera_id>/api/status')
+    def api_status(camera_id):
+        cam = get_camera(camera_id)
         return jsonify({
-            'camera_ip': CAMERA_IP,
-            'camera_id': CAMERA_ID,
-            'streams': list(camera.streams.keys()),
-            'active_streams': list(camera.active_streams.keys()),
-            'uptime': str(datetime.now() - camera.start_time),
+            'camera_ip': cam.camera_ip,
+            'camera_id': cam.camera_id,
+            'streams': list(cam.streams.keys()),
+            'active_streams': list(cam.active_streams.keys()),
+            'uptime': str(datetime.now() - cam.start_time),
             'fire_detection_enabled': FIRE_DETECTION_ENABLED
         })
     
-    @app.route('/api/fire_status')
-    def api_fire_status():
-        return jsonify({
-            'fire_detected': fire_detection_stats['current_fire_detected'],
-            'last_check': fire_detection_stats['last_check_time'].strftime("%H:%M:%S") if fire_detection_stats['last_check_time'] else None,
-            'total_checks': fire_detection_stats['total_frames_processed'],
-            'total_detections': fire_detection_stats['total_detections'],
-            'last_detection': fire_detection_stats['last_detection'].strftime("%H:%M:%S") if fire_detection_stats['last_detection'] else None,
-            'last_ai_response': fire_detection_stats['last_ai_response']
-        })
+    @app.route('/api/fire_status', defaults={'camera_id': None})
+    @app.route('/cam/<camera_id>/api/fire_status')
+    def api_fire_status(camera_id):
+        return jsonify(fire_status(get_camera(camera_id)))
     
-    @app.route('/api/test_fire_detection')
-    def api_test_fire_detection():
+    @app.route('/api/test_fire_detection', defaults={'camera_id': None})
+    @app.route('/cam/<camera_id>/api/test_fire_detection')
+    def api_test_fire_detection(camera_id):
+        cam = get_camera(camera_id)
         try:
-            # Use sub stream for testing (same as fire detection worker)
-            if 'sub' in camera.active_streams and camera.active_streams['sub']['frame'] is not None:
-                with camera.frame_lock:
-                    current_frame = camera.active_streams['sub']['frame'].copy()
-                result = camera.send_frame_to_ai(current_frame)
-                return jsonify({'success': True, 'fire_detected': result, 'stream_used': 'sub'})
-            # Fallback to main stream
-            elif 'main' in camera.active_streams and camera.active_streams['main']['frame'] is not None:
-                with camera.frame_lock:
-                    current_frame = camera.active_streams['main']['frame'].copy()
-                result = camera.send_frame_to_ai(current_frame)
-                return jsonify({'success': True, 'fire_detected': result, 'stream_used': 'main'})
-            else:
+            # Use sub stream for testing (same as fire detection worker), main as fallback
+            stream_used, lease = cam.get_detection_frame()
+            if lease is None:
                 return jsonify({'success': False, 'error': 'No sub or main stream frame available'})
+            with lease:
+                result = cam.send_frame_to_ai(lease.frame)
+            return jsonify({'success': True, 'fire_detected': result, 'stream_used': stream_used})
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)})
     
+    @app.route('/api/metrics', defaults={'camera_id': None})
+    @app.route('/cam/<camera_id>/api/metrics')
+    def api_metrics(camera_id):
+        cam = get_camera(camera_id)
+        dispatcher = cam.dispatcher or (supervisor.dispatcher if supervisor is not None else None)
+        return jsonify({
+            'camera_id': cam.camera_id,
+            'latency': cam.traces.summary(),
+            'dispatcher': dispatcher.stats() if dispatcher is not None else None,
+            'detector': cam.detector.stats(),
+            'frames': {name: dict(data['ring'].stats(), bus=data['cap'].stats() if CAPTURE_PROCESSES else None)
+                       for name, data in list(cam.active_streams.items())},
+            'fire_tracker': cam.fire_tracker.stats(),
+            'ai_client': ai_client.stats()
+        })
+    
+    @app.route('/metrics')
+    def metrics():
+        # Prometheus scrape target: every camera served by this process
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+    
+    @app.route('/api/cameras')
+    def api_cameras():
+        return jsonify({
+            camera_id: {
+                'camera_ip': cam.camera_ip,
+                'streams': list(cam.streams.keys()),
+                'active_streams': list(cam.active_streams.keys()),
+                'url': f"/cam/{camera_id}/",
+                **fire_status(cam)
+            }
+            for camera_id, cam in cameras.items()
+        })
+    
     return app
 
+def fire_status(cam):
+    """JSON-friendly fire detection summary for one camera"""
+    stats = cam.fire_detection_stats
+    return {
+        'fire_detected': stats['current_fire_detected'],
+        'last_check': stats['last_check_time'].strftime("%H:%M:%S") if stats['last_check_time'] else None,
+        'total_checks': stats['total_frames_processed'],
+        'total_detections': stats['total_detections'],
+        'last_detection': stats['last_detection'].strftime("%H:%M:%S") if stats['last_detection'] else None,
+        'last_ai_response': stats['last_ai_response'],
+        'boxes': stats['last_boxes'],
+        'ai_calls_sent': cam.change_gate.counters['sent'],
+        'ai_calls_saved': cam.change_gate.counters['saved']
+    }
+
 # ═══════════════════════════════════════════════════════════════
 # SIGNAL HANDLERS AND MAIN FUNCTION
 # ═══════════════════════════════════════════════════════════════
 
 def signal_handler(signum, frame):
     print("\n🛑 Stopping all streams and fire detection...")
-    camera.stop_all_streams()
+    if supervisor is not None:
+        supervisor.stop()
+    else:
+        camera.stop_all_streams()
     print("👋 Goodbye!")
     sys.exit(0)
 
+def run_multi_camera(inventory_path):
+    """Run every camera from the inventory file behind one web server"""
+    global supervisor
+    
+    print("🤖 RTSP AI Fire Detection System (multi-camera)")
+    print("=" * 60)
+    print(f"📋 Inventory: {inventory_path}")
+    print(f"🌐 Web Port: {WEB_PORT}")
+    print(f"🤖 AI Endpoint: {API_ENDPOINT}")
+    print(f"🔥 Fire Detection: {'Enabled' if FIRE_DETECTION_ENABLED else 'Disabled'}")
+    print("=" * 60)
+    
+    supervisor = CameraSupervisor.from_inventory(inventory_path)
+    online = supervisor.probe_all()
+    if not online:
+        print("\n❌ No camera in the inventory has a working RTSP stream!")
+        return 1
+    
+    print(f"\n✅ {len(online)}/{len(supervisor.cameras)} camera(s) online")
+    supervisor.start()
+    
+    app = create_app(supervisor.cameras)
+    print(f"\n🌐 Starting web server with AI fire detection...")
+    print(f"✅ Open http://localhost:{WEB_PORT}/cam/<camera_id>/ to view a camera")
+    print(f"📋 Camera list: http://localhost:{WEB_PORT}/api/cameras")
+    print(f"🔥 Fire detection checks every {FIRE_CHECK_INTERVAL} seconds per camera")
+    print("⏹️  Press Ctrl+C to stop")
+    
+    try:
+        app.run(host='0.0.0.0', port=WEB_PORT, debug=False, threaded=True)
+    except KeyboardInterrupt:
+        signal_handler(signal.SIGINT, None)
+
 def main():
     signal.signal(signal.SIGINT, signal_handler)
+    setup_logging(LOG_FORMAT, LOG_LEVEL)
+    
+    inventory_path = sys.argv[1] if len(sys.argv) > 1 else CAMERA_INVENTORY
+    if inventory_path:
+        return run_multi_camera(inventory_path)
     
     print("🤖 RTSP AI Fire Detection System")
     print("=" * 60)
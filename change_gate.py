@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Scene-change gate for fire detection
+Skips AI calls while the scene is unchanged, judged on a small grayscale
+thumbnail against a running background model, with a forced re-check so a
+static scene is still sampled periodically.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════
+# CHANGE GATE
+# ═══════════════════════════════════════════════════════════════
+
+class ChangeGate:
+    """Decide whether a sampled frame is worth an inference call
+
+    check() returns True when the frame should be sent: the first frame,
+    whenever the mean absolute difference between the thumbnail and the
+    background model reaches threshold, after recheck_interval seconds
+    without a call, or once after force(). A frame only counts as static
+    after static_after consecutive low-change samples.
+    """
+
+    def __init__(self, threshold=5.0, static_after=3, recheck_interval=60.0,
+                 thumb_width=64, alpha=0.1, name='gate'):
+        self.threshold = threshold              # mean abs diff (0-255 gray levels)
+        self.static_after = max(1, int(static_after))
+        self.recheck_interval = recheck_interval
+        self.thumb_width = thumb_width
+        self.alpha = alpha                      # background learning rate
+        self.name = name
+
+        self.lock = threading.Lock()
+        self.background = None                  # float32 running average
+        self.last_sent = None
+        self.forced = False
+        self.static_count = 0
+        self.last_score = None
+        self.last_reason = None
+        self.last_thumbnail = None              # small BGR copy, reusable by later stages
+        self.last_gray = None
+        self.counters = {'checked': 0, 'sent': 0, 'saved': 0, 'forced': 0}
+
+    def thumbnail(self, frame):
+        """Downscaled (BGR, gray) pair used for the change score"""
+        h, w = frame.shape[:2]
+        tw = min(self.thumb_width, w)
+        th = max(1, int(round(h * tw / w)))
+        small = cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return small, gray
+
+    def check(self, frame, now=None, thumb=None):
+        """True if this frame should be sent for inference
+
+        thumb is this frame's thumbnail() pair when the caller already made
+        one (e.g. for frame statistics).
+        """
+        now = time.monotonic() if now is None else now
+        small, gray = self.thumbnail(frame) if thumb is None else thumb
+
+        with self.lock:
+            self.counters['checked'] += 1
+            self.last_thumbnail, self.last_gray = small, gray
+
+            if self.background is None or self.background.shape != gray.shape:
+                self.background = gray.astype(np.float32)
+                score, reason = None, 'first'
+            else:
+                score = float(cv2.mean(cv2.absdiff(gray.astype(np.float32), self.background))[0])
+                cv2.accumulateWeighted(gray, self.background, self.alpha)
+                if score >= self.threshold:
+                    self.static_count = 0
+                    reason = 'changed'
+                else:
+                    self.static_count += 1
+                    reason = 'changed' if self.static_count < self.static_after else 'static'
+
+            if reason == 'static':
+                if self.forced:
+                    reason = 'forced'
+                elif self.last_sent is None or now - self.last_sent >= self.recheck_interval:
+                    reason = 'recheck'
+
+            self.last_score = score
+            self.last_reason = reason
+            if reason == 'static':
+                self.counters['saved'] += 1
+                return False
+
+            if reason in ('forced', 'recheck'):
+                self.counters['forced'] += 1
+            self.forced = False
+            self.last_sent = now
+            self.counters['sent'] += 1
+            return True
+
+    def force(self):
+        """Send the next frame regardless of change (e.g. while fire is detected)"""
+        with self.lock:
+            self.forced = True
+
+    def stats(self):
+        with self.lock:
+            return {
+                'name': self.name,
+                'static_count': self.static_count,
+                'last_score': self.last_score,
+                'last_reason': self.last_reason,
+                **self.counters
+            }
@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+"""
+Pluggable fire detector backends
+Every backend answers detect(frame) with the fire-frame-receiver contract,
+so a camera can switch between the Lambda endpoint and a CPU model running
+on this box (OpenCV DNN or ONNX Runtime) without touching the pipeline.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from event_log import EventLogger
+from prom_metrics import LOCAL_BATCH_SIZE, LOCAL_INFERENCE_SECONDS
+
+try:
+    import onnxruntime              # Optional: faster CPU kernels than OpenCV DNN
+except ImportError:
+    onnxruntime = None
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+BACKENDS = ('remote', 'local')
+LETTERBOX_FILL = 114            # YOLO training pad colour
+
+log = EventLogger('detector', policies={'local_batch': {'sample_every': 20}})
+
+# ═══════════════════════════════════════════════════════════════
+# BACKEND INTERFACE
+# ═══════════════════════════════════════════════════════════════
+
+class DetectorBackend:
+    """Fire detector: detect(frame) -> {'fire_detected', 'boxes', ...}
+
+    frame is a BGR ndarray. 'boxes' are [x1, y1, x2, y2, label, score]
+    in source-frame pixels (the endpoint's JSON after map_boxes), and
+    'fire_detected' is None when the backend failed. Backends are called
+    from several dispatcher workers at once.
+    """
+    name = 'detector'
+
+    def detect(self, frame, trace=None):
+        raise NotImplementedError
+
+    def stats(self):
+        return {'backend': self.name}
+
+    def close(self):
+        pass
+
+
+class RemoteBackend(DetectorBackend):
+    """fire-frame-receiver, through the pipeline's own query function
+    (payload encoding, pooled client, retries and metrics stay there)"""
+    name = 'remote'
+
+    def __init__(self, query):
+        self.query = query
+
+    def detect(self, frame, trace=None):
+        return self.query(frame, trace)
+
+# ═══════════════════════════════════════════════════════════════
+# LOCAL INFERENCE ENGINES
+# ═══════════════════════════════════════════════════════════════
+
+class _OpenCVEngine:
+    """cv2.dnn forward pass; thread count is process-wide in OpenCV"""
+    name = 'opencv'
+
+    def __init__(self, model_path, threads):
+        cv2.setNumThreads(threads)
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.batch_limit = None         # learned on the first batch the model rejects
+
+    def forward(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward()
+
+
+class _OnnxRuntimeEngine:
+    """onnxruntime CPU session with its own intra-op thread pool"""
+    name = 'onnxruntime'
+
+    def __init__(self, model_path, threads):
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, options,
+                                                    providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch = model_input.shape[0]
+        self.batch_limit = batch if isinstance(batch, int) else None   # None: dynamic batch
+
+    def forward(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+def _open_engine(engine, model_path, threads):
+    if engine == 'auto':
+        engine = 'onnxruntime' if onnxruntime is not None else 'opencv'
+    if engine == 'onnxruntime':
+        if onnxruntime is None:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime) - "
+                               "use engine 'opencv'")
+        return _OnnxRuntimeEngine(model_path, threads)
+    if engine == 'opencv':
+        return _OpenCVEngine(model_path, threads)
+    raise ValueError(f"Unknown inference engine: {engine}")
+
+# ═══════════════════════════════════════════════════════════════
+# LOCAL BACKEND
+# ═══════════════════════════════════════════════════════════════
+
+class LocalDNNBackend(DetectorBackend):
+    """YOLO-style ONNX fire model on the CPU, batched across callers
+
+    detect() queues the frame and waits; one inference thread takes up to
+    batch_size queued frames (waiting at most batch_wait seconds after the
+    first) and runs them in a single forward pass, so cameras sharing the
+    backend share batches. Accepts YOLOv5 (N, 5 + classes) and YOLOv8
+    (4 + classes, N) output layouts. threads sets the engine's CPU threads.
+    """
+    name = 'local'
+
+    def __init__(self, model_path, input_size=640, conf_threshold=0.35, nms_threshold=0.45,
+                 labels=('fire', 'smoke'), fire_labels=('fire',), threads=2, batch_size=4,
+                 batch_wait=0.05, engine='auto'):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Local fire model not found: {model_path}")
+        self.model_path = model_path
+        self.input_size = int(input_size)
+        self.conf_threshold = conf_threshold
+        self.nms_threshold = nms_threshold
+        self.labels = tuple(labels)
+        self.fire_labels = set(fire_labels)
+        self.threads = max(1, int(threads))
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.engine = _open_engine(engine, model_path, self.threads)
+
+        self.queue = []
+        self.cond = threading.Condition()
+        self.running = True
+        self.counters = {'frames': 0, 'batches': 0, 'errors': 0}
+        self.last_batch = None
+        self.last_infer = None
+        self.worker = threading.Thread(target=self._worker, name='local-detector', daemon=True)
+        self.worker.start()
+        print(f"[✓] Local fire detector: {os.path.basename(model_path)} via {self.engine.name} "
+              f"({self.threads} thread(s), batch ≤ {self.batch_size})")
+
+    def detect(self, frame, trace=None):
+        if trace is not None:
+            trace.mark('dequeue')
+        request = {'frame': frame, 'trace': trace, 'done': threading.Event(), 'result': None}
+        with self.cond:
+            if not self.running:
+                return None
+            self.queue.append(request)
+            self.cond.notify()
+        request['done'].wait()
+        return request['result']
+
+    # ---- batching --------------------------------------------------------
+
+    def _next_batch(self):
+        with self.cond:
+            while self.running and not self.queue:
+                self.cond.wait()
+            if not self.running:
+                return None
+            # Give other cameras a moment to join the batch
+            deadline = time.monotonic() + self.batch_wait
+            while self.running and len(self.queue) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = self.queue[:self.batch_size]
+            del self.queue[:self.batch_size]
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                results = self._run_batch(batch)
+            except Exception as e:
+                self.counters['errors'] += 1
+                print(f"[!] Local detector error: {e}")
+                results = [{'fire_detected': None, 'boxes': [], 'text': f"Local detector error: {e}"}
+                           for _ in batch]
+            for request, result in zip(batch, results):
+                request['result'] = result
+                request['done'].set()
+
+    # ---- inference -------------------------------------------------------
+
+    def letterbox(self, frame):
+        """Square input_size image plus (scale, pad_x, pad_y) to map boxes back"""
+        h, w = frame.shape[:2]
+        size = self.input_size
+        scale = min(size / w, size / h)
+        nw, nh = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (size - nw) // 2, (size - nh) // 2
+        canvas = np.full((size, size, 3), LETTERBOX_FILL, dtype=np.uint8)
+        canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(frame, (nw, nh),
+                                                                interpolation=cv2.INTER_LINEAR)
+        return canvas, (scale, pad_x, pad_y)
+
+    def _forward(self, blob):
+        """Whole batch at once, or frame by frame for fixed-batch models"""
+        limit = self.engine.batch_limit
+        if limit is None or blob.shape[0] <= limit:
+            try:
+                return self.engine.forward(blob)
+            except cv2.error:
+                if blob.shape[0] == 1:
+                    raise
+                self.engine.batch_limit = limit = 1
+                print("[!] Local model has a fixed batch size - running frames one by one")
+        return np.concatenate([self.engine.forward(blob[i:i + limit])
+                               for i in range(0, blob.shape[0], limit)])
+
+    def _run_batch(self, batch):
+        t0 = time.perf_counter()
+        images, transforms = [], []
+        for request in batch:
+            image, transform = self.letterbox(request['frame'])
+            images.append(image)
+            transforms.append(transform)
+        blob = cv2.dnn.blobFromImages(images, 1 / 255.0, (self.input_size, self.input_size),
+                                      swapRB=True, crop=False)
+        for request in batch:
+            if request['trace'] is not None:
+                request['trace'].mark('encode')
+
+        t1 = time.perf_counter()
+        output = self._forward(blob)
+        infer = time.perf_counter() - t1
+        LOCAL_INFERENCE_SECONDS.labels(self.engine.name).observe(infer)
+        LOCAL_BATCH_SIZE.labels(self.engine.name).observe(len(batch))
+
+        results = []
+        for i, request in enumerate(batch):
+            boxes = self.postprocess(output[i], transforms[i], request['frame'].shape)
+            fire = any(box[4] in self.fire_labels for box in boxes)
+            results.append({
+                'fire_detected': fire,
+                'boxes': boxes,
+                'text': json.dumps({'fire_detected': fire, 'boxes': boxes}),
+                'timings': {'batch': len(batch), 'infer': infer, 'total': time.perf_counter() - t0}
+            })
+            if request['trace'] is not None:
+                request['trace'].mark('parsed')
+
+        self.counters['frames'] += len(batch)
+        self.counters['batches'] += 1
+        self.last_batch, self.last_infer = len(batch), infer
+        log.debug('local_batch', f"Local detector: batch of {len(batch)} in {infer * 1000:.0f}ms",
+                  batch=len(batch), infer=infer)
+        return results
+
+    def postprocess(self, output, transform, shape):
+        """Rows of one image's model output -> NMS'd boxes in source pixels"""
+        n_classes = len(self.labels)
+        widths = (4 + n_classes, 5 + n_classes)
+        rows = np.asarray(output, dtype=np.float32)
+        if rows.ndim == 2 and rows.shape[0] in widths and (rows.shape[1] not in widths
+                                                           or rows.shape[1] > rows.shape[0]):
+            rows = rows.T                                   # YOLOv8: (4 + classes, N)
+        if rows.shape[1] == 5 + n_classes:                  # YOLOv5: objectness * class score
+            scores = rows[:, 5:] * rows[:, 4:5]
+        elif rows.shape[1] == 4 + n_classes:
+            scores = rows[:, 4:]
+        else:
+            raise ValueError(f"Unexpected model output shape {output.shape} for {n_classes} class(es)")
+
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences >= self.conf_threshold
+        if not keep.any():
+            return []
+        rows, class_ids, confidences = rows[keep], class_ids[keep], confidences[keep]
+
+        scale, pad_x, pad_y = transform
+        h, w = shape[:2]
+        cx, cy, bw, bh = rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
+        x1 = np.clip((cx - bw / 2 - pad_x) / scale, 0, w)
+        y1 = np.clip((cy - bh / 2 - pad_y) / scale, 0, h)
+        x2 = np.clip((cx + bw / 2 - pad_x) / scale, 0, w)
+        y2 = np.clip((cy + bh / 2 - pad_y) / scale, 0, h)
+
+        rects = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).tolist()
+        indices = cv2.dnn.NMSBoxes(rects, confidences.tolist(), self.conf_threshold, self.nms_threshold)
+        boxes = []
+        for i in np.asarray(indices).reshape(-1):
+            label = self.labels[class_ids[i]]
+            boxes.append([int(round(x1[i])), int(round(y1[i])), int(round(x2[i])), int(round(y2[i])),
+                          label, round(float(confidences[i]), 3)])
+        return boxes
+
+    def stats(self):
+        with self.cond:
+            queued = len(self.queue)
+        return {
+            'backend': self.name,
+            'engine': self.engine.name,
+            'model': os.path.basename(self.model_path),
+            'threads': self.threads,
+            'batch_size': self.batch_size,
+            'queued': queued,
+            'last_batch': self.last_batch,
+            'last_infer': self.last_infer,
+            **self.counters
+        }
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            pending, self.queue = self.queue, []
+            self.cond.notify_all()
+        for request in pending:
+            request['done'].set()
+
+# ═══════════════════════════════════════════════════════════════
+# SHARED INSTANCES
+# ═══════════════════════════════════════════════════════════════
+
+_local_backends = {}
+_local_lock = threading.Lock()
+
+
+def shared_local_backend(model_path, **options):
+    """One LocalDNNBackend per model file, so every camera using it shares batches"""
+    key = os.path.abspath(model_path)
+    with _local_lock:
+        backend = _local_backends.get(key)
+        if backend is None:
+            backend = _local_backends[key] = LocalDNNBackend(model_path, **options)
+        return backend
+
+
+def create_backend(kind, query, local_model=None, **local_options):
+    """'remote' -> RemoteBackend(query); 'local' -> the shared local backend"""
+    if kind == 'remote':
+        return RemoteBackend(query)
+    if kind == 'local':
+        return shared_local_backend(local_model, **local_options)
+    raise ValueError(f"Unknown detector backend {kind!r} (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""
+Non-blocking structured event logging
+Hot loops log named events instead of printing: records go onto a bounded
+queue (dropped, never blocking, when it is full) and a background listener
+writes them as JSON lines or as the familiar emoji console view. Each event
+can be sampled (1 in N) and rate limited (max per second).
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+ROOT_LOGGER = 'firebeats'
+QUEUE_SIZE = 10000
+
+# Console prefix per event; unknown events fall back to the level
+EMOJI = {
+    'frame_details': '📺',
+    'ai_request': '🤖',
+    'ai_response': '🔥',
+    'ai_timings': '⏱️',
+    'ai_error': '⚠️',
+    'ai_busy': '⏭️',
+    'static_skip': '⏸️',
+    'static_fire': '⚠️',
+    'box_iou': '🔍',
+    'fire_detected': '🚨'
+}
+LEVEL_EMOJI = {logging.DEBUG: '🔧', logging.INFO: 'ℹ️', logging.WARNING: '⚠️', logging.ERROR: '❌'}
+
+# ═══════════════════════════════════════════════════════════════
+# FORMATTERS
+# ═══════════════════════════════════════════════════════════════
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, msg and the event fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human view: emoji prefix + message, suppressed counts appended"""
+
+    def format(self, record):
+        event = getattr(record, 'event', None)
+        prefix = EMOJI.get(event) or LEVEL_EMOJI.get(record.levelno, '')
+        line = f"{prefix} {record.getMessage()}"
+        suppressed = getattr(record, 'fields', {}).get('suppressed')
+        if suppressed:
+            line += f" (+{suppressed} similar suppressed)"
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+# ═══════════════════════════════════════════════════════════════
+# QUEUE HANDLER
+# ═══════════════════════════════════════════════════════════════
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def setup_logging(fmt='console', level=logging.INFO, stream=None):
+    """Route all event loggers through a background writer; fmt is 'console' or 'json'"""
+    global _listener, _handler
+    shutdown_logging()
+
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonLinesFormatter() if fmt == 'json' else ConsoleFormatter())
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=QUEUE_SIZE))
+    _listener = logging.handlers.QueueListener(_handler.queue, target)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [_handler]
+    root.setLevel(level)
+    root.propagate = False
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    return _handler.dropped if _handler is not None else 0
+
+# ═══════════════════════════════════════════════════════════════
+# EVENT LOGGER
+# ═══════════════════════════════════════════════════════════════
+
+class EventLogger:
+    """Named-event logger with per-event sampling and rate limiting
+
+    policies maps event name -> {'sample_every': N, 'max_per_second': R}.
+    Sampling keeps the 1st, N+1th, ... occurrence; rate limiting is a token
+    bucket (burst of max(1, R)). Records that get through carry a
+    'suppressed' field with how many were skipped since the last one.
+    """
+
+    def __init__(self, name, policies=None):
+        self.logger = logging.getLogger(f'{ROOT_LOGGER}.{name}')
+        self.policies = dict(policies or {})
+        self.state = {}
+        self.lock = threading.Lock()
+
+    def _allow(self, event):
+        policy = self.policies.get(event)
+        if not policy:
+            return True, 0
+        now = time.monotonic()
+        with self.lock:
+            st = self.state.setdefault(event, {'seen': 0, 'suppressed': 0, 'tokens': None, 'ts': now})
+            st['seen'] += 1
+            allowed = True
+            every = policy.get('sample_every')
+            if every and (st['seen'] - 1) % every:
+                allowed = False
+            rate = policy.get('max_per_second')
+            if allowed and rate:
+                burst = max(1.0, rate)
+                tokens = burst if st['tokens'] is None else min(burst, st['tokens'] + (now - st['ts']) * rate)
+                st['ts'] = now
+                if tokens >= 1.0:
+                    st['tokens'] = tokens - 1.0
+                else:
+                    st['tokens'] = tokens
+                    allowed = False
+            if not allowed:
+                st['suppressed'] += 1
+                return False, 0
+            suppressed, st['suppressed'] = st['suppressed'], 0
+            return True, suppressed
+
+    def event(self, event, msg, level=logging.INFO, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        allowed, suppressed = self._allow(event)
+        if not allowed:
+            return
+        if suppressed:
+            fields['suppressed'] = suppressed
+        self.logger.log(level, msg, extra={'event': event, 'fields': fields})
+
+    def debug(self, event, msg, **fields):
+        self.event(event, msg, logging.DEBUG, **fields)
+
+    def info(self, event, msg, **fields):
+        self.event(event, msg, logging.INFO, **fields)
+
+    def warning(self, event, msg, **fields):
+        self.event(event, msg, logging.WARNING, **fields)
+
+    def error(self, event, msg, **fields):
+        self.event(event, msg, logging.ERROR, **fields)
@@ -11,12 +11,33 @@ import pwd
 import grp
 import tempfile
 import socket
+import threading
+import xml.etree.ElementTree as ET
 
 import requests
 import av
+from av.video.reformatter import VideoReformatter
 import cv2
 import numpy as np
 
+from box_tracker import BoxTracker
+from change_gate import ChangeGate
+from detector_backends import create_backend
+from event_log import EventLogger, setup_logging
+from frame_push_server import FramePushServer, pack_message
+from frame_ring import FrameRing
+from frame_stats import frame_stats
+from hls_segment_source import LocalSegmentReader
+from hls_watcher import wait_for_playlist
+from inference_client import InferenceClient, format_timings
+from inference_dispatcher import InferenceDispatcher
+from inference_payload import PayloadBuilder
+from latency_trace import FrameTrace, TraceRecorder
+from metrics_server import MetricsServer
+from prom_metrics import (REGISTRY, CONTENT_TYPE, FRAMES_CAPTURED, FRAMES_DROPPED, ENCODE_SECONDS,
+                          AI_REQUEST_SECONDS, AI_RESPONSES, STATIC_SKIPS, DETECTIONS, RECONNECTS,
+                          VIEWERS)
+
 # --------------------------------------------------------------------------------------
 # SAFETY & DEFAULTS
 # --------------------------------------------------------------------------------------
@@ -44,17 +65,113 @@ BASE = "/Users/mathan/firebeats/py-backend"
 NGINX_CONF  = f"{BASE}/nginx_rtmp.conf"
 WWW_ROOT    = f"{BASE}/www"
 HLS_PATH    = f"{BASE}/hls"
-FRAME_PATH  = f"{BASE}/frame.jpg"
+
+# Debug snapshots of uploaded frames (off by default; frames are sent from memory)
+SNAPSHOT_DIR  = None        # e.g. f"{BASE}/snapshots"
+SNAPSHOT_KEEP = 20          # newest N snapshots kept per camera
 
 # Web port for serving UI + HLS
 # TUNNEL_PORT = 8080
 TUNNEL_PORT = 8082
 
+# Where the detector reads HLS from: "local" (tail the playlist in HLS_PATH and
+# read segments from disk), "localhost" (nginx on TUNNEL_PORT) or "tunnel"
+# (public URL - only for a detector running on another machine)
+HLS_SOURCE = "local"
+LOCAL_STALL_TIMEOUT = 10    # seconds without a new segment before reconnecting
+
+# Detection input: "hls" (segments, see HLS_SOURCE) or "rtmp" (play PUSH_URL
+# directly - no fragment/playlist delay). Browsers keep using HLS either way.
+DETECTOR_SOURCE = "hls"
+
 # Camera/ID
 CAMERA_ID   = sys.argv[1] if len(sys.argv) > 1 else "ec2_camera"
 
 # AI endpoint
 API_ENDPOINT = "https://2cwzmjzkx4.execute-api.us-east-1.amazonaws.com/default/fire-frame-receiver"
+AI_POOL_SIZE = 2        # keep-alive connections to the AI endpoint
+AI_RETRIES   = 1        # retries on 5xx / timeout (with backoff)
+AI_HTTP2     = False    # requires: pip install httpx[http2]
+# Frames per POST and max seconds a frame waits for its batch; batches only
+# fill when AI_BATCH_WAIT >= SAMPLE_INTERVAL (or with other clients sharing it)
+AI_BATCH_SIZE = 1
+AI_BATCH_WAIT = 0.05
+
+# AI upload: longest side in px, byte budget (quality adapts to fit), format, ROIs (normalised)
+AI_INPUT_SIZE   = 640
+AI_BYTE_BUDGET  = 80000
+AI_IMAGE_FORMAT = "jpeg"
+AI_ROIS         = None   # e.g. [[0.0, 0.3, 1.0, 1.0]] to ignore the sky
+
+# Detector: "remote" (API_ENDPOINT) or "local" (ONNX fire model on this box,
+# keeps detecting when the uplink drops). Local model: YOLOv5/v8 ONNX export,
+# class names in output order; engine "auto" uses onnxruntime if installed.
+DETECTOR_BACKEND     = "remote"
+LOCAL_MODEL_PATH     = f"{BASE}/models/fire.onnx"
+LOCAL_LABELS         = ("fire", "smoke")
+LOCAL_FIRE_LABELS    = ("fire",)
+LOCAL_INPUT_SIZE     = 640
+LOCAL_CONF_THRESHOLD = 0.35
+LOCAL_ENGINE         = "auto"
+LOCAL_THREADS        = 2
+LOCAL_BATCH_SIZE     = 4
+LOCAL_BATCH_WAIT     = 0.05
+
+# Static-scene gate: still send a static scene every N seconds
+STATIC_RECHECK_INTERVAL = 60
+
+# Static-fire suppression: every returned box is tracked (IoU >= TRACK_MATCH_IOU
+# keeps a track); a box whose IoU with its last position is above
+# STATIC_FIRE_IOU for STATIC_FIRE_AFTER samples in a row is static, and alerts
+# are skipped while all boxes are static (0 = never skip). Tracks unseen for
+# TRACK_MAX_AGE seconds expire, so a returning fire alerts again
+TRACK_MATCH_IOU   = 0.3
+STATIC_FIRE_IOU   = 0.95
+STATIC_FIRE_AFTER = 1
+TRACK_MAX_AGE     = 10.0
+
+# Add red/orange pixel fraction and a saturation histogram to frame details
+FRAME_FEATURES = False
+
+# Detection pipeline: seconds between sampled frames, concurrent AI requests,
+# how many samples between pipeline stats lines, and preallocated BGR buffers
+# for sampled frames (grows if more are held at once)
+SAMPLE_INTERVAL      = 3.0
+AI_MAX_IN_FLIGHT     = 1
+PIPELINE_STATS_EVERY = 10
+FRAME_RING_SLOTS     = 4
+
+# Decode only keyframes: True, False, or "auto" (once the measured GOP is
+# shorter than SAMPLE_INTERVAL, so decode CPU follows the sample rate)
+KEYFRAME_ONLY = "auto"
+
+# WebSocket frame push for the web UI (nginx proxies /ws/stream to WS_PORT).
+# Frames are only scaled and encoded while a browser is connected.
+WS_PORT    = 8765
+WS_FPS     = 10
+WS_WIDTH   = 960
+WS_QUALITY = 70
+
+# Per-frame latency traces (capture -> alert), served as JSON on
+# http://<host>:METRICS_PORT/api/metrics; Prometheus metrics on /metrics
+TRACE_BUFFER_SIZE = 1000
+METRICS_PORT      = 9102
+
+# Logging: "console" (emoji view) or "json" (JSON lines for journald / log
+# shipping); "DEBUG" also logs every AI response body
+LOG_FORMAT = "console"
+LOG_LEVEL  = "INFO"
+
+# Per-sample events: sampled / rate limited so stdout never stalls the pipeline
+log = EventLogger('drone', policies={
+    'frame_details': {'sample_every': 10},
+    'ai_timings': {'sample_every': 10},
+    'ai_response': {'max_per_second': 1},
+    'box_iou': {'max_per_second': 1},
+    'static_skip': {'max_per_second': 0.2},
+    'static_fire': {'max_per_second': 0.2},
+    'ai_busy': {'max_per_second': 0.2}
+})
 
 # --------------------------------------------------------------------------------------
 # HELPERS
@@ -83,8 +200,11 @@ def ensure_path(path: str, mode: int = 0o755, world_writable: bool = False):
 
 def get_ec2_ips():
     """Automatically detect EC2 public and private IPs"""
-    public_ip = None
-    private_ip = None
+    # Offline runs (benchmark, laptops) set both and skip the lookups
+    public_ip = os.environ.get('FIREBEATS_PUBLIC_IP')
+    private_ip = os.environ.get('FIREBEATS_PRIVATE_IP')
+    if public_ip and private_ip:
+        return public_ip, private_ip
 
     print("🔍 Detecting EC2 IP addresses...")
 
@@ -122,105 +242,574 @@ def get_ec2_ips():
 
     return public_ip, private_ip
 
+def nginx_publish_start(app='live', name='stream'):
+    """Wall-clock time the current RTMP publish started (from nginx-rtmp /stat), or None"""
+    try:
+        r = requests.get(f'http://localhost:{TUNNEL_PORT}/stat', timeout=2)
+        root = ET.fromstring(r.text)
+        for application in root.iter('application'):
+            if application.findtext('name') != app:
+                continue
+            for stream in application.iter('stream'):
+                if stream.findtext('name') == name and stream.findtext('time'):
+                    return time.time() - int(stream.findtext('time')) / 1000.0
+    except Exception:
+        pass
+    return None
+
 PUBLIC_IP, PRIVATE_IP = get_ec2_ips()
 # PUSH_URL = f"rtmp://{PUBLIC_IP}:1935/live/stream"
 PUSH_URL = f"rtmp://127.0.0.1:1936/live/stream"
 
+# Shared pooled HTTP client for the AI endpoint
+ai_client = InferenceClient(API_ENDPOINT, pool_size=AI_POOL_SIZE, retries=AI_RETRIES,
+                            timeout=15, http2=AI_HTTP2, name=CAMERA_ID,
+                            batch_size=AI_BATCH_SIZE, batch_wait=AI_BATCH_WAIT)
+
+# --------------------------------------------------------------------------------------
+# DEBUG SNAPSHOTS
+# --------------------------------------------------------------------------------------
+
+class SnapshotSink:
+    """Opt-in sink keeping the newest `keep` uploaded frames on disk.
+
+    Files are named per camera and sequence, written atomically and
+    rotated, so several detectors can share one BASE without racing.
+    """
+    EXTENSIONS = {'image/jpeg': '.jpg', 'image/webp': '.webp'}
+
+    def __init__(self, directory, keep=20, prefix='frame'):
+        self.directory = directory
+        self.keep = max(1, int(keep))
+        self.prefix = prefix
+        self.seq = 0
+        self.written = []
+        ensure_path(directory, 0o755, world_writable=False)
+
+    def write(self, data, content_type='image/jpeg'):
+        self.seq += 1
+        ext = self.EXTENSIONS.get(content_type, '.bin')
+        name = f"{self.prefix}_{datetime.now():%Y%m%d_%H%M%S}_{self.seq:06d}{ext}"
+        path = os.path.join(self.directory, name)
+        try:
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[!] Snapshot write failed: {e}")
+            return None
+        self.written.append(path)
+        while len(self.written) > self.keep:
+            old = self.written.pop(0)
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
 # --------------------------------------------------------------------------------------
 # DETECTOR
 # --------------------------------------------------------------------------------------
 
 class HLSDetector:
-    def __init__(self):
+    def __init__(self, push_server=None):
         self.frame = None
         self.count = 0
-        self.prev_frame = None
-        self.static_count = 0
         self.static_threshold = 3
         self.diff_threshold = 5.0
-        self.prev_box = None
-        self.box_static_count = 0
-        self.box_static_threshold = 1
-        self.box_iou_threshold = 0.95
-
-    def get_frame_details(self, img):
+        self.snapshots = SnapshotSink(SNAPSHOT_DIR, SNAPSHOT_KEEP, CAMERA_ID) if SNAPSHOT_DIR else None
+        self.payload_builder = PayloadBuilder(target_size=AI_INPUT_SIZE, rois=AI_ROIS,
+                                              byte_budget=AI_BYTE_BUDGET, fmt=AI_IMAGE_FORMAT)
+        self.gate = ChangeGate(threshold=self.diff_threshold,
+                               static_after=self.static_threshold,
+                               recheck_interval=STATIC_RECHECK_INTERVAL,
+                               name=CAMERA_ID)
+        self.tracker = BoxTracker(match_iou=TRACK_MATCH_IOU, static_iou=STATIC_FIRE_IOU,
+                                  static_after=STATIC_FIRE_AFTER, max_age=TRACK_MAX_AGE,
+                                  name=CAMERA_ID)
+
+        # Live view: latest detection is drawn over pushed frames
+        self.push_server = push_server
+        self.push_reformatter = VideoReformatter()   # own scaler; frames are shared with the sampler
+        self.last_detection = {'fire_detected': False, 'boxes': [], 'ts': None}
+
+        # Latency clock: which input we read and the publish start from nginx /stat
+        self.source = 'hls'
+        self.publish_anchor = None
+
+        # Decoupled pipeline state: decode thread -> latest frame slot -> sampler -> dispatcher
+        self.latest_cond = threading.Condition()
+        self.reset_pipeline()
+        # Sampled BGR frames: converted in place into ring slots, leased to
+        # self.frame and to the dispatcher instead of copied
+        self.frames = FrameRing(FRAME_RING_SLOTS, name=CAMERA_ID)
+        self.frame_lease = None
+        self.yuv_scratch = None
+        self.traces = TraceRecorder(TRACE_BUFFER_SIZE, name=CAMERA_ID)
+        self.detector = create_backend(DETECTOR_BACKEND, self.query_ai, local_model=LOCAL_MODEL_PATH,
+                                       input_size=LOCAL_INPUT_SIZE, conf_threshold=LOCAL_CONF_THRESHOLD,
+                                       labels=LOCAL_LABELS, fire_labels=LOCAL_FIRE_LABELS,
+                                       threads=LOCAL_THREADS, batch_size=LOCAL_BATCH_SIZE,
+                                       batch_wait=LOCAL_BATCH_WAIT, engine=LOCAL_ENGINE)
+        self.dispatcher = InferenceDispatcher(
+            infer=lambda img, trace=None, **context: self.detector.detect(img, trace),
+            on_result=self.on_ai_result,
+            max_in_flight=max(AI_MAX_IN_FLIGHT, AI_BATCH_SIZE),
+            max_frame_age=2 * SAMPLE_INTERVAL,
+            name=CAMERA_ID
+        )
+
+    def get_frame_details(self, img, thumb=None):
+        """Size and color stats; the stats come from the gate thumbnail, not the full frame"""
         h, w, _ = img.shape
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        brightness = float(np.mean(gray))
-        mean_bgr = np.mean(img, axis=(0, 1))
+        small, gray = thumb if thumb is not None else self.gate.thumbnail(img)
         return {
             'time': datetime.now().strftime('%H:%M:%S'),
             'num': self.count,
             'size': f'{w}×{h}',
-            'brightness': brightness,
-            'mean_blue': float(mean_bgr[0]),
-            'mean_green': float(mean_bgr[1]),
-            'mean_red': float(mean_bgr[2])
+            **frame_stats(small, gray, features=FRAME_FEATURES)
         }
-    def print_frame_details(self, d):
-        print(f"\n📺 Frame {d['num']} @ {d['time']} — {d['size']}, "
-              f"brightness={d['brightness']:.1f}, R={d['mean_red']:.1f} "
-              f"G={d['mean_green']:.1f} B={d['mean_blue']:.1f}")
-
-    def compute_iou(self, box1, box2):
-        x1, y1, x2, y2 = box1
-        x1b, y1b, x2b, y2b = box2
-        xi1, yi1 = max(x1, x1b), max(y1, y1b)
-        xi2, yi2 = min(x2, x2b), min(y2, y2b)
-        inter = max(0, xi2 - xi1) * max(0, yi2 - yi1)
-        union = ((x2 - x1) * (y2 - y1) + (x2b - x1b) * (y2b - y1b) - inter)
-        return inter / union if union > 0 else 0
-    
-    def save_and_send(self):
-        # Static (by pixel diff) — skip API
-        if self.static_count >= self.static_threshold:
-            print(f"⚠️ Static image detected - skipping API call ({self.static_count} consecutive)")
-            return
-
-        cv2.imwrite(FRAME_PATH, self.frame)
-        with open(FRAME_PATH, 'rb') as f:
-            resp = requests.post(
-                API_ENDPOINT,
-                data=f.read(),
-                headers={'Content-Type': 'image/jpeg', 'camera-id': CAMERA_ID},
-                timeout=15
-            )
-        print(f"→ AI API {resp.status_code}: {resp.text.strip()}")
-
+    def log_frame_details(self, d):
+        log.info('frame_details', f"Frame {d['num']} @ {d['time']} — {d['size']}, "
+                 f"brightness={d['brightness']:.1f}, R={d['mean_red']:.1f} "
+                 f"G={d['mean_green']:.1f} B={d['mean_blue']:.1f}"
+                 + (f", fire pixels={d['fire_fraction']:.1%}" if 'fire_fraction' in d else ''),
+                 camera=CAMERA_ID, **d)
+
+    def query_ai(self, img, trace=None):
+        """Encode one frame in memory and post it; returns the parsed result"""
+        if trace is not None:
+            trace.mark('dequeue')
+        t0 = time.perf_counter()
+        payload = self.payload_builder.build(img)
+        if payload is None:
+            log.error('ai_error', "Frame encoding failed", camera=CAMERA_ID)
+            return None
+        data = payload['data'].tobytes()
+        ENCODE_SECONDS.labels(CAMERA_ID, 'ai').observe(time.perf_counter() - t0)
+        if trace is not None:
+            trace.mark('encode')
+        if self.snapshots is not None:
+            self.snapshots.write(data, payload['content_type'])
+        if trace is not None:
+            trace.mark('upload_start')
         try:
-            data = resp.json()
+            resp, timings = ai_client.post_frame(data, CAMERA_ID, timeout=15,
+                                                 content_type=payload['content_type'])
+        except requests.exceptions.Timeout:
+            AI_RESPONSES.labels(CAMERA_ID, 'timeout').inc()
+            raise
         except Exception:
-            data = {}
-        # Static (by box IoU)
-        fire_detected = resp.status_code == 200 and data.get('fire_detected')
-        boxes = data.get('boxes', [])
-        if fire_detected and boxes:
-            bx = boxes[0][:4]
-            if self.prev_box is not None:
-                iou = self.compute_iou(self.prev_box, bx)
-                print(f"🔍 Fire box IoU: {iou:.3f} (threshold: {self.box_iou_threshold})")
-                if iou > self.box_iou_threshold:
-                    self.box_static_count += 1
-                else:
-                    self.box_static_count = 0
-            else:
-                self.box_static_count = 0
-                self.prev_box = bx
+            AI_RESPONSES.labels(CAMERA_ID, 'error').inc()
+            raise
+        AI_REQUEST_SECONDS.labels(CAMERA_ID).observe(timings['total'])
+        AI_RESPONSES.labels(CAMERA_ID, resp.status_code).inc()
+        if trace is not None:
+            # Response headers of the final attempt (retries included before it)
+            trace.mark('ttfb', time.monotonic() - (timings['total'] - timings['ttfb']))
+        log.debug('ai_response', f"AI API {resp.status_code}: {resp.text.strip()}",
+                  camera=CAMERA_ID, status=resp.status_code)
+        log.info('ai_timings', f"{format_timings(timings)} ({len(payload['data']) // 1024} KB, "
+                 f"{payload['size'][0]}×{payload['size'][1]}, q={payload['quality']})",
+                 camera=CAMERA_ID, bytes=len(payload['data']), quality=payload['quality'],
+                 **{k: timings.get(k) for k in ('connect', 'tls', 'ttfb', 'total', 'attempts')})
 
-            if self.box_static_count >= self.box_static_threshold:
-                print(f"⚠️ Static fire position - same location ({self.box_static_count} consecutive)")
-                return
+        try:
+            body = resp.json()
+        except Exception:
+            body = {}
+        if trace is not None:
+            trace.mark('parsed')
+        result = {
+            'status': resp.status_code,
+            'text': resp.text,
+            'fire_detected': resp.status_code == 200 and bool(body.get('fire_detected')),
+            'boxes': PayloadBuilder.map_boxes(body.get('boxes', []), payload['transform']),
+            'timings': timings
+        }
+        if resp.status_code == 200:
+            log.info('ai_response', f"AI: fire={result['fire_detected']}, {len(result['boxes'])} box(es)",
+                     camera=CAMERA_ID, status=resp.status_code, fire_detected=result['fire_detected'],
+                     boxes=len(result['boxes']))
         else:
-            if self.prev_box is not None:
-                self.prev_box = None
-                self.box_static_count = 0
+            log.warning('ai_error', f"AI API Error: {resp.status_code} - {resp.text[:200]}",
+                        camera=CAMERA_ID, status=resp.status_code)
+        return result
+
+    def on_ai_result(self, result, capture_ts, context):
+        """Dispatcher callback: handle the result, then file the frame's trace"""
+        trace = context.get('trace')
+        self.handle_result(result, context.get('capture_wall'), trace, context.get('details'))
+        if trace is not None and result is not None:
+            self.traces.finish(trace)
+
+    def handle_result(self, result, capture_wall=None, trace=None, details=None):
+        """Static-fire suppression by tracked box IoU, then fire logging (details: get_frame_details())"""
+        if result is None:
+            return
+        if capture_wall is not None:
+            self.record_glass_to_detection(time.time() - capture_wall)
+        self.last_detection = {'fire_detected': result['fire_detected'],
+                               'boxes': result['boxes'], 'ts': time.time()}
+        # Static (by tracked box IoU)
+        fire_detected = result['fire_detected']
+        boxes = result['boxes']
+        tracks = self.tracker.update(boxes if fire_detected else [])
+        if tracks:
+            ious = [t['iou'] for t in tracks if t['iou'] is not None]
+            log.info('box_iou', f"Fire boxes: {len(tracks)} tracked, IoU "
+                     + (', '.join(f"{iou:.3f}" for iou in ious) or 'new')
+                     + f" (threshold: {STATIC_FIRE_IOU})",
+                     camera=CAMERA_ID, tracks=tracks, threshold=STATIC_FIRE_IOU)
+            if self.tracker.all_static(tracks):
+                consecutive = min(t['static_count'] for t in tracks)
+                log.info('static_fire', f"Static fire position - same location "
+                         f"({len(tracks)} box(es), {consecutive} consecutive)",
+                         camera=CAMERA_ID, consecutive=consecutive, tracks=[t['id'] for t in tracks])
+                return
 
         if fire_detected:
-            with open(os.path.join(BASE, 'fire_log.txt'), 'a') as log:
-                log.write(f"{datetime.now()} FIRE DETECTED → {resp.text}\n")
-            print("🚨 FIRE DETECTED!")
+            with open(os.path.join(BASE, 'fire_log.txt'), 'a') as fire_log:
+                fire_log.write(f"{datetime.now()} FIRE DETECTED → {result['text']}\n")
+            features = {k: details[k] for k in ('fire_fraction', 'saturation_hist') if k in (details or {})}
+            log.warning('fire_detected', "FIRE DETECTED!", camera=CAMERA_ID, boxes=boxes, **features)
+            DETECTIONS.labels(CAMERA_ID).inc()
+            if trace is not None:
+                trace.mark('alert')
+
+    def save_and_send(self):
+        """Synchronous check of self.frame (the pipeline uses the dispatcher instead)"""
+        # Static (by thumbnail diff against background) — skip API
+        if not self.gate.check(self.frame):
+            self.log_static_skip()
+            return
+        self.handle_result(self.detector.detect(self.frame))
+
+    def log_static_skip(self):
+        g = self.gate.stats()
+        log.info('static_skip', f"Static image detected - skipping API call ({g['static_count']} consecutive, "
+                 f"saved {g['saved']}, sent {g['sent']})",
+                 camera=CAMERA_ID, consecutive=g['static_count'], saved=g['saved'], sent=g['sent'])
+
+    # ----------------------------------------------------------------------------------
+    # PIPELINE: demux/decode thread -> sampler (BGR + gate) -> inference dispatcher
+    # ----------------------------------------------------------------------------------
+
+    def update_keyframe_mode(self, pkt, vid):
+        """Track GOP length from keyframe timestamps and toggle keyframe-only decode"""
+        stats = self.stage_stats['decode']
+        if pkt.is_keyframe and pkt.pts is not None and vid.time_base is not None:
+            t = float(pkt.pts * vid.time_base)
+            if self.last_keyframe_time is not None and t > self.last_keyframe_time:
+                gop = t - self.last_keyframe_time
+                stats['gop'] = gop if stats['gop'] is None else 0.8 * stats['gop'] + 0.2 * gop
+            self.last_keyframe_time = t
+        elif not pkt.is_keyframe and stats['keyframe_only']:
+            stats['skipped'] += 1
+
+        if KEYFRAME_ONLY == 'auto':
+            # Full-rate decode while someone is watching the live view
+            wanted = (stats['gop'] is not None and stats['gop'] < SAMPLE_INTERVAL
+                      and not (self.push_server and self.push_server.has_subscribers))
+        else:
+            wanted = bool(KEYFRAME_ONLY)
+        # Dropping non-key frames is safe at any packet, but full decode must
+        # resume on a keyframe: P/B frames before it reference skipped frames
+        if wanted != stats['keyframe_only'] and (wanted or pkt.is_keyframe):
+            vid.codec_context.skip_frame = 'NONKEY' if wanted else 'DEFAULT'
+            stats['keyframe_only'] = wanted
+            gop = f"{stats['gop']:.2f}s" if stats['gop'] is not None else 'unknown'
+            print(f"🎞️ Keyframe-only decode {'enabled' if wanted else 'disabled'} "
+                  f"(GOP {gop}, sample every {SAMPLE_INTERVAL}s)")
+
+    def capture_wall(self, pts_time, arrival):
+        """Wall-clock capture estimate for a frame's presentation time (seconds)
+
+        Anchored on the publish start reported by nginx /stat when available
+        (shared by the RTMP and HLS sources); otherwise on the least-delayed
+        frame seen so far, which excludes the fixed uplink/encoder floor.
+        """
+        if pts_time is None:
+            return None
+        if self.publish_anchor is not None and self.publish_anchor + pts_time > arrival + 1.0:
+            self.publish_anchor = None      # timestamps don't start at publish; fall back
+        if self.publish_anchor is not None:
+            return self.publish_anchor + pts_time
+        offset = arrival - pts_time
+        if self.min_offset is None or offset < self.min_offset:
+            self.min_offset = offset
+        return pts_time + self.min_offset
+
+    def record_glass_to_detection(self, latency):
+        stats = self.stage_stats['latency']
+        stats['glass_to_detection'] = latency
+        avg = stats['glass_to_detection_avg']
+        stats['glass_to_detection_avg'] = latency if avg is None else 0.8 * avg + 0.2 * latency
+
+    def decode_loop(self, cont, vid):
+        """Demux and decode continuously, keeping only the newest frame (still in YUV)"""
+        stats = self.stage_stats['decode']
+        captured = FRAMES_CAPTURED.labels(CAMERA_ID, self.source)
+        not_sampled = FRAMES_DROPPED.labels(CAMERA_ID, self.source, 'not_sampled')
+        try:
+            for pkt in cont.demux(vid):
+                if not self.decoding:
+                    break
+                self.update_keyframe_mode(pkt, vid)
+                t0 = time.perf_counter()
+                frames = pkt.decode()
+                dt = time.perf_counter() - t0
+                stats['packets'] += 1
+                stats['latency'] = dt if stats['latency'] is None else 0.9 * stats['latency'] + 0.1 * dt
+                for frame in frames:
+                    arrival = time.time()
+                    capture = self.capture_wall(frame.time, arrival)
+                    if capture is not None:
+                        self.stage_stats['latency']['ingest_to_decode'] = arrival - capture
+                    with self.latest_cond:
+                        if self.latest_seq > self.sampled_seq:
+                            stats['dropped'] += 1   # never sampled, replaced by a newer frame
+                            not_sampled.inc()
+                        self.latest = frame
+                        self.latest_seq += 1
+                        self.latest_ts = time.monotonic()
+                        self.latest_capture = capture
+                        self.latest_cond.notify_all()
+                    stats['frames'] += 1
+                    captured.inc()
+                    self.count += 1
+        except Exception as e:
+            self.decode_error = e
+        finally:
+            with self.latest_cond:
+                self.decoding = False
+                self.latest_cond.notify_all()
+
+    def take_latest(self):
+        """Newest unsampled frame as (frame, decoded_ts, capture_wall), or Nones"""
+        with self.latest_cond:
+            if self.latest is None or self.latest_seq <= self.sampled_seq:
+                return None, None, None
+            self.sampled_seq = self.latest_seq
+            return self.latest, self.latest_ts, self.latest_capture
+
+    def to_bgr(self, frame, out):
+        """Convert a decoded frame to BGR into out without allocating
+
+        yuv420p is gathered into a reused I420 buffer and converted by OpenCV
+        straight into out; other pixel formats go through PyAV.
+        """
+        h, w = frame.height, frame.width
+        if frame.format.name not in ('yuv420p', 'yuvj420p') or h % 2 or w % 2:
+            np.copyto(out, frame.to_ndarray(format='bgr24'))
+            return
+        if self.yuv_scratch is None or self.yuv_scratch.shape != (h * 3 // 2, w):
+            self.yuv_scratch = np.empty((h * 3 // 2, w), np.uint8)
+        yuv = self.yuv_scratch
+        chroma = yuv[h:].reshape(h, w // 2)     # U rows, then V rows
+        y, u, v = frame.planes
+        yuv[:h] = np.frombuffer(y, np.uint8).reshape(h, y.line_size)[:, :w]
+        chroma[:h // 2] = np.frombuffer(u, np.uint8).reshape(h // 2, u.line_size)[:, :w // 2]
+        chroma[h // 2:] = np.frombuffer(v, np.uint8).reshape(h // 2, v.line_size)[:, :w // 2]
+        cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420, dst=out)
+
+    def sample(self, frame, decoded_ts, capture_wall=None):
+        """Convert one sampled frame to BGR, gate it and hand it to the inference stage"""
+        stats = self.stage_stats['sample']
+        t0 = time.perf_counter()
+        index, buf = self.frames.reserve((frame.height, frame.width, 3))
+        try:
+            self.to_bgr(frame, buf)
+        except Exception as e:
+            self.frames.cancel(index)
+            print(f"[!] Frame conversion error: {e}")
+            return
+        self.frames.publish(index, buf, decoded_ts)
+        stats['convert'] = time.perf_counter() - t0
+        stats['age'] = time.monotonic() - decoded_ts
+        stats['samples'] += 1
+        # self.frame stays readable (save_and_send) until the next sample replaces it
+        if self.frame_lease is not None:
+            self.frame_lease.release()
+        self.frame_lease = self.frames.lease()
+        img = self.frame = self.frame_lease.frame
+
+        thumb = self.gate.thumbnail(img)
+        det = self.get_frame_details(img, thumb)
+        self.log_frame_details(det)
+        if not self.gate.check(img, thumb=thumb):
+            STATIC_SKIPS.labels(CAMERA_ID).inc()
+            self.log_static_skip()
+            return
+        # Trace from the estimated capture time when known, else from decode
+        capture_ts = decoded_ts
+        if capture_wall is not None:
+            capture_ts = min(decoded_ts, time.monotonic() - (time.time() - capture_wall))
+        trace = FrameTrace(capture_ts, source=self.source)
+        trace.mark('decode', decoded_ts)
+        lease = self.frames.lease()
+        if not self.dispatcher.submit(img, decoded_ts, done=lease.release,
+                                      capture_wall=capture_wall, trace=trace, details=det):
+            FRAMES_DROPPED.labels(CAMERA_ID, self.source, 'ai_busy').inc()
+            log.info('ai_busy', "AI busy - replaced pending frame with newer one", camera=CAMERA_ID)
+
+    def build_push_message(self, frame, decoded_ts):
+        """Scaled JPEG of a decoded frame plus the latest boxes, packed for the web UI"""
+        width = min(WS_WIDTH, frame.width)
+        height = max(2, int(round(frame.height * width / frame.width)) // 2 * 2)
+        img = self.push_reformatter.reformat(frame, width=width, height=height,
+                                             format='bgr24').to_ndarray()
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, WS_QUALITY])
+        if not ok:
+            return None
+
+        scale = width / frame.width
+        det = self.last_detection
+        boxes = [[round(b[0] * scale), round(b[1] * scale), round(b[2] * scale), round(b[3] * scale), *b[4:]]
+                 for b in det['boxes']]
+        header = {
+            'seq': self.latest_seq,
+            'ts': (time.time() - (time.monotonic() - decoded_ts)) * 1000,   # decode time, epoch ms
+            'width': width,
+            'height': height,
+            'boxes': boxes,
+            'fire_detected': det['fire_detected'],
+            'detection_ts': det['ts'] * 1000 if det['ts'] else None
+        }
+        return pack_message(header, buf.tobytes())
+
+    def push_loop(self):
+        """Push the newest decoded frame to WebSocket viewers at up to WS_FPS"""
+        stats = self.stage_stats['push']
+        interval = 1.0 / WS_FPS
+        pushed_seq = 0
+        viewers = VIEWERS.labels(CAMERA_ID, 'ws')
+        while self.decoding:
+            time.sleep(interval)
+            viewers.set(len(self.push_server.clients))
+            if not self.push_server.has_subscribers:
+                continue
+            with self.latest_cond:
+                frame, seq, decoded_ts = self.latest, self.latest_seq, self.latest_ts
+            if frame is None or seq == pushed_seq:
+                continue
+            pushed_seq = seq
+            t0 = time.perf_counter()
+            try:
+                message = self.build_push_message(frame, decoded_ts)
+            except Exception as e:
+                print(f"[!] Live view encode error: {e}")
+                continue
+            stats['encode'] = time.perf_counter() - t0
+            ENCODE_SECONDS.labels(CAMERA_ID, 'ws').observe(stats['encode'])
+            if message is not None:
+                self.push_server.publish(message)
+                stats['pushed'] += 1
+
+    def pipeline_stats(self):
+        """Queue depth and latency for each stage"""
+        with self.latest_cond:
+            waiting = max(0, self.latest_seq - self.sampled_seq)
+        stats = {
+            'decode': {**self.stage_stats['decode'], 'depth': waiting},
+            'sample': dict(self.stage_stats['sample']),
+            'inference': self.dispatcher.stats(),
+            'frames': self.frames.stats(),
+            'tracker': self.tracker.stats(),
+            'latency': dict(self.stage_stats['latency'])
+        }
+        if self.push_server is not None:
+            stats['push'] = {**self.stage_stats['push'], **self.push_server.stats()}
+        return stats
+
+    def print_pipeline_stats(self):
+        st = self.pipeline_stats()
+        d, smp, inf = st['decode'], st['sample'], st['inference']
+
+        def ms(v):
+            return '--' if v is None else f"{v * 1000:.0f}ms"
+
+        print(f"📊 decode: {d['frames']} frames, {ms(d['latency'])}/pkt, depth {d['depth']}, "
+              f"dropped {d['dropped']}{', keyframes only' if d['keyframe_only'] else ''} | sample: age {ms(smp['age'])}, bgr {ms(smp['convert'])} | "
+              f"inference: pending {inf['pending']}, in flight {inf['in_flight']}, "
+              f"latency {ms(inf['last_latency'])}, stale {inf['stale']}")
+        lat = st['latency']
+        print(f"⏱️ {lat['source']} glass→detection {ms(lat['glass_to_detection'])} "
+              f"(avg {ms(lat['glass_to_detection_avg'])}), ingest→decode {ms(lat['ingest_to_decode'])}, "
+              f"clock {'nginx' if self.publish_anchor is not None else 'min-delay'}")
+        if 'push' in st and st['push']['subscribers']:
+            p = st['push']
+            print(f"📡 live view: {p['subscribers']} viewer(s), pushed {p['pushed']}, "
+                  f"encode {ms(p['encode'])}")
+
+    def reset_pipeline(self):
+        self.latest = None
+        self.latest_seq = 0
+        self.latest_ts = None
+        self.latest_capture = None
+        self.sampled_seq = 0
+        self.min_offset = None
+        self.decoding = True
+        self.decode_error = None
+        self.last_keyframe_time = None
+        self.stage_stats = {
+            'decode': {'frames': 0, 'packets': 0, 'dropped': 0, 'latency': None,
+                       'keyframe_only': False, 'gop': None, 'skipped': 0},
+            'sample': {'samples': 0, 'age': None, 'convert': None},
+            'push': {'pushed': 0, 'encode': None},
+            'latency': {'source': self.source, 'ingest_to_decode': None,
+                        'glass_to_detection': None, 'glass_to_detection_avg': None}
+        }
+
+    def run_pipeline(self, cont, vid):
+        """Run decode in the background and sample every SAMPLE_INTERVAL on this thread"""
+        self.reset_pipeline()
+        decoder = threading.Thread(target=self.decode_loop, args=(cont, vid),
+                                   name='hls-decode', daemon=True)
+        decoder.start()
+        pusher = None
+        if self.push_server is not None:
+            pusher = threading.Thread(target=self.push_loop, name='ws-push', daemon=True)
+            pusher.start()
+        try:
+            next_sample = time.monotonic() + SAMPLE_INTERVAL
+            while True:
+                with self.latest_cond:
+                    self.latest_cond.wait_for(lambda: not self.decoding,
+                                              timeout=max(0.0, next_sample - time.monotonic()))
+                    if not self.decoding:
+                        break
+                now = time.monotonic()
+                if now < next_sample:
+                    continue
+                next_sample = max(next_sample + SAMPLE_INTERVAL, now)
+
+                frame, decoded_ts, capture_wall = self.take_latest()
+                if frame is None:
+                    continue
+                self.sample(frame, decoded_ts, capture_wall)
+                if self.stage_stats['sample']['samples'] % PIPELINE_STATS_EVERY == 0:
+                    self.print_pipeline_stats()
+        finally:
+            self.decoding = False
+            decoder.join(timeout=5)
+            if pusher is not None:
+                pusher.join(timeout=5)
+        if self.decode_error is not None:
+            raise self.decode_error
     
     def wait_for_hls(self, url, timeout=30):
+        if not url.startswith(('http://', 'https://')):
+            # Local playlist: wake on the first write instead of polling over HTTP
+            print(f"⏳ Waiting for local HLS playlist in {HLS_PATH}")
+            playlist = wait_for_playlist(HLS_PATH, timeout=timeout)
+            if playlist is None:
+                print('❌ HLS connection timeout - stream may have stopped')
+                return False, url
+            print(f'[✓] HLS playlist ready at: {playlist}')
+            return True, playlist
+
         print(f"⏳ Connecting to HLS stream: {url}")
         nested_url = url.replace('/hls/stream.m3u8', '/hls/stream/stream.m3u8')
         urls_to_try = [url, nested_url]
@@ -248,68 +837,89 @@ class HLSDetector:
         print('❌ HLS connection timeout - stream may have stopped')
         return False, url
     
+    def open_source(self, url):
+        """Open the detection input; returns (container, local segment reader or None)"""
+        if url.startswith('rtmp://'):
+            # Play the ingest directly: no fragment or playlist refresh in the path
+            cont = av.open(url, options={
+                'fflags': 'nobuffer',
+                'flags': 'low_delay',
+                'rtmp_live': 'live',
+                'rtmp_buffer': '100',
+                'rw_timeout': '10000000',
+                'probesize': '32768',
+                'analyzeduration': '100000'
+            })
+            return cont, None
+        if url.startswith(('http://', 'https://')):
+            cont = av.open(url, format='hls', options={
+                'fflags': 'nobuffer',
+                'flags': 'low_delay',
+                'timeout': '30000000',
+                'probesize': '32',
+                'analyzeduration': '0',
+                'max_delay': '0'
+            })
+            return cont, None
+        # Same host as nginx: feed segments from disk as one MPEG-TS stream
+        reader = LocalSegmentReader(url, stall_timeout=LOCAL_STALL_TIMEOUT)
+        try:
+            cont = av.open(reader, format='mpegts', options={
+                'fflags': 'nobuffer',
+                'flags': 'low_delay',
+                'probesize': '500000',
+                'analyzeduration': '500000'
+            })
+        except Exception:
+            reader.close()
+            raise
+        return cont, reader
+
     def run(self, url):
+        self.source = 'rtmp' if url.startswith('rtmp://') else 'hls'
+        reconnects = RECONNECTS.labels(CAMERA_ID, self.source)
+        first_attempt = True
         while True:
+            if not first_attempt:
+                reconnects.inc()
+            first_attempt = False
             try:
-                hls_ready, working_url = self.wait_for_hls(url)
-                if not hls_ready:
+                if self.source == 'rtmp':
+                    ready, working_url = True, url
+                else:
+                    ready, working_url = self.wait_for_hls(url)
+                if not ready:
                     print("⚠️ HLS stream not available, waiting for RTMP stream to restart...")
                     time.sleep(10)
                     continue
 
-                print(f"▶ Opening HLS: {working_url}")
+                print(f"▶ Opening {self.source.upper()}: {working_url}")
                 try:
-                    cont = av.open(working_url, format='hls', options={
-                        'fflags': 'nobuffer',
-                        'flags': 'low_delay',
-                        'timeout': '30000000',
-                        'probesize': '32',
-                        'analyzeduration': '0',
-                        'max_delay': '0'
-                    })
+                    cont, reader = self.open_source(working_url)
                     vid = cont.streams.video[0]
                     print(f"[✓] Video stream: {vid.width}×{vid.height} @ {vid.average_rate} fps")
                 except Exception as e:
-                    print(f"❌ Failed to open HLS stream: {e}")
+                    print(f"❌ Failed to open {self.source.upper()} stream: {e}")
                     print("⚠️ Retrying in 10 seconds...")
                     time.sleep(10)
                     continue
 
-                last = time.time()
-                frame_count = 0
+                self.publish_anchor = nginx_publish_start()
                 try:
-                    for pkt in cont.demux(vid):
-                        for frame in pkt.decode():
-                            try:
-                                img = frame.to_ndarray(format='bgr24')
-                            except Exception as e:
-                                print(f"[!] Frame conversion error: {e}")
-                                continue
-
-                            self.count += 1
-                            frame_count += 1
-                            self.frame = img
-
-                            if time.time() - last >= 3.0:
-                                if self.prev_frame is not None:
-                                    d = cv2.absdiff(img, self.prev_frame)
-                                    md = float(np.mean(d))
-                                    self.static_count = self.static_count + 1 if md < self.diff_threshold else 0
-                                self.prev_frame = img.copy()
-                                det = self.get_frame_details(img)
-                                self.print_frame_details(det)
-                                self.save_and_send()
-                                last = time.time()
-
+                    self.run_pipeline(cont, vid)
+                    print('\n⚠️ Stream ended')
+                    print(f"📊 Processed {self.stage_stats['decode']['frames']} frames")
+                    print("🔄 Will attempt to reconnect...")
                 except Exception as e:
                     print(f'\n⚠️ Stream processing error: {e}')
-                    print(f"📊 Processed {frame_count} frames before error")
+                    print(f"📊 Processed {self.stage_stats['decode']['frames']} frames before error")
                     print("🔄 Will attempt to reconnect...")
                 finally:
                     cont.close()
-                    if os.path.exists(FRAME_PATH):
-                        os.remove(FRAME_PATH)
-                time.sleep(5)
+                    if reader is not None:
+                        print(f"📼 Local segments: {reader.stats()}")
+                        reader.close()
+                time.sleep(1 if reader is not None else 5)
 
             except KeyboardInterrupt:
                 print('\n🛑 Interrupted by user')
@@ -358,6 +968,13 @@ HTML_TEMPLATE = f"""
             left: 0;
             pointer-events: none;
         }}
+        #liveCanvas {{
+            position: static;
+            display: none;
+            max-width: 100%;
+            background: #000;
+            border: 2px solid #333;
+        }}
         .status {{
             background: #333;
             padding: 10px;
@@ -425,6 +1042,7 @@ HTML_TEMPLATE = f"""
         <div id="status" class="status">Initializing ultra-low latency stream...</div>
         <div class="video-container">
             <video id="video" controls muted autoplay playsinline></video>
+            <canvas id="liveCanvas"></canvas>
             <canvas id="overlayCanvas"></canvas>
         </div>
         <div class="controls">
@@ -469,6 +1087,7 @@ HTML_TEMPLATE = f"""
         let fps = 0;
         let streamMode = 'None';
         let latencyStart = 0;
+        let lastSeq = 0;
 
         function log(message, type = 'info') {{
             const status = document.getElementById('status');
@@ -502,24 +1121,66 @@ HTML_TEMPLATE = f"""
             }}
         }}
 
+        function showView(live) {{
+            document.getElementById('video').style.display = live ? 'none' : '';
+            document.getElementById('liveCanvas').style.display = live ? 'block' : 'none';
+        }}
+
+        // Message: 4-byte big-endian header length, JSON header, JPEG bytes
+        async function onLiveFrame(data) {{
+            const view = new DataView(data);
+            const headerLength = view.getUint32(0);
+            const header = JSON.parse(new TextDecoder().decode(new Uint8Array(data, 4, headerLength)));
+            const jpeg = new Blob([new Uint8Array(data, 4 + headerLength)], {{ type: 'image/jpeg' }});
+            const bitmap = await createImageBitmap(jpeg);
+            if (header.seq <= lastSeq) {{ bitmap.close(); return; }}
+            lastSeq = header.seq;
+
+            const live = document.getElementById('liveCanvas');
+            const overlay = document.getElementById('overlayCanvas');
+            if (live.width !== header.width || live.height !== header.height) {{
+                live.width = overlay.width = header.width;
+                live.height = overlay.height = header.height;
+            }}
+            live.getContext('2d').drawImage(bitmap, 0, 0);
+            bitmap.close();
+            boxes = header.boxes || [];
+
+            const now = performance.now();
+            if (lastFrameTime) fps = 0.9 * fps + 0.1 * (1000 / (now - lastFrameTime));
+            lastFrameTime = now;
+            document.getElementById('latency').textContent = Math.max(0, Date.now() - header.ts).toFixed(0);
+        }}
+
         async function tryWebSocket() {{
             log('🔌 Attempting WebSocket direct stream...', 'info');
             streamMode = 'WebSocket';
+            if (hls) {{ hls.destroy(); hls = null; }}
+            if (websocket) {{ websocket.close(); websocket = null; }}
             const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
             const wsUrl = `${{wsProtocol}}//${{window.location.host}}/ws/stream`;
             try {{
-                websocket = new WebSocket(wsUrl);
-                websocket.onopen = function() {{
+                const ws = new WebSocket(wsUrl);
+                ws.binaryType = 'arraybuffer';
+                websocket = ws;
+                lastSeq = 0;
+                lastFrameTime = 0;
+                ws.onopen = function() {{
                     log('✓ WebSocket connected - streaming frames directly', 'success');
-                    document.getElementById('latency').textContent = '500';
+                    document.getElementById('video').pause();
+                    showView(true);
                 }};
-                websocket.onmessage = function(event) {{
+                ws.onmessage = function(event) {{
                     if (event.data instanceof ArrayBuffer) {{
-                        log('📊 Receiving raw frame data', 'success');
+                        onLiveFrame(event.data).catch(e => log(`Frame decode failed: ${{e.message}}`, 'error'));
                     }}
                 }};
-                websocket.onerror = function(error) {{
-                    log('❌ WebSocket failed - falling back to HLS', 'warning');
+                ws.onerror = function() {{
+                    log('❌ WebSocket error', 'warning');
+                }};
+                ws.onclose = function() {{
+                    if (websocket !== ws || streamMode !== 'WebSocket') return;
+                    log('⚠ WebSocket closed - falling back to HLS', 'warning');
                     tryHLS();
                 }};
             }} catch (error) {{
@@ -538,6 +1199,8 @@ HTML_TEMPLATE = f"""
 
             if (hls) {{ hls.destroy(); hls = null; }}
             if (websocket) {{ websocket.close(); websocket = null; }}
+            showView(false);
+            boxes = [];
 
             if (Hls.isSupported()) {{
                 hls = new Hls({{
@@ -783,6 +1446,17 @@ http {{
             index index.html;
         }}
 
+        # Live frames + boxes from the detector (host process, see WS_PORT)
+        location /ws/stream {{
+            proxy_pass http://host.docker.internal:{WS_PORT};
+            proxy_http_version 1.1;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection "upgrade";
+            proxy_set_header Host $host;
+            proxy_buffering off;
+            proxy_read_timeout 3600s;
+        }}
+
         location /health {{
             return 200 'OK';
             add_header Content-Type text/plain;
@@ -850,6 +1524,7 @@ def start_services():
         # '-p', '1935:1935',
         '-p', '1936:1935',
         '-p', f'{TUNNEL_PORT}:80',
+        '--add-host', 'host.docker.internal:host-gateway',   # reach the WebSocket server on the host
         '-v', f'{NGINX_CONF}:/etc/nginx/nginx.conf:ro',
         '-v', f'{WWW_ROOT}:{WWW_ROOT}:ro',
         '-v', f'{HLS_PATH}:{HLS_PATH}:rw',
@@ -1045,51 +1720,28 @@ def wait_for_rtmp_stream():
         print('\n❌ RTMP server diagnostics failed!')
         return False
 
-    no_activity_count = 0
-    while True:
-        try:
-            if os.path.exists(HLS_PATH):
-                all_files = os.listdir(HLS_PATH)
-                hls_files = [f for f in all_files if f.endswith('.m3u8') or f.endswith('.ts')]
-
-                # Check subdirectories (e.g., "stream/")
-                for item in all_files:
-                    p = os.path.join(HLS_PATH, item)
-                    if os.path.isdir(p):
-                        try:
-                            sub_files = os.listdir(p)
-                            sub_hls = [f for f in sub_files if f.endswith('.m3u8') or f.endswith('.ts')]
-                            if sub_hls:
-                                print(f'[✓] RTMP stream detected! HLS in {item}/: {sub_hls[:5]}'
-                                      f'{"..." if len(sub_hls) > 5 else ""}')
-                                return True
-                        except Exception as e:
-                            print(f'⚠️ Could not read {item}/: {e}')
-
-                if hls_files:
-                    print(f'[✓] RTMP stream detected! HLS files: {hls_files[:5]}'
-                          f'{"..." if len(hls_files) > 5 else ""}')
-                    return True
-
-                no_activity_count += 1
-                if no_activity_count >= 10:
-                    print('\n🔍 No RTMP activity detected for 30 seconds. Diagnostics...')
-                    diagnose_rtmp_server()
-                    no_activity_count = 0
-            else:
-                print(f'⚠️ HLS directory {HLS_PATH} does not exist, creating it...')
-                ensure_path(HLS_PATH, 0o755, world_writable=True)
+    if not os.path.exists(HLS_PATH):
+        print(f'⚠️ HLS directory {HLS_PATH} does not exist, creating it...')
+        ensure_path(HLS_PATH, 0o755, world_writable=True)
 
-            time.sleep(3)
-        except KeyboardInterrupt:
-            print('\n🛑 Stopped by user')
-            return False
+    def on_idle():
+        print('\n🔍 No RTMP activity detected for 30 seconds. Diagnostics...')
+        diagnose_rtmp_server()
+
+    try:
+        playlist = wait_for_playlist(HLS_PATH, on_idle=on_idle, idle_every=30)
+    except KeyboardInterrupt:
+        print('\n🛑 Stopped by user')
+        return None
+    print(f'[✓] RTMP stream detected! Playlist with segments: {playlist}')
+    return playlist
 
 # --------------------------------------------------------------------------------------
 # MAIN
 # --------------------------------------------------------------------------------------
 
 if __name__ == '__main__':
+    setup_logging(LOG_FORMAT, LOG_LEVEL)
     print('\n' + '=' * 60)
     print('🔥 ULTRA-LOW LATENCY Fire Detection System')
     print('=' * 60)
@@ -1123,6 +1775,7 @@ if __name__ == '__main__':
         print(f'🌍 Web UI (Public): https://{domain}')
         print(f'🏠 Web UI (Local):  http://localhost:{TUNNEL_PORT}')
         print(f'📺 HLS Stream:      https://{domain}/hls/stream.m3u8')
+        print(f'🔌 Live Frames:     wss://{domain}/ws/stream')
         print(f'📡 RTMP Push:       {PUSH_URL}')
         print(f'📊 Stats:           https://{domain}/stat')
         print('=' * 60 + '\n')
@@ -1144,14 +1797,35 @@ if __name__ == '__main__':
         print('=' * 60)
 
         # Wait for RTMP stream to start producing HLS
-        if not wait_for_rtmp_stream():
+        playlist = wait_for_rtmp_stream()
+        if not playlist:
             print('\n🛑 Exiting...')
             stop_services(tunnel_process)
             sys.exit(0)
 
         # Start detection
-        hls_url = f'https://{domain}/hls/stream.m3u8'
-        detector = HLSDetector()
+        if DETECTOR_SOURCE == 'rtmp':
+            hls_url = PUSH_URL
+        elif HLS_SOURCE == 'local':
+            hls_url = playlist
+        elif HLS_SOURCE == 'localhost':
+            hls_url = f'http://localhost:{TUNNEL_PORT}/hls/stream.m3u8'
+        else:
+            hls_url = f'https://{domain}/hls/stream.m3u8'
+        print(f'📥 Detector source ({DETECTOR_SOURCE}/{HLS_SOURCE}): {hls_url}')
+        push_server = FramePushServer('0.0.0.0', WS_PORT)
+        push_server.start()
+        detector = HLSDetector(push_server=push_server)
+        metrics_server = MetricsServer('0.0.0.0', METRICS_PORT)
+        metrics_server.add_json_route('/api/metrics', lambda: {
+            'camera_id': CAMERA_ID,
+            'latency': detector.traces.summary(),
+            'pipeline': detector.pipeline_stats(),
+            'detector': detector.detector.stats(),
+            'ai_client': ai_client.stats()
+        })
+        metrics_server.add_route('/metrics', lambda: (CONTENT_TYPE, REGISTRY.render()))
+        metrics_server.start()
         print('\n🎬 Starting frame detection...')
         print('📝 Frame details will appear every 3 seconds when stream is active')
         print(f'🔥 Fire detection results will be logged to {os.path.join(BASE, "fire_log.txt")}')
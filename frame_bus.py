@@ -0,0 +1,479 @@
+#!/usr/bin/env python
+"""
+Shared-memory frame bus between processes
+A capture process decodes one stream straight into the slots of a
+multiprocessing.shared_memory segment; any process on the host can attach
+by name (read-only) and read the newest frame with its header: camera id,
+stream, seq, timestamp and shape. Each slot carries a sequence lock, so
+readers never block the writer and notice a frame overwritten mid-read.
+Used by the RTSP camera when CAPTURE_PROCESSES is on.
+
+Watch a bus from another process:  python frame_bus.py firebus_1234_rtsp_camera_1_sub
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import argparse
+import os
+import pickle
+import re
+import select
+import struct
+import subprocess
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+MAGIC = b'FBUS'
+VERSION = 1
+# magic, version, slots, slot_bytes, latest slot (-1 = none), seq, grabbed, errors, camera id, stream
+HEADER = struct.Struct('<4sHHQqQQQ64s16s')
+HEADER_SIZE = 256
+# version (odd while being written, 2 * seq when complete), ts, height, width, channels, dtype
+SLOT = struct.Struct('<QdIIH8s')
+SLOT_SIZE = 64
+READ_RETRIES = 3
+EXIT_RESIZED = 3            # capture process exit code: frames outgrew the slots
+
+# ═══════════════════════════════════════════════════════════════
+# BUS
+# ═══════════════════════════════════════════════════════════════
+
+def bus_name(camera_id, stream, pid):
+    """Shared memory name for one stream of one camera server process"""
+    return re.sub(r'[^A-Za-z0-9_]', '_', f'firebus_{pid}_{camera_id}_{stream}')
+
+
+def _open_segment(name):
+    """Attach to an existing segment without letting this process unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:       # Python < 3.13: attaching registers with the resource tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class FrameBus:
+    """Fixed slots of one stream's frames in shared memory
+
+    Writer (one process):  index, buf = reserve(shape) -> decode into buf ->
+                           publish(index, frame) or cancel(index)
+    Readers (any process): read(out, newer_than) copies the newest frame
+                           into out and returns (frame, seq, ts), or None.
+    Slots are written round-robin, so a reader has slots - 1 frame times
+    to finish a read before its slot comes round again; a torn read is
+    retried. ts is time.monotonic() in the writer (one clock per host).
+    """
+
+    def __init__(self, shm, writable):
+        self.shm = shm
+        self.name = shm.name
+        self.writable = writable
+        self.buf = shm.buf if writable else shm.buf.toreadonly()
+        magic, version, self.slots, self.slot_bytes, *_ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.name} is not a frame bus (v{VERSION})")
+        self.data_offset = HEADER_SIZE + self.slots * SLOT_SIZE
+
+    @classmethod
+    def create(cls, name, slots, slot_bytes, camera_id='', stream=''):
+        slots = max(2, int(slots))         # the slot being written is never the newest
+        size = HEADER_SIZE + slots * (SLOT_SIZE + slot_bytes)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, slots, slot_bytes, -1, 0, 0, 0,
+                         camera_id.encode('utf-8')[:64], stream.encode('utf-8')[:16])
+        for index in range(slots):
+            SLOT.pack_into(shm.buf, HEADER_SIZE + index * SLOT_SIZE, 0, 0.0, 0, 0, 0, b'')
+        return cls(shm, writable=True)
+
+    @classmethod
+    def attach(cls, name, writable=False):
+        return cls(_open_segment(name), writable)
+
+    def header(self):
+        _, _, slots, slot_bytes, latest, seq, grabbed, errors, camera_id, stream = HEADER.unpack_from(self.buf, 0)
+        return {'name': self.name, 'camera_id': camera_id.rstrip(b'\0').decode('utf-8'),
+                'stream': stream.rstrip(b'\0').decode('utf-8'), 'slots': slots,
+                'slot_bytes': slot_bytes, 'latest': latest, 'seq': seq,
+                'grabbed': grabbed, 'errors': errors}
+
+    @property
+    def seq(self):
+        return struct.unpack_from('<Q', self.buf, 24)[0]
+
+    def _slot_array(self, index, shape, dtype):
+        return np.ndarray(shape, dtype, buffer=self.buf, offset=self.data_offset + index * self.slot_bytes)
+
+    # ---- writer ----------------------------------------------------------
+
+    def reserve(self, shape, dtype=np.uint8):
+        """Next slot as (index, writable array of shape); marks it as being written"""
+        dtype = np.dtype(dtype)
+        if int(np.prod(shape)) * dtype.itemsize > self.slot_bytes:
+            raise ValueError(f"{shape} frame does not fit {self.slot_bytes}-byte slots")
+        _, _, _, _, latest, seq, *_ = HEADER.unpack_from(self.buf, 0)
+        index = (latest + 1) % self.slots
+        struct.pack_into('<Q', self.buf, HEADER_SIZE + index * SLOT_SIZE, 2 * seq + 1)
+        return index, self._slot_array(index, shape, dtype)
+
+    def publish(self, index, frame, ts=None):
+        """Complete a reserved slot and make it the newest frame; returns its seq"""
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"{frame.shape} frame does not fit {self.slot_bytes}-byte slots")
+        dst = self._slot_array(index, frame.shape, frame.dtype)
+        if not np.shares_memory(dst, frame):
+            np.copyto(dst, frame)
+        seq = self.seq + 1
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        SLOT.pack_into(self.buf, HEADER_SIZE + index * SLOT_SIZE, 2 * seq,
+                       time.monotonic() if ts is None else ts, height, width, channels,
+                       frame.dtype.str.encode('ascii'))
+        struct.pack_into('<qQ', self.buf, 16, index, seq)
+        return seq
+
+    def cancel(self, index):
+        """Give back a reserved slot; it keeps its old (stale) frame"""
+        slot = HEADER_SIZE + index * SLOT_SIZE
+        version = struct.unpack_from('<Q', self.buf, slot)[0]
+        struct.pack_into('<Q', self.buf, slot, version - 1 if version & 1 else version)
+
+    def count(self, grabbed=0, errors=0):
+        """Add to the grabbed packets / capture errors counters in the header"""
+        old_grabbed, old_errors = struct.unpack_from('<QQ', self.buf, 32)
+        struct.pack_into('<QQ', self.buf, 32, old_grabbed + grabbed, old_errors + errors)
+
+    # ---- readers ---------------------------------------------------------
+
+    def read(self, out=None, newer_than=0):
+        """Copy the newest frame into out (reallocated if its shape differs)
+
+        Returns (frame, seq, ts), or None when there is no frame newer than
+        newer_than or every retry raced with the writer.
+        """
+        for _ in range(READ_RETRIES):
+            latest, seq = struct.unpack_from('<qQ', self.buf, 16)
+            if latest < 0 or seq <= newer_than:
+                return None
+            slot = HEADER_SIZE + latest * SLOT_SIZE
+            version, ts, height, width, channels, dtype = SLOT.unpack_from(self.buf, slot)
+            if version & 1 or not version:
+                continue
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            dtype = np.dtype(dtype.rstrip(b'\0').decode('ascii'))
+            if out is None or out.shape != shape or out.dtype != dtype:
+                out = np.empty(shape, dtype)
+            np.copyto(out, self._slot_array(latest, shape, dtype))
+            if struct.unpack_from('<Q', self.buf, slot)[0] == version:
+                return out, version // 2, ts
+        return None
+
+    def close(self, unlink=False):
+        self.buf.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def unlink_bus(name):
+    """Remove a bus segment by name; a no-op if it is already gone"""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+# ═══════════════════════════════════════════════════════════════
+# CAPTURE PROCESS
+# ═══════════════════════════════════════════════════════════════
+
+def open_capture(url):
+    """Open an RTSP stream with a one-frame buffer (the default capture opener)"""
+    cap = cv2.VideoCapture(url)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def capture_worker(name, open_capture, url, camera_id, stream, slots, frame_rate,
+                   on_demand, reconnect_after, demand, published, stop):
+    """Child process body: decode url into the bus called name until stop is set
+
+    A restarted worker picks up the existing bus, so readers attached to it
+    carry on; otherwise the bus is created on the first frame, sized for
+    it. Frames that outgrow the slots end the process with EXIT_RESIZED so
+    the parent can drop the bus. on_demand mirrors the in-process capture
+    modes: grab at wire rate, decode only while demand is set.
+    """
+    cap = open_capture(url)
+    try:
+        bus = FrameBus.attach(name, writable=True)
+    except (FileNotFoundError, ValueError):
+        bus = None
+    shape, dtype = None, None
+    min_interval = 1.0 / frame_rate
+    last_ok = time.monotonic()
+    next_decode = 0.0
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            if not cap.grab():
+                if bus is not None:
+                    bus.count(errors=1)
+                if now - last_ok > reconnect_after:
+                    cap.release()
+                    cap = open_capture(url)
+                    last_ok = now
+                time.sleep(0.01)
+                continue
+            last_ok = now
+            if bus is not None:
+                bus.count(grabbed=1)
+            if on_demand and (not demand.is_set() or now < next_decode):
+                continue
+            demand.clear()
+
+            index, buf = bus.reserve(shape, dtype) if shape is not None else (None, None)
+            ret, frame = cap.retrieve(buf)
+            if not ret or frame is None:
+                if index is not None:
+                    bus.cancel(index)
+                continue
+            if bus is None:
+                bus = FrameBus.create(name, slots, frame.nbytes, camera_id, stream)
+                bus.count(grabbed=1)
+            if frame.nbytes > bus.slot_bytes:
+                if index is not None:
+                    bus.cancel(index)
+                return EXIT_RESIZED
+            if index is None or frame.shape != shape:
+                if index is not None:
+                    bus.cancel(index)
+                index, _ = bus.reserve(frame.shape, frame.dtype)
+            shape, dtype = frame.shape, frame.dtype
+            bus.publish(index, frame, now)
+            published.set()
+            next_decode = max(next_decode + min_interval, now - min_interval)   # FRAME_RATE on average
+            if not on_demand:
+                time.sleep(min_interval)
+    finally:
+        cap.release()
+        buf = frame = None
+        if bus is not None:
+            bus.close()
+
+
+class PipeEvent:
+    """Event-like flag carried by a pipe, for a capture child that is not a multiprocessing child
+
+    set() writes a byte, clear() drains them, is_set() / wait() poll the
+    read end. Each process holds the end(s) it uses; a pipe whose writers
+    are all gone reads as set (EOF), so a child sees stop when the parent
+    dies. Neither end ever blocks: a full pipe is already set.
+    """
+
+    def __init__(self, read_fd=None, write_fd=None):
+        if read_fd is None and write_fd is None:
+            read_fd, write_fd = os.pipe()
+        self.read_fd, self.write_fd = read_fd, write_fd
+        for fd in (read_fd, write_fd):
+            if fd is not None:
+                os.set_blocking(fd, False)
+
+    def set(self):
+        try:
+            os.write(self.write_fd, b'\1')
+        except (BlockingIOError, BrokenPipeError):
+            pass
+
+    def clear(self):
+        try:
+            while os.read(self.read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def is_set(self):
+        return self.wait(0)
+
+    def wait(self, timeout=None):
+        return bool(select.select([self.read_fd], [], [], timeout)[0])
+
+    def close(self):
+        for fd in (self.read_fd, self.write_fd):
+            if fd is not None:
+                os.close(fd)
+        self.read_fd = self.write_fd = None
+
+
+def _capture_main(demand_fd, published_fd, stop_fd, tracker_fd):
+    """Capture child entry point: python frame_bus.py --capture-worker FD FD FD FD
+
+    The job (capture_worker's leading arguments) arrives pickled on stdin.
+    The child joins the parent's resource tracker the way a multiprocessing
+    child does, so a killed child never unlinks the bus.
+    """
+    resource_tracker._resource_tracker._fd = tracker_fd
+    sys.modules.setdefault('frame_bus', sys.modules[__name__])     # unpickle open_capture from this module
+    args = pickle.load(sys.stdin.buffer)
+    return capture_worker(*args, PipeEvent(read_fd=demand_fd), PipeEvent(write_fd=published_fd),
+                          PipeEvent(read_fd=stop_fd)) or 0
+
+
+class CaptureProcess:
+    """Parent-side handle on one capture_worker process and its bus
+
+    The parent owns the segment's lifetime: a crashed child is restarted on
+    the same bus (attached readers keep going), the bus is only recreated
+    when frames outgrow it, and release() unlinks it. The resource tracker
+    is started here and shared with the child, so a killed child never
+    takes the segment with it.
+
+    The child is a fresh interpreter running this module only (no fork: the
+    parent is multithreaded and a fork can inherit a held lock). It is not
+    a multiprocessing child either, because multiprocessing re-runs the
+    parent's main script in every child, and the camera script loads its
+    detector and web app at import. open_capture must be picklable by
+    module name (e.g. open_capture below, or a functools.partial of an
+    importable class).
+    """
+
+    def __init__(self, name, open_capture, url, camera_id, stream, slots=4, frame_rate=20,
+                 on_demand=True, reconnect_after=5):
+        self.name = name
+        resource_tracker.ensure_running()
+        self.args = (name, open_capture, url, camera_id, stream, slots, frame_rate,
+                     on_demand, reconnect_after)
+        self.demand = PipeEvent()               # set by consumers wanting a new frame
+        self.published = PipeEvent()            # set by the child after each frame
+        self.stop = PipeEvent()
+        self.process = None
+        self.bus = None
+        self.restarts = 0
+
+    def start(self):
+        self.stop.clear()
+        self.demand.set()                       # always decode the first frame
+        child_fds = (self.demand.read_fd, self.published.write_fd, self.stop.read_fd, resource_tracker.getfd())
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--capture-worker', *map(str, child_fds)],
+            stdin=subprocess.PIPE, pass_fds=child_fds)
+        with self.process.stdin:
+            self.process.stdin.write(pickle.dumps(self.args))
+        return self
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def exitcode(self):
+        return self.process.poll() if self.process is not None else None
+
+    def attach(self):
+        """The bus, once the child has created it; None before the first frame"""
+        if self.bus is None:
+            try:
+                self.bus = FrameBus.attach(self.name)
+            except (FileNotFoundError, ValueError):
+                return None
+        return self.bus
+
+    def wait_ready(self, timeout):
+        """Wait for the first frame; False if the child died or timed out"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.alive:
+            if self.published.wait(0.1) and self.attach() is not None:
+                return True
+        return False
+
+    def read(self, out=None, newer_than=0):
+        bus = self.attach()
+        return bus.read(out, newer_than) if bus is not None else None
+
+    def _close_bus(self):
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+        unlink_bus(self.name)
+
+    def _join(self, timeout):
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def restart(self):
+        """Reap the dead child and start a fresh one, on a new bus if it outgrew the old"""
+        if self.process is not None:
+            self._join(1)
+        if self.exitcode == EXIT_RESIZED:
+            self._close_bus()
+        self.restarts += 1
+        return self.start()
+
+    def release(self):
+        self.stop.set()
+        if self.process is not None:
+            self._join(2)
+            if self.process.poll() is None:
+                self.process.terminate()
+                self._join(1)
+        self._close_bus()
+        for signal in (self.demand, self.published, self.stop):
+            signal.close()
+
+    def stats(self):
+        bus = self.attach()
+        return {**(bus.header() if bus is not None else {'name': self.name}),
+                'pid': self.process.pid if self.process is not None else None,
+                'alive': self.alive, 'restarts': self.restarts}
+
+# ═══════════════════════════════════════════════════════════════
+# MAIN
+# ═══════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Attach to a frame bus read-only and report its frame rate')
+    parser.add_argument('name', nargs='?', help='bus name (see /api/metrics -> frames -> bus)')
+    parser.add_argument('--interval', type=float, default=2.0)
+    parser.add_argument('--capture-worker', nargs=4, type=int, metavar='FD', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.capture_worker:
+        sys.exit(_capture_main(*args.capture_worker))
+    if args.name is None:
+        parser.error('the bus name is required')
+
+    bus = FrameBus.attach(args.name)
+    head = bus.header()
+    print(f"[✓] Attached to {args.name}: {head['camera_id']}/{head['stream']}, "
+          f"{head['slots']} slots of {head['slot_bytes']} bytes")
+    frame, seq, last = None, bus.seq, time.monotonic()
+    try:
+        while True:
+            time.sleep(args.interval)
+            got = bus.read(frame)
+            now = time.monotonic()
+            new_seq = bus.seq
+            line = f"📺 seq {new_seq}, {(new_seq - seq) / (now - last):.1f} fps"
+            if got is not None:
+                frame, _, ts = got
+                line += f", {frame.shape}, age {(now - ts) * 1000:.0f}ms"
+            print(line)
+            seq, last = new_seq, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.close()
+
+
+if __name__ == '__main__':
+    main()
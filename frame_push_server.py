@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+"""
+WebSocket frame-push server (stdlib only)
+Serves ws://<host>:<port>/ws/stream and pushes binary messages to every
+subscriber. Each client has a one-message slot: a slow client skips stale
+frames instead of building a backlog.
+Used by the drone detector to back the web UI's WebSocket mode.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_REQUEST_BYTES = 8192
+MAX_CLIENT_MESSAGE = 65536       # clients only send control frames
+SEND_TIMEOUT = 10                # seconds before a stuck client is dropped
+
+OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+# ═══════════════════════════════════════════════════════════════
+# FRAMING HELPERS
+# ═══════════════════════════════════════════════════════════════
+
+def frame_header(length, opcode=OP_BINARY):
+    """Header of an unmasked, final server-to-client frame"""
+    if length < 126:
+        return struct.pack('!BB', 0x80 | opcode, length)
+    if length < 65536:
+        return struct.pack('!BBH', 0x80 | opcode, 126, length)
+    return struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+
+def pack_message(header, payload=b''):
+    """Binary push message: 4-byte big-endian JSON length, JSON header, payload"""
+    meta = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return struct.pack('!I', len(meta)) + meta + payload
+
+
+def _recv_exact(sock, n, idle=False):
+    """Read n bytes; recv timeouts (SEND_TIMEOUT) are retried, except before
+    the first byte when idle=True, so the caller sees an idle client"""
+    buf = bytearray()
+    while len(buf) < n:
+        try:
+            chunk = sock.recv(n - len(buf))
+        except socket.timeout:
+            if idle and not buf:
+                raise
+            continue
+        if not chunk:
+            raise ConnectionError('client closed connection')
+        buf += chunk
+    return bytes(buf)
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENT
+# ═══════════════════════════════════════════════════════════════
+
+class _Client:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = f"{addr[0]}:{addr[1]}"
+        self.cond = threading.Condition()
+        self.pending = None                 # newest unsent message only
+        self.open = True
+        self.send_lock = threading.Lock()
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+
+    def offer(self, message):
+        with self.cond:
+            if self.pending is not None:
+                self.dropped += 1           # client still busy with an older frame
+            self.pending = message
+            self.cond.notify()
+
+    def send_frame(self, payload, opcode=OP_BINARY):
+        with self.send_lock:
+            self.sock.sendall(frame_header(len(payload), opcode))
+            self.sock.sendall(payload)
+
+    def sender(self):
+        try:
+            while True:
+                with self.cond:
+                    while self.open and self.pending is None:
+                        self.cond.wait()
+                    if not self.open:
+                        return
+                    message, self.pending = self.pending, None
+                self.send_frame(message)
+                self.sent += 1
+                self.bytes_sent += len(message)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self.cond:
+            if not self.open:
+                return
+            self.open = False
+            self.cond.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER
+# ═══════════════════════════════════════════════════════════════
+
+class FramePushServer:
+    """Minimal RFC 6455 server that only pushes; see pack_message() for the format"""
+
+    def __init__(self, host='0.0.0.0', port=8765, path='/ws/stream'):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.sock = None
+        self.running = False
+        self.published = 0
+
+    @property
+    def has_subscribers(self):
+        return bool(self.clients)
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(16)
+        self.running = True
+        threading.Thread(target=self._accept_loop, name='ws-accept', daemon=True).start()
+        print(f"[✓] WebSocket push server on ws://{self.host}:{self.port}{self.path}")
+
+    def stop(self):
+        self.running = False
+        if self.sock is not None:
+            self.sock.close()
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.close()
+
+    def publish(self, message):
+        """Offer a message to every subscriber (never blocks on slow clients)"""
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.offer(message)
+        self.published += 1
+
+    def stats(self):
+        with self.lock:
+            clients = list(self.clients)
+        return {
+            'subscribers': len(clients),
+            'published': self.published,
+            'clients': {c.addr: {'sent': c.sent, 'dropped': c.dropped, 'bytes': c.bytes_sent}
+                        for c in clients}
+        }
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, addr = self.sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn, addr), daemon=True).start()
+
+    def _handshake(self, conn):
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = conn.recv(1024)
+            if not chunk or len(request) > MAX_REQUEST_BYTES:
+                return False
+            request += chunk
+
+        lines = request.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if len(parts) < 2 or parts[0] != 'GET' or parts[1].split('?')[0] != self.path:
+            conn.sendall(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            return False
+        key = headers.get('sec-websocket-key')
+        if headers.get('upgrade', '').lower() != 'websocket' or not key:
+            conn.sendall(b'HTTP/1.1 426 Upgrade Required\r\nUpgrade: websocket\r\n'
+                         b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+            return False
+
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        conn.sendall(('HTTP/1.1 101 Switching Protocols\r\n'
+                      'Upgrade: websocket\r\n'
+                      'Connection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+        return True
+
+    def _handle(self, conn, addr):
+        conn.settimeout(SEND_TIMEOUT)
+        try:
+            if not self._handshake(conn):
+                conn.close()
+                return
+        except OSError:
+            conn.close()
+            return
+
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = _Client(conn, addr)
+        with self.lock:
+            self.clients.add(client)
+        print(f"🔌 WebSocket client connected: {client.addr} ({len(self.clients)} total)")
+        threading.Thread(target=client.sender, daemon=True).start()
+        try:
+            self._read_loop(client)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            client.close()
+            with self.lock:
+                self.clients.discard(client)
+            print(f"🔌 WebSocket client disconnected: {client.addr} "
+                  f"(sent {client.sent}, dropped {client.dropped})")
+
+    def _read_loop(self, client):
+        """Handle control frames from the client (ping, close); data is ignored"""
+        conn = client.sock      # keeps SEND_TIMEOUT so the sender can drop a stuck client
+        while client.open:
+            try:
+                b1, b2 = _recv_exact(conn, 2, idle=True)
+            except socket.timeout:
+                continue        # idle client: nothing to read yet
+            opcode = b1 & 0x0F
+            length = b2 & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', _recv_exact(conn, 2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', _recv_exact(conn, 8))[0]
+            if length > MAX_CLIENT_MESSAGE:
+                return
+            mask = _recv_exact(conn, 4) if b2 & 0x80 else b'\x00\x00\x00\x00'
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(_recv_exact(conn, length)))
+
+            if opcode == OP_CLOSE:
+                try:
+                    client.send_frame(data[:2], OP_CLOSE)
+                except OSError:
+                    pass
+                return
+            if opcode == OP_PING:
+                client.send_frame(data, OP_PONG)
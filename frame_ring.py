@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Preallocated frame ring with reference-counted read leases
+The capture thread decodes straight into a free slot and publishes it by
+index; readers lease the newest slot and get a read-only view of it, so no
+consumer copies a frame and no slot is overwritten while it is leased.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import threading
+import time
+
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════
+# LEASES
+# ═══════════════════════════════════════════════════════════════
+
+class FrameLease:
+    """Read access to one published frame until release()
+
+    frame is a read-only view of the slot; seq and ts are the publish
+    sequence number and time.monotonic() of the frame. Usable as a context
+    manager; releasing twice is harmless.
+    """
+
+    __slots__ = ('ring', 'index', 'frame', 'seq', 'ts', 'released')
+
+    def __init__(self, ring, index, frame, seq, ts):
+        self.ring = ring
+        self.index = index
+        self.frame = frame
+        self.seq = seq
+        self.ts = ts
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.ring._release(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+# ═══════════════════════════════════════════════════════════════
+# RING
+# ═══════════════════════════════════════════════════════════════
+
+class FrameRing:
+    """Fixed set of reusable frame buffers for one stream
+
+    Producer:  index, buf = reserve(shape)  -> decode into buf (None until
+               the first frame, or when shape is unknown) -> publish(index,
+               frame) or cancel(index). A frame that is not buf (first frame,
+               resolution change) is adopted as the slot's new buffer.
+    Readers:   lease(newer_than) / wait(newer_than, timeout) -> FrameLease.
+    The newest frame and leased slots are never handed to the producer; if
+    every slot is busy the ring grows by one slot instead of blocking, so it
+    settles at the high-water mark of concurrent readers. The ring's own
+    lock is only held to flip indices and refcounts, never while a frame
+    is decoded or read; cond is notified on every publish and on close().
+    """
+
+    def __init__(self, slots=4, name='frames'):
+        self.name = name
+        self.buffers = [None] * max(2, int(slots))     # writable, producer only
+        self.views = [None] * len(self.buffers)        # read-only, handed to readers
+        self.refs = [0] * len(self.buffers)
+        self.slot_seq = [0] * len(self.buffers)
+        self.slot_ts = [None] * len(self.buffers)
+        self.writing = set()
+        self.latest = None                              # index of the newest frame
+        self.seq = 0
+        self.ts = None
+        self.closed = False
+        self.cond = threading.Condition()
+        self.counters = {
+            'published': 0,
+            'leases': 0,
+            'allocated': 0,         # slot buffers (re)allocated, ideally once per slot
+            'grown': 0              # slots added because every slot was busy
+        }
+
+    # ---- producer --------------------------------------------------------
+
+    def reserve(self, shape=None, dtype=np.uint8):
+        """Free slot as (index, writable buffer or None); never blocks"""
+        with self.cond:
+            for index in range(len(self.buffers)):
+                if index != self.latest and not self.refs[index] and index not in self.writing:
+                    break
+            else:
+                index = len(self.buffers)
+                self.buffers.append(None)
+                self.views.append(None)
+                self.refs.append(0)
+                self.slot_seq.append(0)
+                self.slot_ts.append(None)
+                self.counters['grown'] += 1
+            self.writing.add(index)
+            buf = self.buffers[index]
+        if shape is not None and (buf is None or buf.shape != tuple(shape) or buf.dtype != dtype):
+            buf = self._adopt(index, np.empty(shape, dtype))
+        return index, buf
+
+    def publish(self, index, frame, ts=None):
+        """Make a reserved slot the newest frame; returns its sequence number"""
+        if frame is not self.buffers[index]:
+            self._adopt(index, frame)
+        with self.cond:
+            self.writing.discard(index)
+            self.seq += 1
+            self.ts = time.monotonic() if ts is None else ts
+            self.slot_seq[index] = self.seq
+            self.slot_ts[index] = self.ts
+            self.latest = index
+            self.counters['published'] += 1
+            self.cond.notify_all()
+            return self.seq
+
+    def cancel(self, index):
+        """Give back a reserved slot without publishing it"""
+        with self.cond:
+            self.writing.discard(index)
+
+    def _adopt(self, index, frame):
+        view = frame.view()
+        view.flags.writeable = False
+        self.buffers[index] = frame
+        self.views[index] = view
+        self.counters['allocated'] += 1
+        return frame
+
+    # ---- readers ---------------------------------------------------------
+
+    def lease(self, newer_than=0):
+        """Lease the newest frame if its seq is above newer_than, else None"""
+        with self.cond:
+            return self._lease_latest(newer_than)
+
+    def wait(self, newer_than=0, timeout=None):
+        """Block until a frame newer than newer_than is published and lease it
+
+        Returns None on timeout or once the ring is closed.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > newer_than or self.closed, timeout)
+            if self.closed:
+                return None
+            return self._lease_latest(newer_than)
+
+    def _lease_latest(self, newer_than):
+        if self.latest is None or self.seq <= newer_than:
+            return None
+        index = self.latest
+        self.refs[index] += 1
+        self.counters['leases'] += 1
+        return FrameLease(self, index, self.views[index], self.slot_seq[index], self.slot_ts[index])
+
+    def _release(self, index):
+        with self.cond:
+            self.refs[index] -= 1
+
+    # ---- lifecycle -------------------------------------------------------
+
+    def close(self):
+        """Wake every waiting reader; outstanding leases stay valid"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {'name': self.name, 'slots': len(self.buffers), 'seq': self.seq,
+                    'leased': sum(1 for refs in self.refs if refs), **self.counters}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Cheap per-frame statistics for fire checks
+Brightness and mean B/G/R are taken from the change gate's thumbnail (an
+area-averaged downscale keeps the means) with cv2.mean, instead of a full
+resolution gray conversion and np.mean per check. Optional fire
+pre-features (red/orange HSV fraction, saturation histogram) come from the
+same thumbnail, so they cost a few thousand pixels.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import cv2
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+# OpenCV hue is 0-179; red wraps around 0
+FIRE_HUE_RANGES = ((0, 25), (170, 179))
+FIRE_MIN_SATURATION = 100
+FIRE_MIN_VALUE = 150
+SATURATION_BINS = 8
+
+# ═══════════════════════════════════════════════════════════════
+# STATISTICS
+# ═══════════════════════════════════════════════════════════════
+
+def frame_stats(small, gray=None, features=False):
+    """Brightness and mean B/G/R of a BGR thumbnail, plus fire_features() if asked"""
+    if gray is None:
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    blue, green, red, _ = cv2.mean(small)
+    stats = {
+        'brightness': cv2.mean(gray)[0],
+        'mean_blue': blue,
+        'mean_green': green,
+        'mean_red': red
+    }
+    if features:
+        stats.update(fire_features(small))
+    return stats
+
+
+def fire_features(small):
+    """Fraction of saturated, bright red/orange pixels and a normalised saturation histogram"""
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    mask = None
+    for low, high in FIRE_HUE_RANGES:
+        part = cv2.inRange(hsv, (low, FIRE_MIN_SATURATION, FIRE_MIN_VALUE), (high, 255, 255))
+        mask = part if mask is None else cv2.bitwise_or(mask, part)
+    pixels = hsv.shape[0] * hsv.shape[1]
+    hist = cv2.calcHist([hsv], [1], None, [SATURATION_BINS], [0, 256]).ravel()
+    return {
+        'fire_fraction': cv2.countNonZero(mask) / pixels,
+        'saturation_hist': [round(float(count) / pixels, 3) for count in hist]
+    }
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Local HLS segment source
+Tails a live playlist written by nginx-rtmp and streams its .ts segments
+straight from disk as one continuous MPEG-TS byte stream, so a detector on
+the same host as nginx never fetches segments over HTTP.
+Used by the drone detector: av.open(LocalSegmentReader(path), format='mpegts').
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import io
+import os
+import time
+
+from hls_watcher import Inotify, IN_CLOSE_WRITE, IN_MOVED_TO
+
+# ═══════════════════════════════════════════════════════════════
+# PLAYLIST PARSING
+# ═══════════════════════════════════════════════════════════════
+
+def parse_playlist(text):
+    """(media_sequence, [segment URIs]) of a media playlist"""
+    sequence = 0
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            try:
+                sequence = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif line and not line.startswith('#'):
+            segments.append(line)
+    return sequence, segments
+
+# ═══════════════════════════════════════════════════════════════
+# SEGMENT READER
+# ═══════════════════════════════════════════════════════════════
+
+class LocalSegmentReader(io.RawIOBase):
+    """Read-only, non-seekable stream over the segments of a live local playlist
+
+    Starts at the newest segment (live edge) and follows the playlist as
+    nginx appends to it. Segments removed by hls_cleanup before we reach them
+    are skipped. read() returns EOF once no new segment has appeared for
+    stall_timeout seconds, which ends the demuxer so the caller can reconnect.
+    """
+
+    def __init__(self, playlist_path, stall_timeout=10.0, poll_interval=0.1):
+        super().__init__()
+        self.playlist_path = playlist_path
+        self.directory = os.path.dirname(os.path.abspath(playlist_path))
+        self.stall_timeout = stall_timeout
+        self.poll_interval = poll_interval
+        self.next_sequence = None           # media sequence number of the next segment to read
+        self.current = None                 # open segment file
+        self.counters = {'segments': 0, 'skipped': 0, 'bytes': 0}
+
+        try:
+            self.notifier = Inotify()
+            self.notifier.add_watch(self.directory, IN_CLOSE_WRITE | IN_MOVED_TO)
+        except OSError:
+            self.notifier = None            # poll the playlist instead
+
+    def readable(self):
+        return True
+
+    def _next_segment(self):
+        """Path of the next unread segment in the playlist, or None if none yet"""
+        try:
+            with open(self.playlist_path, 'r') as f:
+                sequence, segments = parse_playlist(f.read())
+        except OSError:
+            return None
+        if not segments:
+            return None
+        if self.next_sequence is None:
+            self.next_sequence = sequence + len(segments) - 1          # live edge
+        if self.next_sequence < sequence:
+            # Fell behind the playlist window; resume from the oldest listed segment
+            self.counters['skipped'] += sequence - self.next_sequence
+            self.next_sequence = sequence
+        index = self.next_sequence - sequence
+        if index > len(segments):
+            # Sequence went backwards (playlist restarted); rejoin at the live edge
+            index = len(segments) - 1
+            self.next_sequence = sequence + index
+        elif index == len(segments):
+            return None                     # nothing new yet
+        self.next_sequence += 1
+        return os.path.join(self.directory, segments[index])
+
+    def _wait_for_update(self, timeout):
+        if self.notifier is not None:
+            self.notifier.read(timeout)
+        else:
+            time.sleep(min(self.poll_interval, timeout))
+
+    def _open_next(self):
+        """Open the next segment, waiting for the playlist; False after stall_timeout"""
+        deadline = time.monotonic() + self.stall_timeout
+        while not self.closed:
+            path = self._next_segment()
+            if path is not None:
+                try:
+                    self.current = open(path, 'rb')
+                    self.counters['segments'] += 1
+                    return True
+                except FileNotFoundError:
+                    self.counters['skipped'] += 1       # already cleaned up
+                    continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._wait_for_update(remaining)
+        return False
+
+    def readinto(self, buffer):
+        while True:
+            if self.current is None and not self._open_next():
+                return 0
+            n = self.current.readinto(buffer)
+            if n:
+                self.counters['bytes'] += n
+                return n
+            self.current.close()
+            self.current = None
+
+    def stats(self):
+        return {'next_sequence': self.next_sequence, **self.counters}
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+        if self.notifier is not None:
+            self.notifier.close()
+            self.notifier = None
+        super().close()
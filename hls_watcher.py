@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+HLS readiness watcher
+Blocks until nginx-rtmp has written a playlist that lists at least one
+segment. Uses inotify (via ctypes) on Linux so the detector reacts to the
+first playlist write instead of a fixed poll; falls back to polling where
+inotify is unavailable (e.g. macOS).
+Used by the drone detector.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+IN_MODIFY      = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_ISDIR       = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT = struct.Struct('iIII')      # wd, mask, cookie, name length
+
+# ═══════════════════════════════════════════════════════════════
+# PLAYLIST CHECK
+# ═══════════════════════════════════════════════════════════════
+
+def playlist_ready(path):
+    """True if the playlist at path lists at least one segment"""
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+    except OSError:
+        return False
+    return '#EXTINF' in text and any(line.strip() and not line.startswith('#')
+                                     for line in text.splitlines())
+
+
+def find_ready_playlist(root):
+    """First ready .m3u8 in root or one directory below it (e.g. stream/), or None"""
+    try:
+        entries = sorted(os.listdir(root))
+    except OSError:
+        return None
+    subdirs = []
+    for name in entries:
+        path = os.path.join(root, name)
+        if name.endswith('.m3u8') and playlist_ready(path):
+            return path
+        if os.path.isdir(path):
+            subdirs.append(path)
+    for sub in subdirs:
+        try:
+            names = sorted(os.listdir(sub))
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(sub, name)
+            if name.endswith('.m3u8') and playlist_ready(path):
+                return path
+    return None
+
+# ═══════════════════════════════════════════════════════════════
+# INOTIFY
+# ═══════════════════════════════════════════════════════════════
+
+class Inotify:
+    """Minimal non-blocking inotify wrapper; raises OSError where unsupported"""
+
+    def __init__(self):
+        name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available on this platform')
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        if path in self.watches.values():
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+        self.watches[wd] = path
+
+    def read(self, timeout):
+        """Events as (directory, name, mask); empty list on timeout"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            events.append((self.watches.get(wd), name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+# ═══════════════════════════════════════════════════════════════
+# WAIT
+# ═══════════════════════════════════════════════════════════════
+
+def wait_for_playlist(root, timeout=None, poll_interval=0.5, on_idle=None, idle_every=30.0):
+    """Block until a ready playlist appears under root; returns its path or None on timeout
+
+    on_idle() is called every idle_every seconds without a playlist (e.g. to
+    run diagnostics).
+    """
+    found = find_ready_playlist(root)
+    if found:
+        return found
+
+    notifier = None
+    try:
+        notifier = Inotify()
+        notifier.add_watch(root)
+        for name in os.listdir(root):
+            if os.path.isdir(os.path.join(root, name)):
+                notifier.add_watch(os.path.join(root, name))
+    except OSError as e:
+        print(f"[!] inotify unavailable ({e}) - polling {root} every {poll_interval}s")
+        if notifier is not None:
+            notifier.close()
+        notifier = None
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    next_idle = time.monotonic() + idle_every
+    try:
+        while True:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return None
+            if on_idle is not None and now >= next_idle:
+                on_idle()
+                next_idle = time.monotonic() + idle_every
+            wait = min(idle_every, next_idle - now)
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            wait = max(0.0, wait)
+
+            if notifier is None:
+                time.sleep(min(poll_interval, wait))
+            else:
+                events = notifier.read(wait)
+                if not events:
+                    continue
+                relevant = False
+                for directory, name, mask in events:
+                    if mask & IN_ISDIR and directory == root:
+                        notifier.add_watch(os.path.join(root, name))   # nested layout (stream/)
+                        relevant = True
+                    elif name.endswith('.m3u8'):
+                        relevant = True
+                if not relevant:
+                    continue
+
+            found = find_ready_playlist(root)
+            if found:
+                return found
+    finally:
+        if notifier is not None:
+            notifier.close()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+"""
+Shared HTTP client for the AI fire detection endpoint
+Keeps connections to API Gateway alive across checks instead of paying a
+fresh TCP + TLS handshake per frame, retries 5xx/timeouts with backoff,
+optionally batches frames from several callers into one multipart POST and
+reports where each round trip spends its time.
+Used by both the RTSP camera and the drone detector.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import json
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import httpx                    # Optional: only needed for HTTP/2
+except ImportError:
+    httpx = None
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+BATCH_CONTENT_TYPE = 'multipart/form-data'
+
+# ═══════════════════════════════════════════════════════════════
+# CONNECTION TIMING HOOKS
+# ═══════════════════════════════════════════════════════════════
+
+# Filled in by the connection classes below on the thread making the request.
+# Left as None when the request reused a pooled keep-alive connection.
+_conn_timings = threading.local()
+
+
+class _TimedConnectionMixin:
+    """Record TCP connect and TLS handshake time for new connections"""
+
+    def _new_conn(self):
+        t0 = time.perf_counter()
+        sock = super()._new_conn()
+        _conn_timings.tcp = time.perf_counter() - t0
+        return sock
+
+    def connect(self):
+        _conn_timings.tcp = None
+        t0 = time.perf_counter()
+        super().connect()
+        total = time.perf_counter() - t0
+        tcp = _conn_timings.tcp if _conn_timings.tcp is not None else total
+        _conn_timings.connect = tcp
+        _conn_timings.tls = max(0.0, total - tcp)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+# ═══════════════════════════════════════════════════════════════
+# INFERENCE CLIENT
+# ═══════════════════════════════════════════════════════════════
+
+class InferenceClient:
+    """Pooled keep-alive client for posting frames to the AI endpoint
+
+    post_frame() returns (response, timings). timings holds seconds for
+    'connect' and 'tls' (both None when a pooled connection was reused),
+    'ttfb' (request start to response headers), 'total', plus 'attempts'.
+    httpx/requests exceptions are normalised to requests.exceptions so
+    callers only need one set of except clauses.
+
+    With batch_size > 1, frames posted within batch_wait seconds of each
+    other (from any thread) go out as one multipart/form-data POST, one
+    part per frame with its own camera-id header. The endpoint answers
+    {"results": [...]} in part order; each caller gets a BatchItemResponse
+    for its own frame, and timings gain 'batch' (frames in the POST) and
+    'queue' (seconds spent waiting for the batch to fill).
+    """
+
+    def __init__(self, endpoint, pool_size=4, retries=2, backoff=0.25,
+                 timeout=10, http2=False, name='ai', batch_size=1, batch_wait=0.05):
+        self.endpoint = endpoint
+        self.pool_size = max(1, int(pool_size))
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.timeout = timeout
+        self.name = name
+        self.http2 = False
+        self.lock = threading.Lock()
+        self.last_timings = None
+        self.counters = {
+            'requests': 0,
+            'attempts': 0,
+            'retries': 0,
+            'new_connections': 0,
+            'reused_connections': 0,
+            'errors': 0,
+            'batches': 0,
+            'batched_frames': 0
+        }
+
+        if http2:
+            self.http2 = self._init_http2()
+        if not self.http2:
+            self.session = requests.Session()
+            adapter = _TimedAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                    max_retries=0, pool_block=False)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.session.headers['Connection'] = 'keep-alive'
+
+        # One sender per pooled connection, each filling its own batch
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.batch_queue = []
+        self.batch_cond = threading.Condition()
+        self.batch_running = self.batch_size > 1
+        self.batch_collecting = False       # one sender fills a batch at a time
+        self.batch_senders = []
+        if self.batch_running:
+            for i in range(self.pool_size):
+                t = threading.Thread(target=self._batch_sender, name=f'{name}-batch-{i}', daemon=True)
+                t.start()
+                self.batch_senders.append(t)
+
+    def _init_http2(self):
+        if httpx is None:
+            print(f"[!] {self.name}: HTTP/2 requested but httpx is not installed - using HTTP/1.1")
+            return False
+        try:
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size)
+            self.session = httpx.Client(http2=True, limits=limits, timeout=self.timeout)
+        except ImportError:
+            print(f"[!] {self.name}: HTTP/2 requested but h2 is not installed - using HTTP/1.1")
+            return False
+        return True
+
+    def post_frame(self, payload, camera_id, timeout=None, content_type='image/jpeg'):
+        """POST one encoded frame, retrying 5xx and timeouts with exponential backoff"""
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            self.counters['requests'] += 1
+        if self.batch_running:
+            return self._post_batched(payload, camera_id, timeout, content_type)
+        headers = {'Content-Type': content_type, 'camera-id': camera_id}
+        return self._post(payload, headers, timeout)
+
+    def _post(self, payload, headers, timeout):
+        for attempt in range(self.retries + 1):
+            try:
+                resp, timings = self._send(payload, headers, timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                if attempt == self.retries:
+                    with self.lock:
+                        self.counters['errors'] += 1
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    timings['attempts'] = attempt + 1
+                    self.last_timings = timings
+                    return resp, timings
+            with self.lock:
+                self.counters['retries'] += 1
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def _post_time(self, timeout):
+        """Longest _post() can take: every attempt timing out, plus the backoff between them"""
+        return (self.retries + 1) * timeout + sum(self.backoff * (2 ** attempt) for attempt in range(self.retries))
+
+    # ---- batching --------------------------------------------------------
+
+    def _post_batched(self, payload, camera_id, timeout, content_type):
+        item = {'payload': payload, 'camera_id': camera_id, 'timeout': timeout,
+                'content_type': content_type, 'queued': time.perf_counter(),
+                'done': threading.Event(), 'result': None, 'error': None}
+        with self.batch_cond:
+            self.batch_queue.append(item)
+            self.batch_cond.notify()
+        # Wait as long as the sender may spend on this frame (collecting the
+        # batch, then every retry and backoff of _post) but no longer: a dead
+        # sender or a close() race must not hold a dispatcher worker forever
+        limit = self.batch_wait + self._post_time(timeout)
+        if not item['done'].wait(limit):
+            with self.batch_cond:
+                queued = len(self.batch_queue)
+                self.batch_queue = [other for other in self.batch_queue if other is not item]
+                unsent = len(self.batch_queue) < queued
+            if unsent:                  # a sent frame's failure is counted by its sender
+                with self.lock:
+                    self.counters['errors'] += 1
+            raise requests.exceptions.Timeout(f"{self.name}: no batch response within {limit:.1f}s")
+        if item['error'] is not None:
+            raise item['error']
+        return item['result']
+
+    def _next_batch(self):
+        with self.batch_cond:
+            while self.batch_running and (not self.batch_queue or self.batch_collecting):
+                self.batch_cond.wait()
+            if not self.batch_running:
+                return None
+            self.batch_collecting = True
+            try:
+                deadline = time.monotonic() + self.batch_wait
+                while self.batch_running and len(self.batch_queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.batch_cond.wait(remaining)
+                batch = self.batch_queue[:self.batch_size]
+                del self.batch_queue[:self.batch_size]
+                return batch
+            finally:
+                self.batch_collecting = False
+                self.batch_cond.notify_all()    # next sender picks up what is left
+
+    def _batch_sender(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            sent = time.perf_counter()
+            try:
+                if len(batch) == 1:
+                    item = batch[0]
+                    headers = {'Content-Type': item['content_type'], 'camera-id': item['camera_id']}
+                    results = [self._post(item['payload'], headers, item['timeout'])]
+                else:
+                    results = self._post_multipart(batch)
+            except Exception as e:
+                for item in batch:
+                    item['error'] = e
+                    item['done'].set()
+                continue
+            for item, (resp, timings) in zip(batch, results):
+                item['result'] = (resp, dict(timings, batch=len(batch), queue=sent - item['queued']))
+                item['done'].set()
+
+    def _post_multipart(self, batch):
+        """One POST for the whole batch; returns [(response, timings)] in batch order"""
+        boundary = uuid.uuid4().hex
+        chunks = []
+        for i, item in enumerate(batch):
+            chunks.append((f"--{boundary}\r\n"
+                           f'Content-Disposition: form-data; name="frame{i}"; filename="{item["camera_id"]}"\r\n'
+                           f"Content-Type: {item['content_type']}\r\n"
+                           f"camera-id: {item['camera_id']}\r\n\r\n").encode('utf-8'))
+            chunks.append(item['payload'])
+            chunks.append(b'\r\n')
+        chunks.append(f"--{boundary}--\r\n".encode('utf-8'))
+        headers = {'Content-Type': f'{BATCH_CONTENT_TYPE}; boundary={boundary}',
+                   'batch-size': str(len(batch)),
+                   'camera-id': ','.join(item['camera_id'] for item in batch)}
+        with self.lock:
+            self.counters['batches'] += 1
+            self.counters['batched_frames'] += len(batch)
+
+        resp, timings = self._post(b''.join(chunks), headers, max(item['timeout'] for item in batch))
+        return [(item_resp, timings) for item_resp in split_batch_response(resp, len(batch))]
+
+    def _send(self, payload, headers, timeout):
+        with self.lock:
+            self.counters['attempts'] += 1
+        if self.http2:
+            return self._send_httpx(payload, headers, timeout)
+
+        _conn_timings.connect = None
+        _conn_timings.tls = None
+        t0 = time.perf_counter()
+        resp = self.session.post(self.endpoint, data=payload, headers=headers, timeout=timeout)
+        total = time.perf_counter() - t0
+        timings = {
+            'connect': _conn_timings.connect,
+            'tls': _conn_timings.tls,
+            'ttfb': resp.elapsed.total_seconds(),   # requests stops the clock at the headers
+            'total': total,
+            'status': resp.status_code,
+            'http_version': 'HTTP/1.1',
+            'handshake_timed': True
+        }
+        self._count_connection(timings)
+        return resp, timings
+
+    def _send_httpx(self, payload, headers, timeout):
+        t0 = time.perf_counter()
+        try:
+            request = self.session.build_request('POST', self.endpoint, content=payload,
+                                                 headers=headers, timeout=timeout)
+            resp = self.session.send(request, stream=True)
+            ttfb = time.perf_counter() - t0
+            try:
+                resp.read()
+            finally:
+                resp.close()
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        # httpx does not expose per-connection handshake timings
+        timings = {
+            'connect': None,
+            'tls': None,
+            'ttfb': ttfb,
+            'total': time.perf_counter() - t0,
+            'status': resp.status_code,
+            'http_version': resp.http_version,
+            'handshake_timed': False
+        }
+        return resp, timings
+
+    def _count_connection(self, timings):
+        with self.lock:
+            if timings['connect'] is None:
+                self.counters['reused_connections'] += 1
+            else:
+                self.counters['new_connections'] += 1
+
+    def stats(self):
+        """Counters plus the timings of the most recent request"""
+        with self.lock:
+            return {'name': self.name, 'http2': self.http2, 'batch_size': self.batch_size,
+                    'last_timings': self.last_timings, **self.counters}
+
+    def close(self):
+        with self.batch_cond:
+            self.batch_running = False
+            pending, self.batch_queue = self.batch_queue, []
+            self.batch_cond.notify_all()
+        for item in pending:
+            item['error'] = requests.exceptions.ConnectionError(f"{self.name}: client closed")
+            item['done'].set()
+        self.session.close()
+
+# ═══════════════════════════════════════════════════════════════
+# BATCH RESPONSES
+# ═══════════════════════════════════════════════════════════════
+
+class BatchItemResponse:
+    """One frame's slice of a batch response, shaped like a requests.Response"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def split_batch_response(resp, count):
+    """Per-frame responses from a batch reply; a failed batch fails every frame"""
+    if resp.status_code != 200:
+        return [BatchItemResponse(resp.status_code, resp.text)] * count
+    try:
+        body = resp.json()
+        results = body['results'] if isinstance(body, dict) else body
+        if len(results) != count:
+            raise ValueError(f"{len(results)} results for {count} frames")
+    except (ValueError, KeyError, TypeError) as e:
+        return [BatchItemResponse(502, f"Malformed batch response: {e}")] * count
+    items = []
+    for result in results:
+        result = dict(result)
+        items.append(BatchItemResponse(int(result.pop('status', 200)), json.dumps(result)))
+    return items
+
+
+def format_timings(timings):
+    """Compact one-line view of post_frame() timings, in milliseconds"""
+    if not timings:
+        return 'no timings'
+
+    def ms(value):
+        if value is None:
+            return 'reused' if timings.get('handshake_timed') else 'n/a'
+        return f"{value * 1000:.0f}ms"
+
+    line = (f"connect={ms(timings.get('connect'))} tls={ms(timings.get('tls'))} "
+            f"ttfb={ms(timings.get('ttfb'))} total={ms(timings.get('total'))} "
+            f"attempts={timings.get('attempts', 1)}")
+    if timings.get('batch', 1) > 1:
+        line += f" batch={timings['batch']} queue={ms(timings.get('queue'))}"
+    return line
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Bounded-concurrency inference dispatcher
+Keeps fire checks on a fixed cadence while AI requests run in the background.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import threading
+import time
+from collections import deque
+
+# ═══════════════════════════════════════════════════════════════
+# DISPATCHER
+# ═══════════════════════════════════════════════════════════════
+
+class InferenceDispatcher:
+    """Run inference calls on a worker pool without blocking the caller
+
+    submit() never blocks: pending frames are queued per key (camera), and
+    when every worker is busy and a key's queue (max_pending) is full, that
+    key's oldest pending frame is dropped so its newest one wins. Workers
+    take keys round-robin, so one camera's frames never evict another's.
+    Frames older than max_frame_age are discarded before being sent, and a
+    result is only delivered if its capture timestamp is newer than the
+    last result delivered for the same key, so stale frames are never scored.
+    A job's done() callback runs exactly once, as soon as the dispatcher no
+    longer needs its frame (inferred, dropped, stale or stopped), so frames
+    leased from a FrameRing go back to the ring.
+    """
+
+    def __init__(self, infer, on_result, max_in_flight=2, max_pending=1,
+                 max_frame_age=None, name='ai'):
+        self.infer = infer                  # infer(frame, **context) -> result
+        self.on_result = on_result          # on_result(result, capture_ts, context)
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_frame_age = max_frame_age
+        self.name = name
+
+        self.max_pending = max(1, int(max_pending))
+        self.pending = {}                   # key -> deque of jobs, at most max_pending
+        self.ready = deque()                # keys with pending jobs, round-robin order
+        self.cond = threading.Condition()
+        self.deliver_lock = threading.Lock()
+        self.running = True
+        self.in_flight = 0
+        self.last_delivered = {}            # key -> capture_ts of last delivered result
+        self.counters = {
+            'submitted': 0,
+            'dropped': 0,                   # replaced by a newer frame while pending
+            'stale': 0,                     # too old to send, or overtaken by a newer result
+            'completed': 0,
+            'errors': 0
+        }
+        self.last_latency = None            # capture -> result, seconds
+        self.last_queue_wait = None         # submit -> dequeue, seconds
+
+        self.workers = []
+        for i in range(self.max_in_flight):
+            t = threading.Thread(target=self._worker, name=f'{name}-dispatch-{i}', daemon=True)
+            t.start()
+            self.workers.append(t)
+
+    def submit(self, frame, capture_ts=None, key=None, done=None, **context):
+        """Queue a frame for inference; returns False if an older frame was dropped
+
+        After stop() nothing is queued: done() runs at once and it returns False.
+        """
+        if capture_ts is None:
+            capture_ts = time.monotonic()
+        job = {
+            'frame': frame,
+            'capture_ts': capture_ts,
+            'submit_ts': time.monotonic(),
+            'key': key,
+            'done': done,
+            'context': context
+        }
+        evicted = None
+        with self.cond:
+            if not self.running:
+                evicted = job               # stopped: no worker will ever take it
+            else:
+                queue = self.pending.get(key)
+                if queue is None:
+                    queue = self.pending[key] = deque()
+                    self.ready.append(key)
+                if len(queue) >= self.max_pending:
+                    evicted = queue.popleft()
+                    self.counters['dropped'] += 1
+                queue.append(job)
+                self.counters['submitted'] += 1
+                self.cond.notify()
+        if evicted is not None:
+            self._done(evicted)
+        return evicted is None
+
+    @staticmethod
+    def _done(job):
+        if job['done'] is not None:
+            job['done']()
+
+    def _next_job(self):
+        with self.cond:
+            while self.running and not self.ready:
+                self.cond.wait()
+            if not self.running:
+                return None
+            key = self.ready.popleft()
+            queue = self.pending[key]
+            job = queue.popleft()
+            if queue:
+                self.ready.append(key)
+            else:
+                del self.pending[key]
+            self.in_flight += 1
+            return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._run_job(job)
+            finally:
+                with self.cond:
+                    self.in_flight -= 1
+
+    def _run_job(self, job):
+        now = time.monotonic()
+        self.last_queue_wait = now - job['submit_ts']
+        if self.max_frame_age is not None and now - job['capture_ts'] > self.max_frame_age:
+            self._done(job)
+            with self.cond:
+                self.counters['stale'] += 1
+            return
+
+        try:
+            result = self.infer(job['frame'], **job['context'])
+        except Exception as e:
+            print(f"[!] {self.name} inference error: {e}")
+            with self.cond:
+                self.counters['errors'] += 1
+            return
+        finally:
+            self._done(job)
+
+        # Check-and-deliver under one lock so results are applied in capture order
+        with self.deliver_lock:
+            last = self.last_delivered.get(job['key'])
+            if last is not None and job['capture_ts'] <= last:
+                # A newer frame for this key already finished first
+                with self.cond:
+                    self.counters['stale'] += 1
+                return
+            self.last_delivered[job['key']] = job['capture_ts']
+            with self.cond:
+                self.counters['completed'] += 1
+                self.last_latency = time.monotonic() - job['capture_ts']
+            try:
+                self.on_result(result, job['capture_ts'], job['context'])
+            except Exception as e:
+                print(f"[!] {self.name} result handler error: {e}")
+
+    def stats(self):
+        """Snapshot of queue depth, in-flight requests and counters"""
+        with self.cond:
+            return {
+                'name': self.name,
+                'pending': sum(len(queue) for queue in self.pending.values()),
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'last_latency': self.last_latency,
+                'last_queue_wait': self.last_queue_wait,
+                **self.counters
+            }
+
+    def stop(self):
+        """Stop workers; requests already in flight finish in the background"""
+        with self.cond:
+            self.running = False
+            pending = [job for queue in self.pending.values() for job in queue]
+            self.pending.clear()
+            self.ready.clear()
+            self.cond.notify_all()
+        for job in pending:
+            self._done(job)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Inference payload builder
+Shrinks what we upload per fire check: crop to the camera's regions of
+interest, downscale to the model input size and pick the encoder quality
+that fits a byte budget. Boxes returned by the AI are mapped back to
+source-frame coordinates.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import threading
+
+import cv2
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+FORMATS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY, 'image/jpeg'),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY, 'image/webp')
+}
+
+# ═══════════════════════════════════════════════════════════════
+# PAYLOAD BUILDER
+# ═══════════════════════════════════════════════════════════════
+
+class PayloadBuilder:
+    """Build the encoded image sent to the AI endpoint
+
+    rois are normalised [x1, y1, x2, y2] rectangles (0-1, so they work for
+    both main and sub streams); the crop is their bounding union. The
+    longest side is downscaled to target_size. With a byte_budget the
+    quality adapts between min_quality and max_quality: lowered until the
+    payload fits, and raised again when there is plenty of headroom.
+    """
+
+    def __init__(self, target_size=640, rois=None, byte_budget=None, quality=85,
+                 min_quality=40, max_quality=90, fmt='jpeg'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported payload format: {fmt}")
+        self.target_size = target_size
+        self.rois = rois or []
+        self.byte_budget = byte_budget
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.quality = max(min_quality, min(quality, max_quality))
+        self.ext, self.quality_flag, self.content_type = FORMATS[fmt]
+        self.lock = threading.Lock()
+
+    def roi_rect(self, width, height):
+        """Pixel crop rectangle (x1, y1, x2, y2) covering every ROI"""
+        if not self.rois:
+            return 0, 0, width, height
+        x1 = min(r[0] for r in self.rois)
+        y1 = min(r[1] for r in self.rois)
+        x2 = max(r[2] for r in self.rois)
+        y2 = max(r[3] for r in self.rois)
+        x1, x2 = int(max(0.0, x1) * width), int(min(1.0, x2) * width)
+        y1, y2 = int(max(0.0, y1) * height), int(min(1.0, y2) * height)
+        if x2 <= x1 or y2 <= y1:
+            return 0, 0, width, height
+        return x1, y1, x2, y2
+
+    def prepare(self, frame):
+        """Cropped and resized image plus the transform back to source pixels"""
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = self.roi_rect(width, height)
+        image = frame[y1:y2, x1:x2]
+
+        scale = 1.0
+        longest = max(x2 - x1, y2 - y1)
+        if self.target_size and longest > self.target_size:
+            scale = self.target_size / longest
+            image = cv2.resize(image, (max(1, int((x2 - x1) * scale)), max(1, int((y2 - y1) * scale))),
+                               interpolation=cv2.INTER_AREA)
+        return image, {'offset': (x1, y1), 'scale': scale, 'crop_size': (x2 - x1, y2 - y1),
+                       'source_size': (width, height)}
+
+    def encode(self, image):
+        """Encode at the adaptive quality; returns (buffer, quality) or (None, None)"""
+        with self.lock:
+            quality = self.quality
+
+        while True:
+            ret, buffer = cv2.imencode(self.ext, image, [self.quality_flag, quality])
+            if not ret:
+                return None, None
+            if not self.byte_budget or len(buffer) <= self.byte_budget or quality <= self.min_quality:
+                break
+            # Jump roughly in proportion to the overshoot, at least 5 steps
+            overshoot = len(buffer) / self.byte_budget
+            quality = max(self.min_quality, quality - max(5, int(quality * (1 - 1 / overshoot))))
+
+        with self.lock:
+            if self.byte_budget and len(buffer) < self.byte_budget * 0.6:
+                self.quality = min(self.max_quality, quality + 5)   # creep back up next time
+            else:
+                self.quality = quality
+        return buffer, quality
+
+    def build(self, frame):
+        """Payload dict: 'data' (encoded buffer), 'content_type', 'quality', 'transform'"""
+        image, transform = self.prepare(frame)
+        buffer, quality = self.encode(image)
+        if buffer is None:
+            return None
+        return {
+            'data': buffer,
+            'content_type': self.content_type,
+            'quality': quality,
+            'size': (image.shape[1], image.shape[0]),
+            'transform': transform
+        }
+
+    @staticmethod
+    def map_boxes(boxes, transform):
+        """Map [x1, y1, x2, y2, ...] boxes from payload to source-frame pixels
+
+        Boxes whose coordinates are all within 0-1 are taken as normalised
+        to the payload image and scaled by the crop size instead.
+        """
+        ox, oy = transform['offset']
+        scale = transform['scale']
+        crop_w, crop_h = transform['crop_size']
+        mapped = []
+        for box in boxes or []:
+            if len(box) < 4:
+                continue
+            coords = [float(v) for v in box[:4]]
+            if all(0.0 <= v <= 1.0 for v in coords):
+                x1, y1, x2, y2 = coords[0] * crop_w, coords[1] * crop_h, coords[2] * crop_w, coords[3] * crop_h
+            else:
+                x1, y1, x2, y2 = (v / scale for v in coords)
+            mapped.append([int(round(x1 + ox)), int(round(y1 + oy)),
+                           int(round(x2 + ox)), int(round(y2 + oy)), *box[4:]])
+        return mapped
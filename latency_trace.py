@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+End-to-end latency tracing
+One FrameTrace per frame sent for inference, marked with monotonic
+timestamps as it moves from capture to alert; finished traces go into a
+ring buffer that reports p50/p95/p99 per stage.
+Shared by the RTSP camera and drone pipelines.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+# In pipeline order; a trace may skip stages (e.g. no 'alert' without fire)
+STAGES = ('capture', 'decode', 'dequeue', 'encode', 'upload_start', 'ttfb', 'parsed', 'alert')
+PERCENTILES = (50, 95, 99)
+
+# ═══════════════════════════════════════════════════════════════
+# TRACE
+# ═══════════════════════════════════════════════════════════════
+
+class FrameTrace:
+    """Stage -> time.monotonic() marks for one frame"""
+
+    __slots__ = ('marks', 'labels')
+
+    def __init__(self, capture_ts=None, **labels):
+        self.marks = {'capture': time.monotonic() if capture_ts is None else capture_ts}
+        self.labels = labels
+
+    def mark(self, stage, ts=None):
+        self.marks[stage] = time.monotonic() if ts is None else ts
+
+    def since_capture(self, stage):
+        """Seconds from capture to stage, or None if the stage was not reached"""
+        ts = self.marks.get(stage)
+        return None if ts is None else ts - self.marks['capture']
+
+# ═══════════════════════════════════════════════════════════════
+# RECORDER
+# ═══════════════════════════════════════════════════════════════
+
+class TraceRecorder:
+    """Ring buffer of finished traces with percentile summaries"""
+
+    def __init__(self, capacity=1000, name='trace'):
+        self.name = name
+        self.records = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.finished = 0
+
+    def finish(self, trace):
+        with self.lock:
+            self.records.append(trace)
+            self.finished += 1
+
+    @staticmethod
+    def _percentiles(values):
+        ms = np.asarray(values) * 1000.0
+        summary = {f'p{p}': round(float(v), 1) for p, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES))}
+        summary['max'] = round(float(ms.max()), 1)
+        summary['count'] = len(values)
+        return summary
+
+    def summary(self):
+        """Milliseconds since capture per stage, and between consecutive stages"""
+        with self.lock:
+            traces = list(self.records)
+            finished = self.finished
+
+        since_capture = {}
+        intervals = {}
+        for i, stage in enumerate(STAGES[1:], start=1):
+            values = [t.since_capture(stage) for t in traces if stage in t.marks]
+            if values:
+                since_capture[stage] = self._percentiles(values)
+            # Interval from the closest earlier stage each trace actually reached
+            deltas = []
+            for t in traces:
+                if stage not in t.marks:
+                    continue
+                previous = next(s for s in reversed(STAGES[:i]) if s in t.marks)
+                deltas.append(t.marks[stage] - t.marks[previous])
+            if deltas:
+                intervals[stage] = self._percentiles(deltas)
+
+        return {
+            'name': self.name,
+            'window': len(traces),
+            'finished': finished,
+            'since_capture_ms': since_capture,
+            'stage_ms': intervals
+        }
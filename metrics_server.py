@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Tiny HTTP server for metrics endpoints
+For processes without a web framework (the drone detector): register
+path -> handler routes and serve them from a background thread.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER
+# ═══════════════════════════════════════════════════════════════
+
+class MetricsServer:
+    """GET-only route table; handlers return (content_type, body)"""
+
+    def __init__(self, host='0.0.0.0', port=9102):
+        self.host = host
+        self.port = port
+        self.routes = {}
+        self.httpd = None
+
+    def add_route(self, path, handler):
+        self.routes[path] = handler
+
+    def add_json_route(self, path, get_data):
+        self.add_route(path, lambda: ('application/json', json.dumps(get_data(), default=str)))
+
+    def start(self):
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                handler = routes.get(self.path.split('?')[0])
+                if handler is None:
+                    self.send_error(404)
+                    return
+                try:
+                    content_type, body = handler()
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass            # keep the detector console readable
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name='metrics-http', daemon=True).start()
+        print(f"[✓] Metrics server on http://{self.host}:{self.port} ({', '.join(self.routes)})")
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+Mock fire inference endpoint for offline benchmarks
+Accepts the same POSTs as the AWS fire-frame-receiver and answers after a
+configurable latency with a configurable error rate and box output, so the
+camera and drone pipelines can be measured without a network. Multipart
+batch POSTs (InferenceClient batch_size > 1) get one result per frame.
+
+Run standalone:  python mock_inference_server.py --port 8099 --latency 0.3
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+DEFAULT_PORT = 8099
+# Box returned on fire, in payload pixels [x1, y1, x2, y2, label, score]
+DEFAULT_BOX = [200, 150, 320, 260, 'fire', 0.87]
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER
+# ═══════════════════════════════════════════════════════════════
+
+def count_parts(content_type, body):
+    """Frames in a multipart batch POST, or None for a single-frame POST"""
+    if not content_type.startswith('multipart/'):
+        return None
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key == 'boundary':
+            return body.count(b'--' + value.strip('"').encode('ascii') + b'\r\n')
+    return None
+
+
+class MockInferenceServer:
+    """Threaded HTTP server answering every POST like the fire API
+
+    latency/jitter: seconds before answering (uniform +- jitter)
+    error_rate:     fraction of requests answered with HTTP 500
+    fire_rate:      fraction of successful answers with fire_detected
+    boxes:          boxes returned on fire (copies of DEFAULT_BOX, shifted)
+    A batch costs one latency draw; errors fail the whole batch, fire is
+    drawn per frame. GET /stats returns request counters as JSON.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, latency=0.3, jitter=0.0,
+                 error_rate=0.0, fire_rate=1.0, boxes=1, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fire_rate = fire_rate
+        self.boxes = boxes
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'frames': 0, 'errors': 0, 'fire': 0, 'bytes': 0}
+        self.started = None
+        self.httpd = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/default/fire-frame-receiver"
+
+    def _detection(self):
+        with self.lock:
+            fire = self.random.random() < self.fire_rate
+        boxes = []
+        if fire:
+            boxes = [[v + 40 * i if k < 4 else v for k, v in enumerate(DEFAULT_BOX)]
+                     for i in range(self.boxes)]
+        return {'fire_detected': fire, 'boxes': boxes}
+
+    def answer(self, size, frames=None):
+        """(status, body) for one POST; frames is the part count of a batch"""
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            status, results = 500, []
+            body = {'error': 'mock failure'}
+        else:
+            status = 200
+            results = [self._detection() for _ in range(frames or 1)]
+            body = {'results': [dict(r, status=200) for r in results]} if frames else results[0]
+        with self.lock:
+            self.counters['requests'] += 1
+            self.counters['frames'] += frames or 1
+            self.counters['bytes'] += size
+            self.counters['errors'] += int(failed)
+            self.counters['fire'] += sum(r['fire_detected'] for r in results)
+        return status, body
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        uptime = time.monotonic() - self.started if self.started is not None else 0.0
+        return {'uptime': uptime,
+                'requests_per_min': counters['requests'] * 60.0 / uptime if uptime > 0 else 0.0,
+                **counters}
+
+    def reset(self):
+        with self.lock:
+            self.counters = dict.fromkeys(self.counters, 0)
+            self.started = time.monotonic()
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'       # keep-alive, like API Gateway
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                size = int(self.headers.get('Content-Length') or 0)
+                data = self.rfile.read(size)
+                status, body = server.answer(size, count_parts(self.headers.get('Content-Type', ''), data))
+                self._send_json(status, body)
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/stats':
+                    self._send_json(200, server.stats())
+                elif path == '/reset':
+                    server.reset()
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.started = time.monotonic()
+        threading.Thread(target=self.httpd.serve_forever, name='mock-inference', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+# ═══════════════════════════════════════════════════════════════
+# MAIN
+# ═══════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock fire inference endpoint')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+- seconds, uniform')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction answered with HTTP 500')
+    parser.add_argument('--fire-rate', type=float, default=1.0, help='fraction answered with fire')
+    parser.add_argument('--boxes', type=int, default=1, help='boxes per fire answer')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockInferenceServer(args.host, args.port, args.latency, args.jitter,
+                                 args.error_rate, args.fire_rate, args.boxes, args.seed).start()
+    print(f"[✓] Mock inference server on {server.url} "
+          f"(latency {args.latency}s ±{args.jitter}s, errors {args.error_rate:.0%}, "
+          f"fire {args.fire_rate:.0%}, {args.boxes} box(es))", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Prometheus metrics (text exposition format, no client library needed)
+A minimal registry of labelled counters, gauges and histograms plus the
+metric set shared by the RTSP camera server and the drone detector, so both
+export the same names to the fleet dashboards.
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+import threading
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INF_LABEL = 'le="+Inf"'
+
+# ═══════════════════════════════════════════════════════════════
+# REGISTRY
+# ═══════════════════════════════════════════════════════════════
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if any(m.name == metric.name for m in self.metrics):
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self.metrics.append(metric)
+
+    def render(self):
+        """All metrics in Prometheus text format"""
+        with self.lock:
+            metrics = list(self.metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# ═══════════════════════════════════════════════════════════════
+# METRIC TYPES
+# ═══════════════════════════════════════════════════════════════
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+        registry.register(self)
+
+    def labels(self, *values, **kwargs):
+        """Child for one label combination (positional or by name)"""
+        if kwargs:
+            values = tuple(kwargs[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        with self.lock:
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = self._new_child()
+            return child
+
+    def _unlabelled(self):
+        return self.labels()
+
+    def samples(self):
+        with self.lock:
+            items = list(self.children.items())
+        lines = []
+        for key, child in items:
+            lines.extend(child.samples(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labelnames, key):
+        return [f'{name}{_format_labels(labelnames, key)} {_format_value(self.value)}']
+
+
+class _GaugeValue(_Value):
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def samples(self, name, labelnames, key):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f'{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labelnames, key, INF_LABEL)} {count}')
+        lines.append(f'{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}')
+        lines.append(f'{name}_count{_format_labels(labelnames, key)} {count}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self._unlabelled().set(value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled().observe(value)
+
+# ═══════════════════════════════════════════════════════════════
+# FIRE DETECTION METRICS
+# ═══════════════════════════════════════════════════════════════
+
+FRAMES_CAPTURED = Counter('fire_frames_captured_total',
+                          'Frames decoded from a camera or drone stream', ('camera', 'stream'))
+FRAMES_DROPPED = Counter('fire_frames_dropped_total',
+                         'Frames lost or discarded before inference, by reason',
+                         ('camera', 'stream', 'reason'))
+ENCODE_SECONDS = Histogram('fire_encode_seconds',
+                           'Image encode time, by consumer (ai, web, ws)', ('camera', 'target'))
+AI_REQUEST_SECONDS = Histogram('fire_ai_request_seconds',
+                               'AI endpoint round trip including retries', ('camera',))
+AI_RESPONSES = Counter('fire_ai_responses_total',
+                       'AI endpoint responses by HTTP status (or timeout/error)', ('camera', 'status'))
+STATIC_SKIPS = Counter('fire_static_skips_total',
+                       'AI calls skipped because the scene was unchanged', ('camera',))
+DETECTIONS = Counter('fire_detections_total', 'AI results with fire detected', ('camera',))
+RECONNECTS = Counter('fire_stream_reconnects_total',
+                     'Stream reopen attempts after a stall or error', ('camera', 'stream'))
+VIEWER_BYTES = Counter('fire_viewer_bytes_sent_total',
+                       'Live view bytes sent to all viewers', ('camera', 'stream'))
+VIEWERS = Gauge('fire_viewers', 'Connected live view clients', ('camera', 'stream'))
+LOCAL_INFERENCE_SECONDS = Histogram('fire_local_inference_seconds',
+                                    'Local detector forward pass per batch', ('engine',))
+LOCAL_BATCH_SIZE = Histogram('fire_local_batch_size', 'Frames per local detector batch',
+                             ('engine',), buckets=(1, 2, 4, 8, 16, 32))
@@ -0,0 +1,34 @@
+import numpy as np
+
+from detector_backends import LocalDNNBackend
+from mock_inference_server import DEFAULT_BOX
+
+
+def make_backend(labels=('fire', 'smoke')):
+    # postprocess() only needs the thresholds and labels, not a loaded model
+    backend = LocalDNNBackend.__new__(LocalDNNBackend)
+    backend.labels = labels
+    backend.fire_labels = {'fire'}
+    backend.conf_threshold = 0.35
+    backend.nms_threshold = 0.45
+    return backend
+
+
+def test_postprocess_boxes_are_label_then_score():
+    # YOLOv5 row: cx, cy, w, h, objectness, fire, smoke
+    output = np.array([[100, 80, 40, 20, 0.9, 0.8, 0.1]], dtype=np.float32)
+    boxes = make_backend().postprocess(output, (1.0, 0, 0), (480, 640, 3))
+    assert boxes == [[80, 70, 120, 90, 'fire', 0.72]]
+
+
+def test_postprocess_scales_back_from_letterbox():
+    output = np.array([[100, 80, 40, 20, 0.9, 0.1, 0.8]], dtype=np.float32)
+    x1, y1, x2, y2, label, score = make_backend().postprocess(output, (0.5, 10, 20), (480, 640, 3))[0]
+    assert (x1, y1, x2, y2) == (140, 100, 220, 140)
+    assert label == 'smoke'
+    assert score == 0.72
+
+
+def test_mock_box_matches_backend_layout():
+    assert isinstance(DEFAULT_BOX[4], str)
+    assert isinstance(DEFAULT_BOX[5], float)
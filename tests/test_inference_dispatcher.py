@@ -0,0 +1,12 @@
+from inference_dispatcher import InferenceDispatcher
+
+
+def test_submit_after_stop_releases_at_once():
+    dispatcher = InferenceDispatcher(lambda frame, **context: frame,
+                                     lambda result, capture_ts, context: None)
+    dispatcher.stop()
+    done = []
+    assert dispatcher.submit('frame', key='cam', done=lambda: done.append(1)) is False
+    assert done == [1]
+    assert dispatcher.pending == {}
+    assert dispatcher.counters['submitted'] == 0
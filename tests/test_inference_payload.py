@@ -0,0 +1,28 @@
+import numpy as np
+
+from inference_payload import PayloadBuilder
+
+
+def make_transform(rois=None, target_size=640, size=(1280, 720)):
+    frame = np.zeros((size[1], size[0], 3), np.uint8)
+    _, transform = PayloadBuilder(target_size=target_size, rois=rois).prepare(frame)
+    return transform
+
+
+def test_map_boxes_pixel_boxes_undo_scale_and_offset():
+    # Right half of a 1280x720 frame, downscaled to 320 on the longest side
+    transform = make_transform(rois=[[0.5, 0.0, 1.0, 1.0]], target_size=320)
+    assert transform['offset'] == (640, 0)
+    assert transform['scale'] == 320 / 720
+    boxes = PayloadBuilder.map_boxes([[40, 80, 120, 160, 'fire', 0.9]], transform)
+    assert boxes == [[730, 180, 910, 360, 'fire', 0.9]]
+
+
+def test_map_boxes_normalised_boxes_scale_by_crop_size():
+    transform = make_transform(rois=[[0.5, 0.0, 1.0, 1.0]], target_size=320)
+    boxes = PayloadBuilder.map_boxes([[0.25, 0.5, 0.75, 1.0, 'smoke', 0.6]], transform)
+    assert boxes == [[800, 360, 1120, 720, 'smoke', 0.6]]
+
+
+def test_map_boxes_skips_short_boxes():
+    assert PayloadBuilder.map_boxes([[1, 2, 3], []], make_transform()) == []